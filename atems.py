@@ -11,7 +11,9 @@ load_dotenv()
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # Cached per process (utils/user_cache.py); invalidated on any ORM write to the user
+    from utils.user_cache import load_cached_user
+    return load_cached_user(int(user_id))
 
 def create_app():
     app = Flask(__name__)
@@ -24,10 +26,30 @@ def create_app():
     try:
         log_dir = os.path.dirname(os.path.abspath(__file__))
         log_file = os.path.join(log_dir, "atems.log")
-        fh = logging.FileHandler(log_file, encoding="utf-8")
-        fh.setLevel(log_level)
-        fh.setFormatter(logging.Formatter(log_format))
-        logging.getLogger().addHandler(fh)
+
+        def make_file_handler():
+            # ATEMS_LOG_MAX_BYTES > 0 rotates to atems.log.1 .. .N (ATEMS_LOG_BACKUPS) from this process. Single
+            # process only: Gunicorn workers would each rotate on their own and clobber each other's backups. With
+            # several workers leave it at 0 and rotate with logrotate; the watched handler reopens the moved file.
+            max_bytes = int(os.getenv("ATEMS_LOG_MAX_BYTES", "0"))
+            if max_bytes > 0:
+                from logging.handlers import RotatingFileHandler
+                return RotatingFileHandler(log_file, maxBytes=max_bytes,
+                                           backupCount=int(os.getenv("ATEMS_LOG_BACKUPS", "5")), encoding="utf-8")
+            from logging.handlers import WatchedFileHandler
+            return WatchedFileHandler(log_file, encoding="utf-8")
+
+        from utils.log_pipeline import install_log_pipeline, json_log_enabled
+        if json_log_enabled():
+            # JSON lines written by a background thread; recent records also kept in memory for /api/logs
+            install_log_pipeline(make_file_handler, log_level)
+        elif any(getattr(h, "baseFilename", None) == os.path.abspath(log_file) for h in logging.getLogger().handlers):
+            pass  # create_app() called again in this process (tests, scripts): one handler, one rotation
+        else:
+            fh = make_file_handler()
+            fh.setLevel(log_level)
+            fh.setFormatter(logging.Formatter(log_format))
+            logging.getLogger().addHandler(fh)
     except Exception as _e:
         import sys
         logging.getLogger(__name__).warning("Could not add atems.log file handler: %s", _e)
@@ -80,9 +102,22 @@ def create_app():
     # Initialize extensions (init_app does db, login_manager, admin, migrate)
     init_app(app)
 
+    # Keep inventory_counters in step with every tool write (see utils/inventory_counters.py)
+    from utils.inventory_counters import register_inventory_counter_events
+    register_inventory_counter_events()
+
+    # Drop cached users whenever a user row is written (see utils/user_cache.py)
+    from utils.user_cache import register_user_cache_events, clear_user_cache
+    register_user_cache_events()
+    clear_user_cache()
+
+    # SQL statements and time per request for /metrics (see metrics.py)
+    from metrics import register_db_metrics
+    register_db_metrics()
+
     # Ensure all tables exist (fixes "no such table" when using a new or different database)
     with app.app_context():
-        from models import Tools, CheckoutHistory  # ensure all models registered for create_all
+        from models import Tools, CheckoutHistory, InventoryCounter, Job  # ensure all models registered for create_all
         db.create_all()
         # If no users exist, create default admin so you can log in (same env pattern as other bots)
         if User.query.count() == 0:
@@ -108,9 +143,13 @@ def create_app():
     logger.info("Application initialized successfully.")
 
     # Register blueprints
-    from routes import bp
+    from routes import bp, hashing_busy
     app.register_blueprint(bp)
 
+    # A full password hashing queue is a 503 + Retry-After from any view (login, Flask-Admin user forms, API)
+    from utils.passwords import HashingBusy
+    app.register_error_handler(HashingBusy, hashing_busy)
+
     from metrics import metrics_bp
     app.register_blueprint(metrics_bp)
 
@@ -118,6 +157,18 @@ def create_app():
     from utils.api_error_handlers import register_api_error_handlers
     register_api_error_handlers(app)
 
+    # Opt-in SQL profiler: Server-Timing header and slowest statements on /logs (see utils/sql_profiler.py)
+    from utils.sql_profiler import register_sql_profiler
+    register_sql_profiler(app)
+
+    # Load usernames and badge ids once so badge swipes and unknown-name logins never wait on the DB
+    try:
+        from utils.user_cache import warm_user_directory
+        with app.app_context():
+            warm_user_directory()
+    except Exception as e:
+        logger.warning("Could not warm user directory: %s", e)
+
     # Run startup self-tests (log to atems.log for error review)
     try:
         from selftest.startup import run_startup_selftests
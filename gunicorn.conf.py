@@ -2,6 +2,7 @@
 # Multiple workers improve throughput (parallel request handling).
 # With PostgreSQL, we can use multiple workers safely (no "database is locked" issues).
 import os
+import tempfile
 
 bind = "0.0.0.0:5000"
 
@@ -24,7 +25,48 @@ preload = False if "sqlite" in db_uri.lower() else True
 # Worker class - sync is default, use gevent for async if needed
 worker_class = "sync"
 
+# Threads per worker; > 1 switches sync to gthread. Lets other requests run while a login waits on bcrypt,
+# which is capped per process by ATEMS_HASH_WORKERS (see utils/passwords.py).
+threads = int(os.environ.get("GUNICORN_THREADS", "1"))
+
 # Logging
 accesslog = "-"  # stdout
 errorlog = "-"   # stderr
 loglevel = "info"
+
+# Prometheus multiprocess mode: each worker writes its metrics to mmap'd files in this directory and /metrics
+# (metrics.py) aggregates all of them, so a scrape sees the whole server instead of one worker. Must be set
+# before the app (and prometheus_client) is imported, which preload does in this process.
+prometheus_multiproc_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "atems_prometheus")
+)
+os.makedirs(prometheus_multiproc_dir, exist_ok=True)
+
+
+def on_starting(server):
+    # Once per master start (not on HUP reload, when live workers still have their files mapped): drop the
+    # previous run's files so counters start from zero
+    for name in os.listdir(prometheus_multiproc_dir):
+        if name.endswith(".db"):
+            os.remove(os.path.join(prometheus_multiproc_dir, name))
+
+
+def child_exit(server, worker):
+    # Keep the dead worker's counters and histograms (totals must not drop) but remove its live gauges
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid, prometheus_multiproc_dir)
+
+
+def post_worker_init(worker):
+    # Each worker, after the fork and with the app loaded, picks up background jobs orphaned by a dead process
+    # (no heartbeat for ATEMS_JOB_STALE_SECONDS). Not in create_app(): the preloading master and scripts that
+    # build the app would claim jobs into a pool that never runs them.
+    try:
+        from utils.jobs import resume_stale_jobs
+        with worker.wsgi.app_context():
+            resume_stale_jobs(worker.wsgi)
+    except Exception as e:
+        worker.log.warning("Could not resume background jobs: %s", e)
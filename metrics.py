@@ -1,16 +1,120 @@
-"""Prometheus /metrics endpoint for ATEMS (Wave A monitoring scrape)."""
+"""Prometheus /metrics endpoint for ATEMS (Wave A monitoring scrape).
 
-from flask import Blueprint, Response
+Besides the default registry (process/GC metrics), exposes per-route request latency fed by the timing
+middleware (utils/performance.py) and the number of SQL statements / time spent in the database per request,
+counted by SQLAlchemy engine events. Labels use the route template (/api/tools/<int:tool_id>), never the raw
+path, so series stay bounded.
+
+Under Gunicorn (gunicorn.conf.py sets PROMETHEUS_MULTIPROC_DIR) every worker writes its samples to files in
+that directory and a scrape of any worker returns the sum over all of them.
+"""
+
+import contextvars
+import os
+import threading
+import time
+
+from flask import Blueprint, Response, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 
 metrics_bp = Blueprint("metrics", __name__)
 
 try:
-    from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+    from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Histogram, generate_latest
+    from prometheus_client import multiprocess
 
     PROMETHEUS_AVAILABLE = True
 except ImportError:
     PROMETHEUS_AVAILABLE = False
 
+# Route label for requests that matched no URL rule (404s, scanners), so random paths do not become series
+UNMATCHED_ROUTE = "<unmatched>"
+
+if PROMETHEUS_AVAILABLE:
+    REQUEST_LATENCY = Histogram(
+        "atems_http_request_duration_seconds",
+        "Time to the response status line, by route template, method and status",
+        ["route", "method", "status"],
+    )
+    REQUEST_DB_QUERIES = Histogram(
+        "atems_http_request_db_queries",
+        "SQL statements executed per request, by route template and method",
+        ["route", "method"],
+        buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+    )
+    REQUEST_DB_SECONDS = Histogram(
+        "atems_http_request_db_duration_seconds",
+        "Time spent executing SQL per request, by route template and method",
+        ["route", "method"],
+    )
+
+
+class RequestDbStats:
+    """SQL statements and seconds for one request. Shared with the dashboard's worker threads, hence the lock."""
+
+    __slots__ = ("queries", "seconds", "_lock")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self.queries += 1
+            self.seconds += seconds
+
+
+# Set by the timing middleware for the duration of a request; run_in_parallel copies it into its threads
+_request_db_stats = contextvars.ContextVar("atems_request_db_stats", default=None)
+
+
+def begin_request_metrics():
+    """Start counting SQL for this request. Returns (stats, token); pass token to end_request_metrics()."""
+    stats = RequestDbStats()
+    return stats, _request_db_stats.set(stats)
+
+
+def end_request_metrics(token) -> None:
+    _request_db_stats.reset(token)
+
+
+def current_route() -> str:
+    """URL rule of the request being served (call inside the request context), else UNMATCHED_ROUTE."""
+    if has_request_context() and request.url_rule is not None:
+        return request.url_rule.rule
+    return UNMATCHED_ROUTE
+
+
+def observe_request(route: str, method: str, status: str, seconds: float, stats: RequestDbStats) -> None:
+    if not PROMETHEUS_AVAILABLE:
+        return
+    REQUEST_LATENCY.labels(route, method, status.split(" ", 1)[0]).observe(seconds)
+    REQUEST_DB_QUERIES.labels(route, method).observe(stats.queries)
+    REQUEST_DB_SECONDS.labels(route, method).observe(stats.seconds)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _request_db_stats.get() is not None:
+        context._atems_query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_atems_query_start", None)
+    stats = _request_db_stats.get()
+    if start is not None and stats is not None:
+        stats.add(time.perf_counter() - start)
+
+
+def register_db_metrics() -> None:
+    """Count SQL statements and time per request on every engine. Idempotent; no-op without prometheus_client."""
+    if not PROMETHEUS_AVAILABLE:
+        return
+    for name, fn in (("before_cursor_execute", _before_cursor_execute), ("after_cursor_execute", _after_cursor_execute)):
+        if not event.contains(Engine, name, fn):
+            event.listen(Engine, name, fn)
+
 
 @metrics_bp.route("/metrics")
 def metrics():
@@ -20,4 +124,9 @@ def metrics():
             status=503,
             mimetype="text/plain",
         )
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        # Fresh registry per scrape: the collector reads every worker's files (including exited workers')
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
     return Response(generate_latest(), mimetype=CONTENT_TYPE_LATEST)
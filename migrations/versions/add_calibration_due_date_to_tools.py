@@ -0,0 +1,58 @@
+"""add typed, indexed tool_calibration_due_date to tools
+
+Revision ID: add_calibration_due_date
+Revises: add_inventory_counters
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'add_calibration_due_date'
+down_revision = 'add_inventory_counters'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH = 1000
+
+
+def upgrade():
+    conn = op.get_bind()
+    cols = [c['name'] for c in sa.inspect(conn).get_columns('tools')]
+    # SQLite: avoid duplicate column if table was created by create_all()
+    if 'tool_calibration_due_date' not in cols:
+        op.add_column('tools', sa.Column('tool_calibration_due_date', sa.Date(), nullable=True))
+        op.create_index('ix_tools_tool_calibration_due_date', 'tools', ['tool_calibration_due_date'], unique=False)
+
+    # Backfill through the same parser the app uses (utils/calibration.py)
+    from utils.calibration import parse_calibration_due
+
+    tools = sa.table(
+        'tools',
+        sa.column('id', sa.Integer),
+        sa.column('tool_calibration_due', sa.String),
+        sa.column('tool_calibration_due_date', sa.Date),
+    )
+    rows = conn.execute(
+        sa.select(tools.c.id, tools.c.tool_calibration_due).where(tools.c.tool_calibration_due_date.is_(None))
+    ).fetchall()
+    update = tools.update().where(tools.c.id == sa.bindparam('tool_pk')).values(
+        tool_calibration_due_date=sa.bindparam('due_date')
+    )
+    batch = []
+    for tool_pk, due in rows:
+        dt = parse_calibration_due(due)
+        if dt is None:
+            continue
+        batch.append({'tool_pk': tool_pk, 'due_date': dt.date()})
+        if len(batch) >= BACKFILL_BATCH:
+            conn.execute(update, batch)
+            batch = []
+    if batch:
+        conn.execute(update, batch)
+
+
+def downgrade():
+    op.drop_index('ix_tools_tool_calibration_due_date', table_name='tools')
+    op.drop_column('tools', 'tool_calibration_due_date')
@@ -0,0 +1,59 @@
+"""add indexes for the hot filters on tools.checked_out_by and checkout_history (action, event_time)
+
+Revision ID: add_hot_filter_indexes
+Revises: add_jobs_checkpoint
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'add_hot_filter_indexes'
+down_revision = 'add_jobs_checkpoint'
+branch_labels = None
+depends_on = None
+
+# Same dialect split as models/tools.py: a partial index of checked-out tools in keyset order where supported,
+# a full (checked_out_by, tool_name, id) index elsewhere
+PARTIAL_INDEX_DIALECTS = ('postgresql', 'sqlite')
+CHECKED_OUT = sa.text('checked_out_by IS NOT NULL')
+
+HISTORY_INDEXES = {
+    'ix_checkout_history_action_time': ['action', 'event_time'],
+    'ix_checkout_history_tool_action_time': ['tool_id_number', 'action', 'event_time'],
+    'ix_checkout_history_time_id': ['event_time', 'id'],
+}
+
+# Leading column of ix_checkout_history_tool_action_time; dropped so each history insert maintains one index fewer
+REPLACED = 'ix_checkout_history_tool_id_number'
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    # Skip indexes already created by create_all()
+    existing = {ix['name'] for ix in inspector.get_indexes('tools')}
+    if bind.dialect.name in PARTIAL_INDEX_DIALECTS:
+        if 'ix_tools_checked_out' not in existing:
+            op.create_index('ix_tools_checked_out', 'tools', ['tool_name', 'id'], unique=False,
+                            postgresql_where=CHECKED_OUT, sqlite_where=CHECKED_OUT)
+    elif 'ix_tools_checked_out_by' not in existing:
+        op.create_index('ix_tools_checked_out_by', 'tools', ['checked_out_by', 'tool_name', 'id'], unique=False)
+
+    existing = {ix['name'] for ix in inspector.get_indexes('checkout_history')}
+    for name, cols in HISTORY_INDEXES.items():
+        if name not in existing:
+            op.create_index(name, 'checkout_history', cols, unique=False)
+    if REPLACED in existing:
+        op.drop_index(REPLACED, table_name='checkout_history')
+
+
+def downgrade():
+    op.create_index(REPLACED, 'checkout_history', ['tool_id_number'], unique=False)
+    for name in HISTORY_INDEXES:
+        op.drop_index(name, table_name='checkout_history')
+    if op.get_bind().dialect.name in PARTIAL_INDEX_DIALECTS:
+        op.drop_index('ix_tools_checked_out', table_name='tools')
+    else:
+        op.drop_index('ix_tools_checked_out_by', table_name='tools')
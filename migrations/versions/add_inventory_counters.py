@@ -0,0 +1,36 @@
+"""add inventory_counters table (materialized tool totals)
+
+Revision ID: add_inventory_counters
+Revises: add_return_by
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'add_inventory_counters'
+down_revision = 'add_return_by'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    # Table may already exist if it was created by create_all()
+    if sa.inspect(conn).has_table('inventory_counters'):
+        return
+    op.create_table('inventory_counters',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('scope', sa.String(length=32), nullable=False),
+    sa.Column('key', sa.String(length=64), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('scope', 'key', name='uq_inventory_counters_scope_key')
+    )
+    # Counters are filled on first read (utils/inventory_counters.get_inventory_summary rebuilds when empty)
+
+
+def downgrade():
+    op.drop_table('inventory_counters')
@@ -0,0 +1,31 @@
+"""add checkpoint and heartbeat_at to jobs (resumable import jobs)
+
+Revision ID: add_jobs_checkpoint
+Revises: add_tools_tool_id_unique
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'add_jobs_checkpoint'
+down_revision = 'add_tools_tool_id_unique'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Columns may already exist if the table was created by create_all()
+    existing = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('jobs')}
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        if 'checkpoint' not in existing:
+            batch_op.add_column(sa.Column('checkpoint', sa.Text(), nullable=True))
+        if 'heartbeat_at' not in existing:
+            batch_op.add_column(sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.drop_column('heartbeat_at')
+        batch_op.drop_column('checkpoint')
@@ -0,0 +1,48 @@
+"""add jobs table (background report exports)
+
+Revision ID: add_jobs_table
+Revises: add_tools_keyset_indexes
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'add_jobs_table'
+down_revision = 'add_tools_keyset_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    # Table may already exist if it was created by create_all()
+    if sa.inspect(conn).has_table('jobs'):
+        return
+    op.create_table('jobs',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('kind', sa.String(length=16), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('owner', sa.String(length=128), nullable=True),
+    sa.Column('params', sa.Text(), nullable=True),
+    sa.Column('processed', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=True),
+    sa.Column('result_path', sa.String(length=512), nullable=True),
+    sa.Column('result_name', sa.String(length=128), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_jobs_status', 'jobs', ['status'], unique=False)
+    op.create_index('ix_jobs_owner', 'jobs', ['owner'], unique=False)
+    op.create_index('ix_jobs_created_at', 'jobs', ['created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_jobs_created_at', table_name='jobs')
+    op.drop_index('ix_jobs_owner', table_name='jobs')
+    op.drop_index('ix_jobs_status', table_name='jobs')
+    op.drop_table('jobs')
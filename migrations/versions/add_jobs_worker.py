@@ -0,0 +1,28 @@
+"""add worker to jobs (process holding a queued/running job)
+
+Revision ID: add_jobs_worker
+Revises: add_hot_filter_indexes
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'add_jobs_worker'
+down_revision = 'add_hot_filter_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Column may already exist if the table was created by create_all()
+    existing = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('jobs')}
+    if 'worker' not in existing:
+        with op.batch_alter_table('jobs', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('worker', sa.String(length=128), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.drop_column('worker')
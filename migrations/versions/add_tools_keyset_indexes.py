@@ -0,0 +1,35 @@
+"""add composite indexes for keyset pagination of /api/tools
+
+Revision ID: add_tools_keyset_indexes
+Revises: add_calibration_due_date
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'add_tools_keyset_indexes'
+down_revision = 'add_calibration_due_date'
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    'ix_tools_name_id': ['tool_name', 'id'],
+    'ix_tools_category_name_id': ['category', 'tool_name', 'id'],
+    'ix_tools_location_name_id': ['tool_location', 'tool_name', 'id'],
+    'ix_tools_status_name_id': ['tool_status', 'tool_name', 'id'],
+}
+
+
+def upgrade():
+    # Skip indexes already created by create_all()
+    existing = {ix['name'] for ix in sa.inspect(op.get_bind()).get_indexes('tools')}
+    for name, cols in INDEXES.items():
+        if name not in existing:
+            op.create_index(name, 'tools', cols, unique=False)
+
+
+def downgrade():
+    for name in INDEXES:
+        op.drop_index(name, table_name='tools')
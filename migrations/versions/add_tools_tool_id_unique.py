@@ -0,0 +1,37 @@
+"""add unique index on tools.tool_id_number (import upsert target)
+
+Revision ID: add_tools_tool_id_unique
+Revises: add_jobs_table
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'add_tools_tool_id_unique'
+down_revision = 'add_jobs_table'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    # Skip if already created by create_all()
+    existing = {ix['name'] for ix in sa.inspect(conn).get_indexes('tools')}
+    if 'uq_tools_tool_id_number' in existing:
+        return
+    dupes = conn.execute(sa.text(
+        "SELECT tool_id_number, COUNT(*) FROM tools GROUP BY tool_id_number HAVING COUNT(*) > 1"
+    )).fetchall()
+    if dupes:
+        listed = ', '.join(f"{d[0]} ({d[1]}x)" for d in dupes[:20])
+        raise RuntimeError(
+            f"Cannot add unique index on tools.tool_id_number: {len(dupes)} duplicated ID(s): {listed}. "
+            "Rename or delete the duplicates, then run the migration again."
+        )
+    op.create_index('uq_tools_tool_id_number', 'tools', ['tool_id_number'], unique=True)
+
+
+def downgrade():
+    op.drop_index('uq_tools_tool_id_number', table_name='tools')
@@ -3,6 +3,8 @@
 from .user import User
 from .tools import Tools
 from .checkout_history import CheckoutHistory
+from .inventory_counter import InventoryCounter
+from .job import Job
 from .checkin import CheckinView
 from .checkout import CheckoutView
 from .notify import NotificationsView
\ No newline at end of file
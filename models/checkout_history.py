@@ -8,9 +8,16 @@ from datetime import datetime
 class CheckoutHistory(db.Model):
     """Log of every check-in and check-out event."""
     __tablename__ = "checkout_history"
+    # (action, event_time): usage trend and usage report filters. (tool_id_number, action, event_time): latest
+    # checkout per tool (overdue returns); also serves plain tool ID lookups. (event_time, id): newest-first lists.
+    __table_args__ = (
+        db.Index('ix_checkout_history_action_time', 'action', 'event_time'),
+        db.Index('ix_checkout_history_tool_action_time', 'tool_id_number', 'action', 'event_time'),
+        db.Index('ix_checkout_history_time_id', 'event_time', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    tool_id_number = db.Column(db.String(64), nullable=False, index=True)
+    tool_id_number = db.Column(db.String(64), nullable=False)
     tool_name = db.Column(db.String(64), nullable=True)
     username = db.Column(db.String(128), nullable=False, index=True)
     action = db.Column(db.String(16), nullable=False)  # 'checkout' or 'checkin'
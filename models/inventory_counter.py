@@ -0,0 +1,23 @@
+#   inventory_counter.py - Materialized inventory counters (totals, out, per-category, per-status)
+
+from extensions import db
+from datetime import datetime
+
+
+class InventoryCounter(db.Model):
+    """One running count. Kept current by utils/inventory_counters.py in the same transaction as the tool write.
+
+    scope/key pairs: ('tools', 'total'), ('tools', 'checked_out'), ('category', <name>),
+    ('category_out', <name>), ('status', <name>), ('meta', 'initialized').
+    """
+    __tablename__ = "inventory_counters"
+    __table_args__ = (db.UniqueConstraint("scope", "key", name="uq_inventory_counters_scope_key"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(32), nullable=False)
+    key = db.Column(db.String(64), nullable=False)
+    value = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+    def __repr__(self):
+        return f"<InventoryCounter {self.scope}:{self.key}={self.value}>"
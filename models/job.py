@@ -0,0 +1,29 @@
+#   job.py - Background jobs (report exports, tool imports) run outside the request by utils/jobs.py
+
+from extensions import db
+from datetime import datetime
+
+
+class Job(db.Model):
+    """One background job. The row is the source of truth for status, so any worker process can answer a poll."""
+    __tablename__ = "jobs"
+
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    kind = db.Column(db.String(16), nullable=False)  # 'export' or 'import'
+    status = db.Column(db.String(16), nullable=False, default="queued", index=True)  # queued, running, done, failed
+    owner = db.Column(db.String(128), nullable=True, index=True)  # username that created the job
+    params = db.Column(db.Text, nullable=True)  # JSON
+    processed = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer, nullable=True)
+    result_path = db.Column(db.String(512), nullable=True)  # file in the spool directory
+    result_name = db.Column(db.String(128), nullable=True)  # download filename
+    error = db.Column(db.Text, nullable=True)
+    checkpoint = db.Column(db.Text, nullable=True)  # JSON written after each committed chunk; a resumed run starts here
+    worker = db.Column(db.String(128), nullable=True)  # "host:pid" of the process holding the queued/running job
+    heartbeat_at = db.Column(db.DateTime, nullable=True)  # refreshed by the holding process; stale jobs are resumed
+    created_at = db.Column(db.DateTime, default=datetime.now, nullable=False, index=True)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<Job {self.kind} {self.id} {self.status} {self.processed}/{self.total}>"
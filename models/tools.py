@@ -3,7 +3,12 @@
 from extensions import admin, db
 from flask_admin.contrib.sqla import ModelView
 from flask_admin.model.ajax import AjaxModelLoader
+from sqlalchemy.orm import mapped_column, validates
 from datetime import datetime
+from utils.calibration import parse_calibration_due
+
+# Dialects that build ix_tools_checked_out as a partial index (WHERE checked_out_by IS NOT NULL)
+PARTIAL_INDEX_DIALECTS = ('postgresql', 'sqlite')
 
 
 
@@ -12,21 +17,47 @@ from datetime import datetime
 
 class Tools(db.Model):
     """Model for tools. Supports AFI 21-101 / CTK: positive control, calibration, Master Inventory List (MIL)."""
+    # Keyset pagination for /api/tools: ORDER BY tool_name, id, optionally after an equality filter.
+    # uq_tools_tool_id_number backs lookups by tool ID and the import upsert (ON CONFLICT (tool_id_number)).
+    # ix_tools_checked_out is partial (PostgreSQL/SQLite): only checked-out tools, in keyset order, so the dashboard,
+    # overdue returns and /api/tools?checked_out=true never walk the whole table. Other dialects get a full index.
+    __table_args__ = (
+        db.Index('uq_tools_tool_id_number', 'tool_id_number', unique=True),
+        db.Index('ix_tools_name_id', 'tool_name', 'id'),
+        db.Index('ix_tools_category_name_id', 'category', 'tool_name', 'id'),
+        db.Index('ix_tools_location_name_id', 'tool_location', 'tool_name', 'id'),
+        db.Index('ix_tools_status_name_id', 'tool_status', 'tool_name', 'id'),
+        db.Index('ix_tools_checked_out', 'tool_name', 'id',
+                 postgresql_where=db.text('checked_out_by IS NOT NULL'),
+                 sqlite_where=db.text('checked_out_by IS NOT NULL')).ddl_if(dialect=PARTIAL_INDEX_DIALECTS),
+        db.Index('ix_tools_checked_out_by', 'checked_out_by', 'tool_name', 'id').ddl_if(
+            callable_=lambda ddl, target, bind, dialect, **kw: dialect.name not in PARTIAL_INDEX_DIALECTS),
+    )
+    # active_history on the columns inventory counters are keyed by: overwriting one on an expired (committed)
+    # tool loads the old value first, so utils/inventory_counters.py can subtract it instead of seeing no change
     id = db.Column(db.Integer, primary_key=True)
     tool_id_number = db.Column(db.String(64), nullable=False)
     tool_name = db.Column(db.String(64), nullable=False)
     tool_location = db.Column(db.String(64), nullable=False)
-    tool_status = db.Column(db.String(64), nullable=False)
+    tool_status = mapped_column(db.String(64), nullable=False, active_history=True)
     tool_calibration_due = db.Column(db.String(64), nullable=False)
+    # Parsed tool_calibration_due (NULL for N/A or unparseable); set automatically, used for indexed range queries
+    tool_calibration_due_date = db.Column(db.Date, nullable=True, index=True)
     tool_calibration_date = db.Column(db.String(64), nullable=False)
     tool_calibration_cert = db.Column(db.String(64), nullable=False)
     tool_calibration_schedule = db.Column(db.String(64), nullable=False)
-    checked_out_by = db.Column(db.String(128), nullable=True)  # username when checked out
-    category = db.Column(db.String(64), nullable=True)  # industry/category: Construction, Manufacturing, etc.
+    checked_out_by = mapped_column(db.String(128), nullable=True, active_history=True)  # username when checked out
+    category = mapped_column(db.String(64), nullable=True, active_history=True)  # industry/category: Construction, Manufacturing, etc.
     checkout_time = db.Column(db.DateTime, default=datetime.now)
     checkin_time = db.Column(db.DateTime, default=datetime.now)
-    
-    
+
+    @validates('tool_calibration_due')
+    def _sync_calibration_due_date(self, key, value):
+        """Keep tool_calibration_due_date in step with the display string."""
+        dt = parse_calibration_due(value)
+        self.tool_calibration_due_date = dt.date() if dt else None
+        return value
+
     def __repr__(self):
         return '<Tool {}, ID: {}, Location: {}, Status: {}, Calibration Due: {}, Calibration Date: {}, Calibration Cert: {}, Calibration Schedule: {}>'.format(self.tool_name, self.tool_id_number, self.tool_location, self.tool_status, self.tool_calibration_due, self.tool_calibration_date, self.tool_calibration_cert, self.tool_calibration_schedule, self.checkout_time, self.checkin_time)
     
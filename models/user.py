@@ -1,10 +1,10 @@
 #   user.py
 
-import bcrypt
 from extensions import admin, db
 from flask_admin.contrib.sqla import ModelView
 from flask_login import UserMixin
 from flask_admin.model.ajax import AjaxModelLoader
+from utils.passwords import hash_password, verify_password, needs_rehash
 
 
 
@@ -30,15 +30,15 @@ class User(db.Model, UserMixin):
 
 
     def set_password(self, password):
-        self.password_hash = bcrypt.hashpw(
-            password.encode('utf-8'), bcrypt.gensalt()
-        ).decode('utf-8')
+        """Hash at the configured cost (ATEMS_BCRYPT_ROUNDS) in the bounded hashing pool."""
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return bcrypt.checkpw(
-            password.encode('utf-8'),
-            self.password_hash.encode('utf-8')
-        )
+        return verify_password(password, self.password_hash)
+
+    def password_needs_rehash(self):
+        """True if the stored hash was made with a different cost than ATEMS_BCRYPT_ROUNDS."""
+        return needs_rehash(self.password_hash)
     
     def is_admin(self):
         """Check if user has admin role."""
@@ -7,8 +7,14 @@ from extensions import db
 from datetime import datetime, time
 from sqlalchemy.exc import SQLAlchemyError
 from utils.calibration import is_calibration_overdue
+from utils.inventory_counters import get_inventory_summary
+from utils.user_cache import invalidate_user, is_known_username
+import hashlib
+import hmac
 import logging
 import bcrypt
+from types import MappingProxyType
+from typing import Mapping, NamedTuple
 
 bp = Blueprint('main', __name__)
 logger = logging.getLogger(__name__)
@@ -23,47 +29,55 @@ _DEFAULT_USERS = {
     "user": ("user", "user123"),
 }
 
-_ENV_USERS = {}
+# Per-process key for the in-memory password digests (plain env passwords are not kept after startup)
+_ENV_DIGEST_KEY = os.urandom(32)
 
 
-def _load_env_users():
+class _EnvUser(NamedTuple):
+    role: str
+    digest: bytes
+
+
+def _env_digest(password: str) -> bytes:
+    return hmac.new(_ENV_DIGEST_KEY, password.encode("utf-8"), hashlib.sha256).digest()
+
+
+def _load_env_users() -> Mapping[str, _EnvUser]:
     """
-    Load environment-based credentials from env variables.
+    Load environment-based credentials from env variables, once per process.
     Format: ADMIN_USERNAME/ADMIN_PASSWORD, USER_USERNAME/USER_PASSWORD
-    Falls back to defaults if not configured.
+    Falls back to defaults if not configured. Returns a read-only username -> (role, password digest) map.
     """
-    global _ENV_USERS
-    _ENV_USERS = _DEFAULT_USERS.copy()  # Start with defaults
+    users = dict(_DEFAULT_USERS)  # Start with defaults
     
     # Admin credentials (override default)
     admin_user = os.getenv("ADMIN_USERNAME", "").strip()
     admin_pass = os.getenv("ADMIN_PASSWORD", "").strip()
     if admin_user and admin_pass:
-        _ENV_USERS[admin_user] = ("admin", admin_pass)
+        users[admin_user] = ("admin", admin_pass)
         logger.info(f"Loaded admin user from env: {admin_user}")
     
     # User credentials (override default)
     user_user = os.getenv("USER_USERNAME", "").strip()
     user_pass = os.getenv("USER_PASSWORD", "").strip()
     if user_user and user_pass:
-        _ENV_USERS[user_user] = ("user", user_pass)
+        users[user_user] = ("user", user_pass)
         logger.info(f"Loaded user from env: {user_user}")
     
-    logger.info(f"Auth system initialized with {len(_ENV_USERS)} environment-based users")
+    logger.info(f"Auth system initialized with {len(users)} environment-based users")
+    return MappingProxyType({name: _EnvUser(role, _env_digest(pw)) for name, (role, pw) in users.items()})
+
+
+_ENV_USERS = _load_env_users()
 
 
 def _check_env_password(username: str, password: str) -> tuple[bool, str]:
-    """Check credentials against environment-based users. Returns (success, role)."""
-    if not _ENV_USERS:
-        _load_env_users()
-    
-    if username not in _ENV_USERS:
+    """Check credentials against environment-based users (constant-time digest compare). Returns (success, role)."""
+    entry = _ENV_USERS.get(username)
+    if entry is None:
         return False, ""
-    
-    expected_role, expected_pass = _ENV_USERS[username]
-    if expected_pass == password:
-        return True, expected_role
-    
+    if hmac.compare_digest(entry.digest, _env_digest(password)):
+        return True, entry.role
     return False, ""
 
 @bp.app_context_processor
@@ -104,42 +118,22 @@ def dashboard():
     Independent query groups run in parallel when ATEMS_DASHBOARD_PARALLEL=1 (default on).
     """
     from flask import current_app
-    from utils.calibration import is_calibration_overdue
+    from utils.calibration import calibration_bucket_counts
     from sqlalchemy import func
     from datetime import timedelta, timezone
 
     try:
         _now = datetime.now(timezone.utc).replace(tzinfo=None)
         seven_days_ago = _now - timedelta(days=7)
-        today_str = _now.strftime('%Y-%m-%d')
-        d30 = (_now + timedelta(days=30)).strftime('%Y-%m-%d')
-        d60 = (_now + timedelta(days=60)).strftime('%Y-%m-%d')
 
         use_parallel = os.environ.get("ATEMS_DASHBOARD_PARALLEL", "1").strip().lower() in ("1", "true", "yes")
 
         if use_parallel:
             app = current_app._get_current_object()
 
-            def block_counts():
-                total = Tools.query.count()
-                checked_out = Tools.query.filter(Tools.checked_out_by.isnot(None)).count()
-                return (total, checked_out)
-
-            def block_cal_tools():
-                return Tools.query.filter(
-                    Tools.tool_calibration_due != "N/A",
-                    Tools.tool_calibration_due.isnot(None),
-                ).all()
-
             def block_recent():
                 return CheckoutHistory.query.order_by(CheckoutHistory.event_time.desc()).limit(10).all()
 
-            def block_category_breakdown():
-                rows = db.session.query(
-                    Tools.category, func.count(Tools.id).label('count')
-                ).filter(Tools.category.isnot(None), Tools.category != '').group_by(Tools.category).order_by(func.count(Tools.id).desc()).all()
-                return [{'name': c[0], 'count': c[1]} for c in rows]
-
             def block_usage_trend():
                 rows = db.session.query(
                     func.date(CheckoutHistory.event_time).label('day'),
@@ -156,25 +150,14 @@ def dashboard():
                 return get_overdue_returns_bulk(tools_out, _now, Tools, CheckoutHistory)
 
             from utils.performance import run_in_parallel
-            counts, cal_tools, recent, category_breakdown, usage_trend, overdue_returns = run_in_parallel(
+            inventory, cal_counts, recent, usage_trend, overdue_returns = run_in_parallel(
                 app,
-                [block_counts, block_cal_tools, block_recent, block_category_breakdown, block_usage_trend, block_overdue_returns],
+                [get_inventory_summary, calibration_bucket_counts, block_recent, block_usage_trend, block_overdue_returns],
             )
-            total, checked_out = counts
-            in_stock = total - checked_out
         else:
-            total = Tools.query.count()
-            checked_out = Tools.query.filter(Tools.checked_out_by.isnot(None)).count()
-            in_stock = total - checked_out
-            cal_tools = Tools.query.filter(
-                Tools.tool_calibration_due != "N/A",
-                Tools.tool_calibration_due.isnot(None),
-            ).all()
+            inventory = get_inventory_summary()
+            cal_counts = calibration_bucket_counts()
             recent = CheckoutHistory.query.order_by(CheckoutHistory.event_time.desc()).limit(10).all()
-            category_breakdown = db.session.query(
-                Tools.category, func.count(Tools.id).label('count')
-            ).filter(Tools.category.isnot(None), Tools.category != '').group_by(Tools.category).order_by(func.count(Tools.id).desc()).all()
-            category_breakdown = [{'name': c[0], 'count': c[1]} for c in category_breakdown]
             usage_rows = db.session.query(
                 func.date(CheckoutHistory.event_time).label('day'),
                 func.count(CheckoutHistory.id).label('count')
@@ -187,16 +170,16 @@ def dashboard():
             from utils.performance import get_overdue_returns_bulk
             overdue_returns = get_overdue_returns_bulk(tools_out, _now, Tools, CheckoutHistory)
 
-        calibration_overdue = sum(1 for t in cal_tools if is_calibration_overdue(t.tool_calibration_due))
-        cal_overdue = sum(1 for t in cal_tools if is_calibration_overdue(t.tool_calibration_due))
-        cal_due_30 = sum(1 for t in cal_tools if t.tool_calibration_due != 'N/A' and not is_calibration_overdue(t.tool_calibration_due) and today_str <= t.tool_calibration_due <= d30)
-        cal_due_60 = sum(1 for t in cal_tools if t.tool_calibration_due != 'N/A' and not is_calibration_overdue(t.tool_calibration_due) and d30 < t.tool_calibration_due <= d60)
-        cal_due_90 = sum(1 for t in cal_tools if t.tool_calibration_due != 'N/A' and not is_calibration_overdue(t.tool_calibration_due) and t.tool_calibration_due > d60)
+        total = inventory['total']
+        checked_out = inventory['checked_out']
+        in_stock = inventory['in_stock']
+        category_breakdown = [{'name': c['category'], 'count': c['total']} for c in inventory['by_category']]
+        calibration_overdue = cal_counts['overdue']
         calibration_summary = [
-            {'label': 'Overdue', 'count': cal_overdue, 'color': 'amber'},
-            {'label': 'Due in 30 days', 'count': cal_due_30, 'color': 'yellow'},
-            {'label': 'Due in 60 days', 'count': cal_due_60, 'color': 'blue'},
-            {'label': 'Due in 90+ days', 'count': cal_due_90, 'color': 'emerald'},
+            {'label': 'Overdue', 'count': cal_counts['overdue'], 'color': 'amber'},
+            {'label': 'Due in 30 days', 'count': cal_counts['due_30'], 'color': 'yellow'},
+            {'label': 'Due in 60 days', 'count': cal_counts['due_60'], 'color': 'blue'},
+            {'label': 'Due in 90+ days', 'count': cal_counts['due_90'], 'color': 'emerald'},
         ]
         categories = [c['name'] for c in category_breakdown]
         max_usage = max((u['count'] for u in usage_trend), default=1)
@@ -279,15 +262,26 @@ def login():
                     flash('Login system error. Please try again.', 'error')
                     return render_template('login.html')
             
+            invalidate_user(user.id)  # a fresh login always reloads the row (picks up role changes from other workers)
             login_user(user)
             logger.info(f"User '{username}' logged in via environment-based credentials as {env_role}")
             flash(f'Welcome back, {user.username}!', 'success')
             next_page = request.args.get('next') or url_for('main.dashboard')
             return redirect(next_page)
         
-        # Step 2: Check database-backed users
-        user = User.query.filter_by(username=username).first()
+        # Step 2: Check database-backed users (names no user has skip the query, so guessing costs no DB load)
+        user = User.query.filter_by(username=username).first() if is_known_username(username) else None
         if user and user.check_password(password):
+            if user.password_needs_rehash():
+                # Cost factor changed (ATEMS_BCRYPT_ROUNDS): upgrade the stored hash now that we have the password
+                user.set_password(password)
+                try:
+                    db.session.commit()
+                    logger.info(f"Rehashed password for '{username}' at the configured bcrypt cost")
+                except SQLAlchemyError as e:
+                    db.session.rollback()
+                    logger.warning(f"Could not rehash password for '{username}': {e}")
+            invalidate_user(user.id)
             login_user(user)
             logger.info(f"User '{username}' logged in via database-backed credentials as {user.role}")
             flash(f'Welcome back, {user.username}!', 'success')
@@ -301,6 +295,22 @@ def login():
     return render_template('login.html')
 
 
+def hashing_busy(e):
+    """
+    Password hashing queue full (utils/passwords.py): ask the client to retry instead of piling up CPU work.
+    Registered app-wide in create_app(), since set_password also runs in Flask-Admin user forms.
+    """
+    logger.warning("Password hashing queue full, rejected %s %s", request.method, request.path)
+    headers = {'Retry-After': '2'}
+    if request.path.startswith('/api/'):
+        return jsonify(error='busy', message='Password hashing is busy. Please retry shortly.'), 503, headers
+    if request.endpoint == 'main.login':
+        flash('Login is busy right now. Please try again in a few seconds.', 'error')
+        return render_template('login.html'), 503, headers
+    headers['Content-Type'] = 'text/plain; charset=utf-8'
+    return 'Password hashing is busy right now. Please try again in a few seconds.', 503, headers
+
+
 @bp.route('/logout')
 def logout():
     logout_user()
@@ -309,69 +319,28 @@ def logout():
 
 
 def _checkinout_logic(form, json_response=True):
-    """Shared logic for form and API check-in/out. Returns (status, message, extra)."""
-    user = User.query.filter_by(username=form.username.data).first()
-    tool = Tools.query.filter_by(tool_id_number=form.tool_id_number.data).first()
-
-    if not user:
-        return "error", f"User '{form.username.data}' not found. Check the username.", None
-    if not tool:
-        return "error", f"Tool '{form.tool_id_number.data}' not found. Check the tool ID.", None
-    if form.badge_id.data != user.badge_id:
-        return "error", f"Badge ID does not match user '{user.username}'. Please scan the correct badge.", None
-
-    now = datetime.now()
-    extra = {}
-
-    job_id = (form.job_id.data or "").strip() or None
-    condition_val = (form.condition.data or "").strip() or None
-
-    if tool.checked_out_by == user.username:
-        # Check in
-        tool.checked_out_by = None
-        tool.checkin_time = now
-        hist = CheckoutHistory(
-            tool_id_number=tool.tool_id_number,
-            tool_name=tool.tool_name,
-            username=user.username,
-            action="checkin",
-            event_time=now,
-            job_id=job_id,
-            condition=condition_val,
-        )
-        db.session.add(hist)
+    """Shared logic for form and API check-in/out. Returns (status, message, extra). One locked transaction."""
+    from utils.checkinout import apply_scan
+
+    return_by_dt = None
+    if getattr(form, 'return_by', None) and form.return_by.data:
+        d = form.return_by.data
+        if hasattr(d, 'year'):
+            return_by_dt = datetime.combine(d, time(23, 59, 59))
+    status, message, extra = apply_scan(
+        db.session,
+        username=form.username.data,
+        badge_id=form.badge_id.data,
+        tool_id_number=form.tool_id_number.data,
+        job_id=(form.job_id.data or "").strip() or None,
+        condition=(form.condition.data or "").strip() or None,
+        return_by=return_by_dt,
+    )
+    if status == "success":
         db.session.commit()
-        logger.info(f"Tool {tool.tool_id_number} checked in by {user.username}")
-        return "success", f"Tool {tool.tool_name} checked in.", extra
     else:
-        # Check out
-        cal_warning = is_calibration_overdue(tool.tool_calibration_due)
-        if cal_warning:
-            extra["calibration_warning"] = "This tool is overdue for calibration."
-        tool.checked_out_by = user.username
-        tool.checkout_time = now
-        return_by_dt = None
-        if getattr(form, 'return_by', None) and form.return_by.data:
-            d = form.return_by.data
-            if hasattr(d, 'year'):
-                return_by_dt = datetime.combine(d, time(23, 59, 59))
-        hist = CheckoutHistory(
-            tool_id_number=tool.tool_id_number,
-            tool_name=tool.tool_name,
-            username=user.username,
-            action="checkout",
-            event_time=now,
-            job_id=job_id,
-            condition=condition_val,
-            return_by=return_by_dt,
-        )
-        db.session.add(hist)
-        db.session.commit()
-        logger.info(f"Tool {tool.tool_id_number} checked out by {user.username}")
-        msg = f"Tool {tool.tool_name} checked out."
-        if cal_warning:
-            msg += " ⚠ Calibration overdue."
-        return "success", msg, extra
+        db.session.rollback()  # release the tool row lock
+    return status, message, extra
 
 
 @bp.route('/checkinout', methods=['GET', 'POST'])
@@ -480,17 +449,18 @@ def import_page():
 @bp.route('/api/import/preview', methods=['POST'])
 @login_required
 def api_import_preview():
-    """Parse uploaded file and return validated rows + errors (no DB write)."""
-    from utils.import_tools import parse_and_validate_tools
+    """Validate the upload until the first 100 valid rows are found and return them + errors (no DB write)."""
+    from utils.import_tools import preview_tools
     if 'file' not in request.files:
         return jsonify(valid=[], errors=[{"row": 0, "message": "No file uploaded."}]), 200
     f = request.files['file']
     if not f.filename:
         return jsonify(valid=[], errors=[{"row": 0, "message": "No file selected."}]), 200
     try:
-        content = f.read()
-        valid, errors = parse_and_validate_tools(content, f.filename)
-        return jsonify(valid=valid[:100], errors=errors, total_valid=len(valid), total_errors=len(errors))
+        p = preview_tools(f.stream, f.filename, limit=100)
+        # total_* cover the rows scanned; complete=False means the file continues past the preview
+        return jsonify(valid=p['valid'], errors=p['errors'], warnings=p['warnings'], total_valid=len(p['valid']),
+                       total_errors=len(p['errors']), rows_scanned=p['rows_scanned'], complete=p['complete'])
     except Exception as e:
         return jsonify(valid=[], errors=[{"row": 0, "message": str(e)}]), 200
 
@@ -498,26 +468,98 @@ def api_import_preview():
 @bp.route('/api/import/tools', methods=['POST'])
 @login_required
 def api_import_tools():
-    """Import tools from uploaded CSV or Excel. Returns created, updated, errors."""
-    from utils.import_tools import parse_and_validate_tools, import_tools_rows
+    """
+    Import tools from uploaded CSV or Excel, streamed in batches. Returns created, updated, errors.
+    With async=1 (query or form) the upload is queued as a background job instead (see api_import_jobs_create).
+    """
+    from utils.import_tools import iter_tool_batches, import_tools_rows, IMPORT_CHUNK_SIZE
+    if (request.values.get('async') or '').lower() in ('1', 'true', 'yes'):
+        return api_import_jobs_create()
     if 'file' not in request.files:
         return jsonify(created=0, updated=0, errors=[{"row": 0, "message": "No file uploaded."}]), 400
     f = request.files['file']
     if not f.filename:
         return jsonify(created=0, updated=0, errors=[{"row": 0, "message": "No file selected."}]), 400
     try:
-        content = f.read()
-        valid, parse_errors = parse_and_validate_tools(content, f.filename)
-        if parse_errors and not valid:
-            return jsonify(created=0, updated=0, errors=parse_errors), 400
-        created, updated, import_errors = import_tools_rows(valid)
-        all_errors = parse_errors + import_errors
-        return jsonify(created=created, updated=updated, errors=all_errors, total=len(valid))
+        created = updated = total = 0
+        all_errors, all_warnings, chunks = [], [], []
+        for valid, row_nums, parse_errors, warnings in iter_tool_batches(f.stream, f.filename, IMPORT_CHUNK_SIZE):
+            all_errors.extend(parse_errors)
+            all_warnings.extend(warnings)
+            if not valid:
+                continue
+            c, u, import_errors = import_tools_rows(
+                valid, row_numbers=row_nums, on_chunk=lambda st: chunks.append(dict(st, chunk=len(chunks) + 1)))
+            created, updated, total = created + c, updated + u, total + len(valid)
+            all_errors.extend(import_errors)
+        if all_errors and not total:
+            return jsonify(created=0, updated=0, errors=all_errors), 400
+        return jsonify(created=created, updated=updated, errors=all_errors, warnings=all_warnings, total=total,
+                       chunks=chunks)
     except Exception as e:
         logger.exception("Import tools failed")
         return jsonify(created=0, updated=0, errors=[{"row": 0, "message": str(e)}]), 400  # noqa: B950
 
 
+@bp.route('/api/import/jobs', methods=['POST'])
+@login_required
+def api_import_jobs_create():
+    """Spool the upload and import it in the background. Returns 202 with the job ID and status_url."""
+    from flask import current_app
+    from utils.jobs import new_job_id, spool_path, submit_job, job_to_dict
+    if 'file' not in request.files or not request.files['file'].filename:
+        return jsonify(errors=[{"row": 0, "message": "No file uploaded."}]), 400
+    f = request.files['file']
+    ext = 'xlsx' if f.filename.lower().endswith(('.xlsx', '.xls')) else 'csv'
+    job_id = new_job_id()
+    path = spool_path(job_id, f'upload.{ext}')
+    try:
+        f.save(path)
+        job = submit_job(
+            current_app._get_current_object(), 'import',
+            {'upload_path': path, 'filename': f.filename}, owner=current_user.username, job_id=job_id,
+        )
+    except (OSError, SQLAlchemyError) as e:
+        db.session.rollback()
+        logger.exception("api_import_jobs_create: %s", e)
+        return jsonify(errors=[{"row": 0, "message": "Could not queue import."}]), 500
+    status_url = url_for('main.api_import_jobs_status', job_id=job.id)
+    return jsonify(dict(job_to_dict(job), status_url=status_url)), 202, {'Location': status_url}
+
+
+@bp.route('/api/import/jobs/<job_id>')
+@login_required
+def api_import_jobs_status(job_id):
+    """Import job status: progress plus created, updated and errors so far (from the last checkpoint)."""
+    from utils.jobs import job_to_dict
+    job = _visible_job(job_id)
+    if job is None or job.kind != 'import':
+        return jsonify(error='Job not found'), 404
+    body = job_to_dict(job)
+    cp = body.pop('checkpoint') or {}
+    body.update(
+        created=cp.get('created', 0), updated=cp.get('updated', 0),
+        errors=cp.get('errors', []), error_count=cp.get('error_count', 0),
+        warnings=cp.get('warnings', []), warning_count=cp.get('warning_count', 0),
+        last_row=cp.get('row', 0), chunks=cp.get('chunks', []),
+    )
+    return jsonify(body)
+
+
+@bp.route('/api/import/jobs/<job_id>/resume', methods=['POST'])
+@login_required
+def api_import_jobs_resume(job_id):
+    """Restart a failed import from its last checkpoint."""
+    from flask import current_app
+    from utils.jobs import resume_job
+    job = _visible_job(job_id)
+    if job is None or job.kind != 'import':
+        return jsonify(error='Job not found'), 404
+    if not resume_job(current_app._get_current_object(), job_id):
+        return jsonify(error='Only failed jobs can be resumed', status=job.status), 409
+    return jsonify(id=job_id, status='queued', status_url=url_for('main.api_import_jobs_status', job_id=job_id)), 202
+
+
 @bp.route('/api/calibration-reminders/status')
 @login_required
 def api_calibration_reminders_status():
@@ -526,22 +568,16 @@ def api_calibration_reminders_status():
         is_mail_configured,
         get_reminder_days,
         get_remind_overdue,
-        get_due_and_overdue_tools,
+        get_due_and_overdue_counts,
     )
-    from models.tools import Tools
-    tools = Tools.query.filter(
-        Tools.tool_calibration_due.isnot(None),
-        Tools.tool_calibration_due != "",
-        Tools.tool_calibration_due != "N/A",
-    ).all()
-    overdue, due_soon = get_due_and_overdue_tools(tools)
+    overdue_count, due_soon_count = get_due_and_overdue_counts()
     return jsonify(
         mail_configured=is_mail_configured(),
         reminder_days=get_reminder_days(),
         remind_overdue=get_remind_overdue(),
-        overdue_count=len(overdue),
-        due_soon_count=len(due_soon),
-        total=len(overdue) + len(due_soon),
+        overdue_count=overdue_count,
+        due_soon_count=due_soon_count,
+        total=overdue_count + due_soon_count,
     )
 
 
@@ -559,37 +595,16 @@ def api_calibration_reminders_send():
 @bp.route('/api/reports/usage')
 @login_required
 def api_reports_usage():
-    """Tool usage report: checkout history with optional date range and limit."""
-    from sqlalchemy import and_
+    """Tool usage report: checkout history with optional date range and limit (full history: export jobs)."""
+    from utils.reports import apply_usage_filters, USAGE_FILTERS
     try:
         limit = min(max(1, int(request.args.get('limit', 500))), 2000)
     except (TypeError, ValueError):
         limit = 500
-    date_from = request.args.get('date_from')  # YYYY-MM-DD
-    date_to = request.args.get('date_to')
-    username = request.args.get('username', '').strip()
-    tool_id = request.args.get('tool_id', '').strip()
-    action = request.args.get('action', '').strip()  # checkout or checkin
-    q = CheckoutHistory.query.order_by(CheckoutHistory.event_time.desc())
-    if date_from:
-        try:
-            q = q.filter(CheckoutHistory.event_time >= datetime.strptime(date_from, '%Y-%m-%d'))
-        except ValueError:
-            pass
-    if date_to:
-        try:
-            end = datetime.strptime(date_to, '%Y-%m-%d')
-            from datetime import timedelta
-            end = end.replace(hour=23, minute=59, second=59, microsecond=999999)
-            q = q.filter(CheckoutHistory.event_time <= end)
-        except ValueError:
-            pass
-    if username:
-        q = q.filter(CheckoutHistory.username.ilike(f'%{username}%'))
-    if tool_id:
-        q = q.filter(CheckoutHistory.tool_id_number.ilike(f'%{tool_id}%'))
-    if action:
-        q = q.filter(CheckoutHistory.action == action)
+    q = apply_usage_filters(
+        CheckoutHistory.query.order_by(CheckoutHistory.event_time.desc()),
+        {k: request.args.get(k) for k in USAGE_FILTERS},
+    )
     try:
         events = q.limit(limit).all()
         return jsonify(events=[
@@ -615,7 +630,8 @@ def api_reports_usage():
 @login_required
 def api_reports_calibration():
     """Calibration report: tools due, overdue, by category."""
-    from utils.calibration import is_calibration_overdue
+    from utils.calibration import is_calibration_overdue, calibration_today
+    today = calibration_today()
     cal_tools = Tools.query.filter(
         Tools.tool_calibration_due != 'N/A',
         Tools.tool_calibration_due.isnot(None),
@@ -631,7 +647,7 @@ def api_reports_calibration():
             'tool_calibration_due': t.tool_calibration_due,
             'tool_status': t.tool_status,
         }
-        if is_calibration_overdue(t.tool_calibration_due):
+        if is_calibration_overdue(t.tool_calibration_due, today):
             overdue.append(row)
         else:
             due_soon.append(row)
@@ -662,283 +678,210 @@ def api_reports_overdue_returns():
 @bp.route('/api/reports/inventory')
 @login_required
 def api_reports_inventory():
-    """Inventory report: tools by status and category."""
-    from sqlalchemy import func
-    total = Tools.query.count()
-    checked_out = Tools.query.filter(Tools.checked_out_by.isnot(None)).count()
-    in_stock = total - checked_out
-    by_category_rows = db.session.query(
-        Tools.category,
-        func.count(Tools.id).label('total'),
-    ).filter(Tools.category.isnot(None), Tools.category != '').group_by(Tools.category).order_by(func.count(Tools.id).desc()).all()
-    out_by_cat = db.session.query(
-        Tools.category,
-        func.count(Tools.id).label('out'),
-    ).filter(Tools.category.isnot(None), Tools.category != '', Tools.checked_out_by.isnot(None)).group_by(Tools.category).all()
-    out_map = {c[0]: c[1] for c in out_by_cat}
-    by_category = [{'category': c[0], 'total': c[1], 'checked_out': out_map.get(c[0], 0), 'in_stock': c[1] - out_map.get(c[0], 0)} for c in by_category_rows]
-    by_status = db.session.query(Tools.tool_status, func.count(Tools.id)).group_by(Tools.tool_status).all()
+    """Inventory report: tools by status and category (from the inventory counters, no table scan)."""
+    inventory = get_inventory_summary()
     return jsonify(
-        total=total,
-        in_stock=in_stock,
-        checked_out=checked_out,
-        by_category=by_category,
-        by_status=[{'status': s[0], 'count': s[1]} for s in by_status],
+        total=inventory['total'],
+        in_stock=inventory['in_stock'],
+        checked_out=inventory['checked_out'],
+        by_category=inventory['by_category'],
+        by_status=inventory['by_status'],
     )
 
 
 @bp.route('/api/reports/export')
 @login_required
 def api_reports_export():
-    """Export report as CSV, PDF, or Excel (format=csv|pdf|xlsx)."""
-    from flask import Response
-    import csv
-    import io
+    """Export report as CSV, PDF, or Excel (format=csv|pdf|xlsx). CSV is streamed as rows come off the cursor."""
+    from flask import Response, send_file, stream_with_context
+    from itertools import chain
+    from utils import reports
+    from utils.report_export import csv_stream, pdf_tempfile, xlsx_tempfile, XLSX_MIMETYPE
 
     report_type = request.args.get('type', 'usage')
     fmt = request.args.get('format', 'csv').lower()
     if fmt not in ('csv', 'pdf', 'xlsx'):
         fmt = 'csv'
+    spec = reports.REPORT_SPECS.get(report_type)
+    if spec is None:
+        return jsonify(error='Invalid report type'), 400
 
-    if report_type == 'usage':
-        try:
-            limit = min(max(1, int(request.args.get('limit', 2000))), 5000)
-        except (TypeError, ValueError):
-            limit = 2000
-        try:
-            events = CheckoutHistory.query.order_by(CheckoutHistory.event_time.desc()).limit(limit).all()
-        except SQLAlchemyError as e:
-            db.session.rollback()
-            logger.exception("api_reports_export usage: %s", e)
-            return jsonify(error="Database error"), 500
-        headers = ['Event Time', 'Action', 'Tool ID', 'Tool Name', 'User', 'Job ID', 'Condition', 'Return By']
-        rows = [
-            [
-                e.event_time.strftime('%Y-%m-%d %H:%M') if e.event_time else '',
-                e.action,
-                e.tool_id_number or '',
-                e.tool_name or '',
-                e.username or '',
-                e.job_id or '',
-                e.condition or '',
-                e.return_by.strftime('%Y-%m-%d') if getattr(e, 'return_by', None) and e.return_by else '',
-            ]
-            for e in events
-        ]
-        try:
-            if fmt == 'pdf':
-                from utils.report_export import pdf_table
-                data = pdf_table(headers, rows, title="ATEMS Tool Usage Report")
-                return Response(data, mimetype='application/pdf', headers={'Content-Disposition': 'attachment; filename=atems_usage_report.pdf'})
-            if fmt == 'xlsx':
-                from utils.report_export import xlsx_table
-                data = xlsx_table(headers, rows, sheet_name="Usage")
-                return Response(data, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', headers={'Content-Disposition': 'attachment; filename=atems_usage_report.xlsx'})
-            buf = io.StringIO()
-            w = csv.writer(buf)
-            w.writerow(headers)
-            for r in rows:
-                w.writerow(r)
-            return Response(buf.getvalue(), mimetype='text/csv', headers={'Content-Disposition': 'attachment; filename=atems_usage_report.csv'})
-        except Exception as ex:
-            logger.exception("api_reports_export usage %s: %s", fmt, ex)
-            return jsonify(error="Export failed. Please try again."), 500
-    elif report_type == 'overdue-returns':
-        from datetime import timezone
-        from utils.performance import get_overdue_returns_bulk
-        _now = datetime.now(timezone.utc).replace(tzinfo=None)
-        tools_out = Tools.query.filter(Tools.checked_out_by.isnot(None)).all()
-        raw = get_overdue_returns_bulk(tools_out, _now, Tools, CheckoutHistory)
-        headers = ['Tool ID', 'Tool Name', 'Checked out by', 'Return by']
-        rows = [
-            [
-                r["tool_id_number"] or '',
-                r["tool_name"] or '',
-                r["username"] or '',
-                r["return_by"].strftime('%Y-%m-%d') if r["return_by"] else '',
-            ]
-            for r in raw
-        ]
-        try:
-            if fmt == 'pdf':
-                from utils.report_export import pdf_table
-                data = pdf_table(headers, rows, title="ATEMS Overdue Returns")
-                return Response(data, mimetype='application/pdf', headers={'Content-Disposition': 'attachment; filename=atems_overdue_returns.pdf'})
-            if fmt == 'xlsx':
-                from utils.report_export import xlsx_table
-                data = xlsx_table(headers, rows, sheet_name="Overdue Returns")
-                return Response(data, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', headers={'Content-Disposition': 'attachment; filename=atems_overdue_returns.xlsx'})
-            buf = io.StringIO()
-            w = csv.writer(buf)
-            w.writerow(headers)
-            for r in rows:
-                w.writerow(r)
-            return Response(buf.getvalue(), mimetype='text/csv', headers={'Content-Disposition': 'attachment; filename=atems_overdue_returns.csv'})
-        except Exception as ex:
-            logger.exception("api_reports_export overdue-returns %s: %s", fmt, ex)
-            return jsonify(error="Export failed. Please try again."), 500
-    elif report_type == 'calibration':
-        from utils.calibration import is_calibration_overdue
-        cal_tools = Tools.query.filter(
-            Tools.tool_calibration_due != 'N/A',
-            Tools.tool_calibration_due.isnot(None),
-        ).order_by(Tools.tool_calibration_due).all()
-        headers = ['Tool ID', 'Tool Name', 'Location', 'Category', 'Calibration Due', 'Status', 'Overdue']
-        rows = [
-            [
-                t.tool_id_number,
-                t.tool_name or '',
-                t.tool_location or '',
-                t.category or '',
-                t.tool_calibration_due or '',
-                t.tool_status or '',
-                'Yes' if is_calibration_overdue(t.tool_calibration_due) else 'No',
-            ]
-            for t in cal_tools
-        ]
-        try:
-            if fmt == 'pdf':
-                from utils.report_export import pdf_table
-                data = pdf_table(headers, rows, title="ATEMS Calibration Report")
-                return Response(data, mimetype='application/pdf', headers={'Content-Disposition': 'attachment; filename=atems_calibration_report.pdf'})
-            if fmt == 'xlsx':
-                from utils.report_export import xlsx_table
-                data = xlsx_table(headers, rows, sheet_name="Calibration")
-                return Response(data, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', headers={'Content-Disposition': 'attachment; filename=atems_calibration_report.xlsx'})
-            buf = io.StringIO()
-            w = csv.writer(buf)
-            w.writerow(headers)
-            for r in rows:
-                w.writerow(r)
-            return Response(buf.getvalue(), mimetype='text/csv', headers={'Content-Disposition': 'attachment; filename=atems_calibration_report.csv'})
-        except Exception as ex:
-            logger.exception("api_reports_export calibration %s: %s", fmt, ex)
-            return jsonify(error="Export failed. Please try again."), 500
-    elif report_type == 'inventory':
-        tools = Tools.query.order_by(Tools.category, Tools.tool_id_number).all()
-        headers = ['Tool ID', 'Tool Name', 'Location', 'Category', 'Status', 'Checked Out By', 'Calibration Due']
-        rows = [
-            [
-                t.tool_id_number,
-                t.tool_name or '',
-                t.tool_location or '',
-                t.category or '',
-                t.tool_status or '',
-                t.checked_out_by or '',
-                t.tool_calibration_due or '',
-            ]
-            for t in tools
-        ]
-        try:
-            if fmt == 'pdf':
-                from utils.report_export import pdf_table
-                data = pdf_table(headers, rows, title="ATEMS Inventory Report")
-                return Response(data, mimetype='application/pdf', headers={'Content-Disposition': 'attachment; filename=atems_inventory_report.pdf'})
-            if fmt == 'xlsx':
-                from utils.report_export import xlsx_table
-                data = xlsx_table(headers, rows, sheet_name="Inventory")
-                return Response(data, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', headers={'Content-Disposition': 'attachment; filename=atems_inventory_report.xlsx'})
-            buf = io.StringIO()
-            w = csv.writer(buf)
-            w.writerow(headers)
-            for r in rows:
-                w.writerow(r)
-            return Response(buf.getvalue(), mimetype='text/csv', headers={'Content-Disposition': 'attachment; filename=atems_inventory_report.csv'})
-        except Exception as ex:
-            logger.exception("api_reports_export inventory %s: %s", fmt, ex)
-            return jsonify(error="Export failed. Please try again."), 500
-    return jsonify(error='Invalid report type'), 400
+    try:
+        limit = None
+        if report_type == 'usage':
+            try:
+                limit = min(max(1, int(request.args.get('limit', 2000))), 5000)
+            except (TypeError, ValueError):
+                limit = 2000
+        headers, rows = reports.report_rows(report_type, limit=limit)
+        # Run the query now so DB errors still get a JSON 500 instead of a truncated download.
+        first = next(rows, None)
+        if first is not None:
+            rows = chain([first], rows)
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.exception("api_reports_export %s: %s", report_type, e)
+        return jsonify(error="Database error"), 500
+
+    filename = spec['filename']
+    try:
+        # PDF and Excel go to an anonymous temp file, sent in blocks (deleted when the response closes)
+        if fmt == 'pdf':
+            f = pdf_tempfile(headers, rows, title=spec['title'])
+            return send_file(f, mimetype='application/pdf', as_attachment=True, download_name=f'{filename}.pdf')
+        if fmt == 'xlsx':
+            f = xlsx_tempfile(headers, rows, sheet_name=spec['sheet'])
+            return send_file(f, mimetype=XLSX_MIMETYPE, as_attachment=True, download_name=f'{filename}.xlsx')
+    except Exception as ex:
+        logger.exception("api_reports_export %s %s: %s", report_type, fmt, ex)
+        return jsonify(error="Export failed. Please try again."), 500
+    return Response(
+        stream_with_context(csv_stream(headers, rows)),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename={filename}.csv'},
+    )
+
+
+def _visible_job(job_id):
+    """Job row if it exists and belongs to the current user (admins see all), else None."""
+    from models.job import Job
+    job = db.session.get(Job, job_id)
+    if job is None:
+        return None
+    if job.owner != current_user.username and not current_user.is_admin():
+        return None
+    return job
+
+
+@bp.route('/api/reports/export-jobs', methods=['POST'])
+@login_required
+def api_export_jobs_create():
+    """Start a background export with no row cap. Body (JSON or form): type, format, and usage filters."""
+    from flask import current_app
+    from utils import reports
+    from utils.jobs import submit_job, job_to_dict
+
+    data = request.get_json(silent=True) or request.form
+    report_type = data.get('type', 'usage')
+    fmt = (data.get('format') or 'csv').lower()
+    if report_type not in reports.REPORT_SPECS:
+        return jsonify(error='Invalid report type'), 400
+    if fmt not in ('csv', 'pdf', 'xlsx'):
+        return jsonify(error='Invalid format'), 400
+    filters = {k: data.get(k) for k in reports.USAGE_FILTERS if data.get(k)} if report_type == 'usage' else {}
+    try:
+        job = submit_job(
+            current_app._get_current_object(), 'export',
+            {'type': report_type, 'format': fmt, 'filters': filters},
+            owner=current_user.username,
+        )
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.exception("api_export_jobs_create: %s", e)
+        return jsonify(error="Database error"), 500
+    status_url = url_for('main.api_export_jobs_status', job_id=job.id)
+    return jsonify(dict(job_to_dict(job), status_url=status_url)), 202, {'Location': status_url}
+
+
+@bp.route('/api/reports/export-jobs/<job_id>')
+@login_required
+def api_export_jobs_status(job_id):
+    """Export job status and progress; download_url once status is done."""
+    from utils.jobs import job_to_dict
+    job = _visible_job(job_id)
+    if job is None:
+        return jsonify(error='Job not found'), 404
+    body = job_to_dict(job)
+    if job.status == 'done':
+        body['download_url'] = url_for('main.api_export_jobs_download', job_id=job.id)
+    return jsonify(body)
+
+
+@bp.route('/api/reports/export-jobs/<job_id>/download')
+@login_required
+def api_export_jobs_download(job_id):
+    """Download a finished export file."""
+    from flask import send_file
+    job = _visible_job(job_id)
+    if job is None:
+        return jsonify(error='Job not found'), 404
+    if job.status != 'done' or not job.result_path or not os.path.exists(job.result_path):
+        return jsonify(error='Export not ready', status=job.status), 409
+    return send_file(job.result_path, as_attachment=True, download_name=job.result_name)
 
 
 @bp.route('/api/logs')
 @login_required
 def api_logs():
-    """API endpoint for log retrieval with filtering."""
+    """
+    API endpoint for log retrieval with filtering: newest `limit` records. Filters: level, search (message
+    substring), since/until (ISO date/time). atems.log and its rotated files are read backwards from the end; it
+    is the only source that covers every Gunicorn worker. With ATEMS_LOG_JSON=1, source=memory answers from this
+    worker's in-memory ring buffer instead (only this worker's records; falls back to the file when the buffer
+    cannot hold the full answer).
+    """
+    from utils.log_pipeline import ring_buffer
+    from utils.log_reader import LogQuery, normalize_time, query_logs, query_records
     try:
-        import os
-        
         # Get parameters (validate to avoid ValueError)
         try:
             limit = min(max(1, int(request.args.get('limit', 250))), 1000)
         except (TypeError, ValueError):
             limit = 250
-        level = request.args.get('level', '').upper()
-        search = request.args.get('search', '').lower()
-        
-        # Read atems.log
-        log_file = os.path.join(os.path.dirname(__file__), 'atems.log')
-        if not os.path.exists(log_file):
-            return jsonify({'logs': [], 'count': 0})
-        
-        # Parse log file
-        logs = []
-        with open(log_file, 'r', encoding='utf-8') as f:
-            for line in f.readlines()[-limit*2:]:  # Read more than limit to account for filtering
-                line = line.strip()
-                if not line:
-                    continue
-                
-                # Parse log format: "timestamp - name - level - message"
-                try:
-                    parts = line.split(' - ', 3)
-                    if len(parts) >= 4:
-                        timestamp, name, log_level, message = parts
-                        
-                        # Apply filters
-                        if level and log_level != level:
-                            continue
-                        if search and search not in message.lower():
-                            continue
-                        
-                        logs.append({
-                            'timestamp': timestamp,
-                            'name': name,
-                            'level': log_level,
-                            'message': message
-                        })
-                except Exception as parse_err:
-                    logger.debug("Log line parse failed: %s", parse_err)
-                    # If parsing fails, include raw line
-                    logs.append({
-                        'timestamp': '',
-                        'name': '',
-                        'level': 'INFO',
-                        'message': line
-                    })
-        
-        # Limit results
-        logs = logs[-limit:]
-        
-        return jsonify({
-            'logs': logs,
-            'count': len(logs)
-        })
+        query = LogQuery(
+            limit=limit,
+            level=request.args.get('level', '').upper(),
+            search=request.args.get('search', '').lower(),
+            since=normalize_time(request.args.get('since')),
+            until=normalize_time(request.args.get('until')),
+        )
+        ring = ring_buffer() if request.args.get('source') == 'memory' else None
+        if ring is not None:
+            records = ring.snapshot()
+            result = query_records(records, query, records[0]['timestamp'] if records else None)
+            if result is not None:
+                return jsonify(**result, source='memory')
+        result = query_logs(os.path.join(os.path.dirname(__file__), 'atems.log'), query)
+        return jsonify(**result, source='file')
     except Exception as e:
         logger.error(f"Error fetching logs: {e}")
         return jsonify({'error': str(e), 'logs': [], 'count': 0}), 500
 
 
+@bp.route('/api/logs/slow-queries')
+@login_required
+def api_slow_queries():
+    """
+    Slowest SQL statements recorded by the opt-in profiler in this worker process (utils/sql_profiler.py), with
+    their EXPLAIN plans. Admin only: statements reveal the schema and the routes that run them.
+    """
+    from utils.sql_profiler import SLOW_QUERY_COUNT, SLOW_QUERY_MIN_MS, profile_all_enabled, slow_queries
+
+    if not current_user.is_admin():
+        return jsonify(error='Admin only'), 403
+    return jsonify(
+        queries=slow_queries(),
+        capacity=SLOW_QUERY_COUNT,
+        min_ms=SLOW_QUERY_MIN_MS,
+        profile_all=profile_all_enabled(),
+    )
+
+
 @bp.route('/api/stats')
 @login_required
 def api_stats():
     """Inventory stats for dashboard (tools out, overdue, calibration due)."""
-    from utils.calibration import is_calibration_overdue
+    from utils.calibration import calibration_bucket_counts
 
     try:
-        total = Tools.query.count()
-        checked_out = Tools.query.filter(Tools.checked_out_by.isnot(None)).count()
-        in_stock = total - checked_out
-        cal_tools = Tools.query.filter(
-            Tools.tool_calibration_due != "N/A",
-            Tools.tool_calibration_due.isnot(None),
-        ).all()
-        calibration_overdue = sum(1 for t in cal_tools if is_calibration_overdue(t.tool_calibration_due))
+        inventory = get_inventory_summary()
+        cal_counts = calibration_bucket_counts()
         return jsonify(
-            total_tools=total,
-            checked_out=checked_out,
-            in_stock=in_stock,
-            calibrated_tools=len(cal_tools),
-            calibration_overdue=calibration_overdue,
+            total_tools=inventory['total'],
+            checked_out=inventory['checked_out'],
+            in_stock=inventory['in_stock'],
+            calibrated_tools=cal_counts['calibrated'],
+            calibration_overdue=cal_counts['overdue'],
         )
     except SQLAlchemyError as e:
         db.session.rollback()
@@ -979,46 +922,93 @@ def api_history():
 @bp.route('/api/tools')
 @login_required
 def api_tools():
-    """List tools (optional filters: status, checked_out)."""
+    """
+    List tools, keyset-paginated on (tool_name, id).
+    Filters: status, category, location (exact), checked_out (true|false), q (prefix of tool name or tool ID).
+    Paging: limit (1-500, default 100), cursor (next_cursor / prev_cursor from the previous response).
+    """
+    from utils.pagination import keyset_page
+
+    try:
+        limit = min(max(1, int(request.args.get("limit", 100))), 500)
+    except (TypeError, ValueError):
+        limit = 100
     try:
         status = request.args.get("status")
+        category = request.args.get("category")
+        location = request.args.get("location")
         checked_out = request.args.get("checked_out")
+        prefix = (request.args.get("q") or "").strip()
         q = Tools.query
         if status:
             q = q.filter(Tools.tool_status == status)
+        if category:
+            q = q.filter(Tools.category == category)
+        if location:
+            q = q.filter(Tools.tool_location == location)
         if checked_out == "true":
             q = q.filter(Tools.checked_out_by.isnot(None))
         elif checked_out == "false":
             q = q.filter(Tools.checked_out_by.is_(None))
-        tools = q.order_by(Tools.tool_name).limit(100).all()
-        return jsonify(tools=[
-            {
-                "id": t.id,
-                "tool_id_number": t.tool_id_number,
-                "tool_name": t.tool_name,
-                "tool_location": t.tool_location,
-                "tool_status": t.tool_status,
-                "checked_out_by": t.checked_out_by,
-                "tool_calibration_due": t.tool_calibration_due,
-            }
-            for t in tools
-        ])
+        if prefix:
+            q = q.filter(db.or_(
+                Tools.tool_name.startswith(prefix, autoescape=True),
+                Tools.tool_id_number.startswith(prefix, autoescape=True),
+            ))
+        try:
+            tools, next_cursor, prev_cursor = keyset_page(
+                q, (Tools.tool_name, Tools.id), request.args.get("cursor"), limit,
+                key_of=lambda t: [t.tool_name, t.id],
+            )
+        except ValueError:
+            return jsonify(error="invalid_cursor", message="The cursor is not valid. Start again without one.", tools=[]), 400
+        return jsonify(
+            tools=[
+                {
+                    "id": t.id,
+                    "tool_id_number": t.tool_id_number,
+                    "tool_name": t.tool_name,
+                    "tool_location": t.tool_location,
+                    "tool_status": t.tool_status,
+                    "category": t.category,
+                    "checked_out_by": t.checked_out_by,
+                    "tool_calibration_due": t.tool_calibration_due,
+                }
+                for t in tools
+            ],
+            next_cursor=next_cursor,
+            prev_cursor=prev_cursor,
+            limit=limit,
+        )
     except SQLAlchemyError as e:
         db.session.rollback()
         logger.exception("api_tools: %s", e)
         return jsonify(error="Database error", tools=[]), 500
 
 
+# Seconds a kiosk may reuse a badge lookup without asking again (it then revalidates with If-None-Match)
+BADGE_LOOKUP_MAX_AGE = int(os.getenv("ATEMS_BADGE_LOOKUP_MAX_AGE", "30"))
+
+
 @bp.route('/api/user-by-badge')
 def api_user_by_badge():
-    """Look up username by badge_id (for scan flow: fill username when badge is scanned)."""
+    """
+    Look up username by badge_id (for scan flow: fill username when badge is scanned).
+    Answered from the per-process badge index (utils/user_cache.py). Known badges are cacheable for
+    BADGE_LOOKUP_MAX_AGE seconds with an ETag; unknown badges are not cached (a new badge works right away).
+    """
+    from utils.user_cache import username_for_badge
+
     badge_id = (request.args.get("badge_id") or "").strip()
-    if not badge_id:
-        return jsonify(username=None), 200
-    user = User.query.filter_by(badge_id=badge_id).first()
-    if not user:
-        return jsonify(username=None), 200
-    return jsonify(username=user.username)
+    username = username_for_badge(badge_id) if badge_id else None
+    resp = jsonify(username=username)
+    if username is None:
+        resp.cache_control.no_cache = True
+        return resp
+    resp.set_etag(hashlib.sha256(f"{badge_id}\0{username}".encode("utf-8")).hexdigest()[:20])
+    resp.cache_control.private = True
+    resp.cache_control.max_age = BADGE_LOOKUP_MAX_AGE
+    return resp.make_conditional(request)
 
 
 @bp.route('/api/checkinout', methods=['POST'])
@@ -1050,7 +1040,6 @@ def api_checkinout():
         if extra:
             resp.update(extra)
         if status == "success":
-            resp["action"] = "checkin" if "checked in" in message.lower() else "checkout"
             return jsonify(resp)
         return jsonify(status=status, message=message), 400
     except SQLAlchemyError as e:
@@ -1061,3 +1050,27 @@ def api_checkinout():
         db.session.rollback()
         logger.exception("api_checkinout error: %s", e)
         return jsonify(status="error", message="An unexpected error occurred. Please try again."), 500
+
+
+@bp.route('/api/checkinout/batch', methods=['POST'])
+def api_checkinout_batch():
+    """
+    Replay an offline scan queue in one request. Body: {"events": [{username, badge_id, tool_id_number,
+    client_time (ISO 8601), job_id?, condition?, return_by?, client_event_id?}, ...]} in scan order.
+    Returns one result per event (success, duplicate, error or skipped) plus totals.
+    """
+    from utils.checkinout import apply_scan_batch, SCAN_BATCH_MAX
+
+    data = request.get_json(silent=True)
+    events = data.get("events") if isinstance(data, dict) else data
+    if not isinstance(events, list) or not events:
+        return jsonify(status="error", message="Body must be a JSON object with a non-empty 'events' list."), 400
+    if len(events) > SCAN_BATCH_MAX:
+        return jsonify(status="error", message=f"At most {SCAN_BATCH_MAX} events per batch; split the queue."), 413
+    try:
+        result = apply_scan_batch(db.session, events)
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.exception("api_checkinout_batch database error: %s", e)
+        return jsonify(status="error", message="A database error occurred. Please try again."), 500
+    return jsonify(status="success" if result["complete"] else "partial", **result)
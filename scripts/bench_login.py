@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Login-throughput benchmark (shift-change burst): N users log in at once, report logins/sec and latency.
+
+    python scripts/bench_login.py --users 40 --concurrency 40
+    ATEMS_BCRYPT_ROUNDS=10 ATEMS_HASH_WORKERS=2 python scripts/bench_login.py
+    python scripts/bench_login.py --url http://127.0.0.1:5000   # against a running server (users must exist there)
+
+Creates bench users (benchlogin000...) in the configured database if missing. In-process mode uses the Flask
+test client from worker threads; --url posts to a live server so Gunicorn worker/thread settings are included.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PASSWORD = "bench-login-pass"
+
+
+def seed_users(app, count):
+    from extensions import db
+    from models.user import User
+
+    with app.app_context():
+        existing = {u for (u,) in db.session.query(User.username).filter(User.username.like("benchlogin%"))}
+        for i in range(count):
+            name = f"benchlogin{i:03d}"
+            if name in existing:
+                continue
+            u = User(
+                first_name="Bench", last_name=f"User{i}", username=name, email=f"{name}@bench.local",
+                badge_id=f"BL{i:05d}", phone=f"559{i:07d}", department="ATEMS",
+                supervisor_username="admin", supervisor_email="admin@example.com", supervisor_phone="5550000000",
+            )
+            u.set_password(PASSWORD)
+            db.session.add(u)
+        db.session.commit()
+
+
+def login_in_process(app, username):
+    client = app.test_client()
+    t0 = time.perf_counter()
+    rv = client.post("/login", data={"username": username, "password": PASSWORD})
+    return time.perf_counter() - t0, rv.status_code
+
+
+def login_http(base_url, username):
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+    body = urllib.parse.urlencode({"username": username, "password": PASSWORD}).encode()
+    t0 = time.perf_counter()
+    try:
+        with opener.open(base_url.rstrip("/") + "/login", data=body, timeout=120) as r:
+            status = r.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return time.perf_counter() - t0, status
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--users", type=int, default=40, help="distinct users logging in (default 40)")
+    ap.add_argument("--concurrency", type=int, default=40, help="simultaneous logins (default 40)")
+    ap.add_argument("--rounds", type=int, default=1, help="repeat the burst this many times (default 1)")
+    ap.add_argument("--url", help="base URL of a running server instead of the in-process app")
+    args = ap.parse_args()
+
+    from atems import create_app
+    from utils.passwords import BCRYPT_ROUNDS, HASH_WORKERS, HASH_MAX_PENDING
+
+    app = create_app()
+    app.config["WTF_CSRF_ENABLED"] = False
+    seed_users(app, args.users)
+    names = [f"benchlogin{i:03d}" for i in range(args.users)] * args.rounds
+
+    if args.url:
+        def one(name):
+            return login_http(args.url, name)
+    else:
+        def one(name):
+            return login_in_process(app, name)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as ex:
+        results = list(ex.map(one, names))
+    wall = time.perf_counter() - t0
+
+    lat = sorted(r[0] for r in results)
+    ok = sum(1 for r in results if r[1] in (200, 302))
+    busy = sum(1 for r in results if r[1] == 503)
+    p95 = lat[min(len(lat) - 1, int(len(lat) * 0.95))]
+    print(f"bcrypt cost={BCRYPT_ROUNDS} hash_workers={HASH_WORKERS} max_pending={HASH_MAX_PENDING} "
+          f"target={'http ' + args.url if args.url else 'in-process'}")
+    print(f"{len(results)} logins, concurrency {args.concurrency}: {wall:.2f}s wall, {len(results) / wall:.1f} logins/s, "
+          f"ok={ok} busy(503)={busy} other={len(results) - ok - busy}")
+    print(f"latency p50={statistics.median(lat) * 1000:.0f}ms p95={p95 * 1000:.0f}ms max={lat[-1] * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
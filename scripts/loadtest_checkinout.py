@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Load test for POST /api/checkinout: concurrent scans, latency percentiles, then a consistency check.
+
+    python scripts/loadtest_checkinout.py --scans 2000 --concurrency 16 --tools 20 --users 10
+    python scripts/loadtest_checkinout.py --hot            # every scan hits the same tool (worst-case contention)
+    python scripts/loadtest_checkinout.py --url http://127.0.0.1:5000   # against a running server
+
+Seeds users loadtest000... (badge LT00000...) and tools LOAD-TST-000... in the configured database if missing.
+After the run it checks that every tool's checked_out_by matches its last history event and that the
+checked-out counter matches the tools table; a race shows up there as a mismatch.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def seed(app, users, tools):
+    from extensions import db
+    from models.tools import Tools
+    from models.user import User
+
+    with app.app_context():
+        have_users = {u for (u,) in db.session.query(User.username).filter(User.username.like("loadtest%"))}
+        for i in range(users):
+            name = f"loadtest{i:03d}"
+            if name not in have_users:
+                u = User(
+                    first_name="Load", last_name=f"Test{i}", username=name, email=f"{name}@load.local",
+                    badge_id=f"LT{i:05d}", phone=f"558{i:07d}", department="ATEMS",
+                    supervisor_username="admin", supervisor_email="admin@example.com", supervisor_phone="5550000000",
+                )
+                u.password_hash = "!"  # cannot log in; only scans
+                db.session.add(u)
+        have_tools = {t for (t,) in db.session.query(Tools.tool_id_number).filter(Tools.tool_id_number.like("LOAD-TST-%"))}
+        for i in range(tools):
+            tid = f"LOAD-TST-{i:03d}"
+            if tid not in have_tools:
+                db.session.add(Tools(
+                    tool_id_number=tid, tool_name=f"Load Tool {i}", tool_location="LT-01", tool_status="In Stock",
+                    tool_calibration_due="N/A", tool_calibration_date="N/A", tool_calibration_cert="N/A",
+                    tool_calibration_schedule="N/A", category="Load Test",
+                ))
+        db.session.commit()
+
+
+def check_consistency(app, tools):
+    """Return a list of problems (empty when tools, history and counters agree)."""
+    from extensions import db
+    from models.checkout_history import CheckoutHistory as H
+    from models.tools import Tools
+    from utils.inventory_counters import get_inventory_summary
+
+    problems = []
+    with app.app_context():
+        for i in range(tools):
+            tid = f"LOAD-TST-{i:03d}"
+            tool = Tools.query.filter_by(tool_id_number=tid).first()
+            last = H.query.filter_by(tool_id_number=tid).order_by(H.id.desc()).first()
+            if last is None:
+                continue
+            expected = last.username if last.action == "checkout" else None
+            if tool.checked_out_by != expected:
+                problems.append(f"{tid}: checked_out_by={tool.checked_out_by!r}, last event {last.action} by {last.username}")
+        actual = db.session.query(Tools).filter(Tools.checked_out_by.isnot(None)).count()
+        counted = get_inventory_summary()["checked_out"]
+        if counted != actual:
+            problems.append(f"checked_out counter {counted} != {actual} tools checked out")
+    return problems
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--scans", type=int, default=1000)
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--users", type=int, default=10)
+    ap.add_argument("--tools", type=int, default=20)
+    ap.add_argument("--hot", action="store_true", help="all scans on LOAD-TST-000 by loadtest000")
+    ap.add_argument("--url", help="base URL of a running server instead of the in-process app")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    from atems import create_app
+
+    app = create_app()
+    app.config["WTF_CSRF_ENABLED"] = False
+    seed(app, args.users, args.tools)
+
+    rnd = random.Random(args.seed)
+    scans = []
+    for _ in range(args.scans):
+        u = 0 if args.hot else rnd.randrange(args.users)
+        t = 0 if args.hot else rnd.randrange(args.tools)
+        scans.append({"username": f"loadtest{u:03d}", "badge_id": f"LT{u:05d}", "tool_id_number": f"LOAD-TST-{t:03d}"})
+
+    if args.url:
+        endpoint = args.url.rstrip("/") + "/api/checkinout"
+
+        def one(body):
+            req = urllib.request.Request(endpoint, data=json.dumps(body).encode(),
+                                         headers={"Content-Type": "application/json"})
+            t0 = time.perf_counter()
+            try:
+                with urllib.request.urlopen(req, timeout=60) as r:
+                    status = r.status
+            except urllib.error.HTTPError as e:
+                status = e.code
+            return time.perf_counter() - t0, status
+    else:
+        def one(body):
+            client = app.test_client()
+            t0 = time.perf_counter()
+            rv = client.post("/api/checkinout", json=body)
+            return time.perf_counter() - t0, rv.status_code
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as ex:
+        results = list(ex.map(one, scans))
+    wall = time.perf_counter() - t0
+
+    lat = sorted(r[0] for r in results)
+
+    def pct(p):
+        return lat[min(len(lat) - 1, int(len(lat) * p))] * 1000
+
+    codes = {}
+    for _, code in results:
+        codes[code] = codes.get(code, 0) + 1
+    print(f"{len(results)} scans, concurrency {args.concurrency}{' (hot tool)' if args.hot else ''}: "
+          f"{wall:.2f}s, {len(results) / wall:.0f} scans/s, status codes {codes}")
+    print(f"latency p50={statistics.median(lat) * 1000:.1f}ms p95={pct(0.95):.1f}ms p99={pct(0.99):.1f}ms "
+          f"max={lat[-1] * 1000:.1f}ms")
+    problems = check_consistency(app, 1 if args.hot else args.tools)
+    print("consistency: OK" if not problems else "consistency: FAILED\n  " + "\n  ".join(problems[:20]))
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -212,6 +212,10 @@ def main():
             db.session.bulk_save_objects(batch)
             db.session.commit()
         
+        # bulk_save_objects bypasses the ORM flush hooks, so recount the inventory counters
+        from utils.inventory_counters import rebuild_inventory_counters
+        rebuild_inventory_counters()
+
         final_count = Tools.query.count()
         print(f"\n✓ Seeding complete: {final_count:,} total tools in database")
 
@@ -225,9 +225,24 @@ def get_system_health(app):
             "platform": os.name,
             "python_version": sys.version.split()[0],
         },
+        "caches": _cache_stats(),
+        "log_pipeline": _log_pipeline_stats(),
     }
 
 
+def _cache_stats():
+    """Hit/miss counters of in-process caches."""
+    from utils.calibration import calibration_cache_info
+    from utils.user_cache import user_cache_info
+    return {"calibration_parse": calibration_cache_info(), "user_loader": user_cache_info()}
+
+
+def _log_pipeline_stats():
+    """Structured log queue depth, drops and ring buffer fill ({"enabled": False} when ATEMS_LOG_JSON is off)."""
+    from utils.log_pipeline import log_pipeline_info
+    return log_pipeline_info()
+
+
 def run_full_selftest():
     """Run full self-test suite (run_selftest.sh). Returns dict for API response."""
     import subprocess
@@ -0,0 +1,75 @@
+"""Tests for keyset pagination and filters on GET /api/tools."""
+import pytest
+
+
+@pytest.fixture
+def many_tools(db_session):
+    from models.tools import Tools
+    for i in range(25):
+        db_session.session.add(Tools(
+            tool_id_number=f"MANF-CAL-{i:03d}",
+            tool_name=f"Caliper {i % 5}",  # duplicate names: ties broken by id
+            tool_location="B1-01" if i % 2 else "B1-02",
+            tool_status="In Stock",
+            tool_calibration_due="N/A",
+            tool_calibration_date="N/A",
+            tool_calibration_cert="N/A",
+            tool_calibration_schedule="N/A",
+            category="Manufacturing" if i < 20 else "Aerospace",
+        ))
+    db_session.session.commit()
+
+
+def _login(client, seed_user):
+    username, _, password = seed_user
+    client.post("/login", data={"username": username, "password": password}, follow_redirects=True)
+
+
+@pytest.mark.usefixtures("db_session", "seed_user", "many_tools")
+def test_walk_pages_forward_and_back(client, seed_user):
+    """next_cursor visits every tool once in (tool_name, id) order; prev_cursor returns the previous page."""
+    _login(client, seed_user)
+    pages, cursor = [], None
+    while True:
+        params = {"limit": 10}
+        if cursor:
+            params["cursor"] = cursor
+        data = client.get("/api/tools", query_string=params).get_json()
+        pages.append(data)
+        cursor = data["next_cursor"]
+        if not cursor:
+            break
+    ids = [t["id"] for p in pages for t in p["tools"]]
+    assert len(ids) == 25 and len(set(ids)) == 25
+    keys = [(t["tool_name"], t["id"]) for p in pages for t in p["tools"]]
+    assert keys == sorted(keys)
+    assert pages[0]["prev_cursor"] is None
+
+    back = client.get("/api/tools", query_string={"limit": 10, "cursor": pages[2]["prev_cursor"]}).get_json()
+    assert [t["id"] for t in back["tools"]] == [t["id"] for t in pages[1]["tools"]]
+
+
+@pytest.mark.usefixtures("db_session", "seed_user", "many_tools")
+def test_filters_and_prefix_search(client, seed_user):
+    """category/location filters and q prefix search narrow the list."""
+    _login(client, seed_user)
+    data = client.get("/api/tools", query_string={"category": "Aerospace"}).get_json()
+    assert len(data["tools"]) == 5
+    data = client.get("/api/tools", query_string={"location": "B1-01", "q": "Caliper 1"}).get_json()
+    assert data["tools"] and all(t["tool_location"] == "B1-01" and t["tool_name"] == "Caliper 1" for t in data["tools"])
+    data = client.get("/api/tools", query_string={"q": "MANF-CAL-02"}).get_json()
+    assert sorted(t["tool_id_number"] for t in data["tools"]) == [f"MANF-CAL-{i:03d}" for i in range(20, 25)]
+
+
+@pytest.mark.usefixtures("db_session", "seed_user")
+def test_bad_cursor_returns_400(client, seed_user):
+    _login(client, seed_user)
+    r = client.get("/api/tools", query_string={"cursor": "not-a-cursor"})
+    assert r.status_code == 400
+    assert r.get_json()["error"] == "invalid_cursor"
+    # Well-formed base64 JSON, but the key must be [tool_name: str, id: int]
+    from utils.pagination import encode_cursor
+    for key in ([1, "x"], ["Hammer", True], ["Hammer", None]):
+        r = client.get("/api/tools", query_string={"cursor": encode_cursor(key)})
+        assert r.status_code == 400, key
+        assert r.get_json()["error"] == "invalid_cursor"
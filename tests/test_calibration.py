@@ -0,0 +1,100 @@
+"""Tests for calibration due dates: parsing, typed column, and bucket counts."""
+from datetime import datetime, timedelta
+
+import pytest
+
+
+def _add_tool(db, tool_id, due):
+    from models.tools import Tools
+    t = Tools(
+        tool_id_number=tool_id,
+        tool_name="Torque Wrench",
+        tool_location="A1-01",
+        tool_status="Calibrated",
+        tool_calibration_due=due,
+        tool_calibration_date="N/A",
+        tool_calibration_cert="N/A",
+        tool_calibration_schedule="N/A",
+    )
+    db.session.add(t)
+    return t
+
+
+@pytest.mark.usefixtures("db_session")
+def test_due_date_column_follows_string(db_session):
+    """Setting tool_calibration_due keeps tool_calibration_due_date in step (any supported format)."""
+    t = _add_tool(db_session, "AUTO-TORQ-001", "03/04/2027")
+    assert t.tool_calibration_due_date == datetime(2027, 3, 4).date()
+    t.tool_calibration_due = "N/A"
+    assert t.tool_calibration_due_date is None
+    t.tool_calibration_due = "2026-12-31"
+    db_session.session.commit()
+    assert t.tool_calibration_due_date == datetime(2026, 12, 31).date()
+
+
+@pytest.mark.usefixtures("db_session")
+def test_calibration_bucket_counts(db_session):
+    """Overdue and 30/60/90 buckets come from one CASE query; the string fallback agrees."""
+    from models.tools import Tools
+    from utils.calibration import calibration_bucket_counts, bucket_counts_from_strings
+
+    today = datetime.now().date()
+    for i, offset in enumerate((-5, -1, 0, 10, 45, 120)):
+        _add_tool(db_session, f"AUTO-TORQ-{i:03d}", (today + timedelta(days=offset)).strftime("%Y-%m-%d"))
+    _add_tool(db_session, "AUTO-TORQ-900", "N/A")
+    db_session.session.commit()
+
+    counts = calibration_bucket_counts(today)
+    assert counts == {"calibrated": 6, "overdue": 2, "due_30": 2, "due_60": 1, "due_90": 1}
+    values = [v for (v,) in db_session.session.query(Tools.tool_calibration_due)]
+    assert bucket_counts_from_strings(values, today) == counts
+
+
+@pytest.mark.usefixtures("db_session")
+def test_bucket_counts_fall_back_only_for_missing_column(db_session, monkeypatch):
+    """Without the typed column (migration not applied) the strings are counted; other DB errors propagate."""
+    from sqlalchemy.exc import OperationalError
+    from utils.calibration import calibration_bucket_counts
+
+    today = datetime.now().date()
+    _add_tool(db_session, "AUTO-TORQ-001", (today - timedelta(days=1)).strftime("%Y-%m-%d"))
+    db_session.session.commit()
+
+    def locked(*args, **kwargs):
+        raise OperationalError("SELECT ...", {}, Exception("database is locked"))
+
+    with monkeypatch.context() as m:
+        m.setattr(db_session.session, "query", locked)
+        with pytest.raises(OperationalError):
+            calibration_bucket_counts(today)
+
+    db_session.session.execute(db_session.text(
+        "ALTER TABLE tools RENAME COLUMN tool_calibration_due_date TO tool_calibration_due_date_old"))
+    db_session.session.commit()
+    assert calibration_bucket_counts(today)["overdue"] == 1
+
+
+def test_parse_cache_counts_hits_and_remembers_format():
+    """Repeated due strings are parsed once; the matched format is remembered per string."""
+    from utils.calibration import (
+        calibration_cache_info,
+        calibration_due_format,
+        clear_calibration_cache,
+        is_calibration_overdue,
+        parse_calibration_due,
+    )
+
+    clear_calibration_cache()
+    assert parse_calibration_due("03/04/2027") == datetime(2027, 3, 4)
+    for _ in range(5):
+        parse_calibration_due(" 03/04/2027 ")
+    info = calibration_cache_info()
+    assert info["misses"] == 1
+    assert info["hits"] == 5
+    assert calibration_due_format("03/04/2027") == "%m/%d/%Y"
+    assert calibration_due_format("N/A") is None
+    assert parse_calibration_due("garbage") is None
+
+    today = datetime(2027, 3, 5).date()
+    assert is_calibration_overdue("03/04/2027", today) is True
+    assert is_calibration_overdue("03/04/2027", today - timedelta(days=2)) is False
@@ -176,3 +176,125 @@ def test_checkout_then_another_user_checkout_fails(client, seed_user, seed_tool,
     assert rv.status_code == 200
     data = rv.get_json()
     assert data.get("status") == "success"
+
+
+@pytest.mark.usefixtures("db_session", "seed_user", "seed_tool")
+def test_api_checkinout_returns_history_event(client, seed_user, seed_tool):
+    """The API reports the action and the id of the checkout_history row it inserted."""
+    from extensions import db
+    from models.checkout_history import CheckoutHistory
+    from models.tools import Tools
+
+    username, badge_id, _ = seed_user
+    body = {"username": username, "badge_id": badge_id, "tool_id_number": seed_tool}
+    out = client.post("/api/checkinout", json=body).get_json()
+    assert out["action"] == "checkout"
+    ev = db.session.get(CheckoutHistory, out["event_id"])
+    assert (ev.action, ev.username, ev.tool_id_number) == ("checkout", username, seed_tool)
+    back = client.post("/api/checkinout", json=body).get_json()
+    assert back["action"] == "checkin" and back["event_id"] > out["event_id"]
+    assert Tools.query.filter_by(tool_id_number=seed_tool).first().checked_out_by is None
+
+
+@pytest.mark.usefixtures("db_session", "seed_user", "seed_tool")
+def test_scan_rereads_tool_changed_by_concurrent_scan(app, seed_user, seed_tool, monkeypatch):
+    """If another scan changes the tool between our read and write, the scan re-reads instead of overwriting."""
+    from extensions import db
+    from models.checkout_history import CheckoutHistory
+    from utils import checkinout
+
+    username, badge_id, _ = seed_user
+    real = checkinout._tool_row
+    calls = []
+
+    def racing_tool_row(session, tool_id_number, user):
+        row = real(session, tool_id_number, user)
+        if not calls:
+            # Another station checks the tool out for this user right after our first read
+            db.session.execute(db.text("UPDATE tools SET checked_out_by = :u WHERE tool_id_number = :t"),
+                               {"u": username, "t": tool_id_number})
+        calls.append(row.checked_out_by)
+        return row
+
+    monkeypatch.setattr(checkinout, "_tool_row", racing_tool_row)
+    status, _, extra = checkinout.apply_scan(db.session, username, badge_id, seed_tool)
+    db.session.commit()
+    assert status == "success"
+    assert calls == [None, username]  # second read saw the other scan
+    assert extra["action"] == "checkin"
+    assert db.session.get(CheckoutHistory, extra["event_id"]).action == "checkin"
+
+
+@pytest.mark.usefixtures("db_session", "seed_user", "seed_tool")
+def test_batch_applies_events_in_order_and_replay_is_idempotent(client, seed_user, seed_tool):
+    """Offline queue: events apply in order with client timestamps; resending the batch changes nothing."""
+    from sqlalchemy import event
+    from extensions import db
+    from models.checkout_history import CheckoutHistory
+    from models.tools import Tools
+
+    username, badge_id, _ = seed_user
+    scan = {"username": username, "badge_id": badge_id, "tool_id_number": seed_tool}
+    events = [
+        dict(scan, client_time="2026-03-02T07:00:00", client_event_id="a"),
+        dict(scan, client_time="2026-03-02T07:05:00", condition="Good"),
+        dict(scan, client_time="2026-03-02T07:10:00", return_by="2026-03-09"),
+        dict(scan, badge_id="WRONG1", client_time="2026-03-02T07:11:00"),
+        dict(scan, tool_id_number="NO-SUCH-TOOL", client_time="2026-03-02T07:12:00"),
+        dict(scan, client_time="yesterday"),
+    ]
+    selects = []
+    listener = lambda conn, cur, stmt, *a: selects.append(stmt) if stmt.lstrip().upper().startswith("SELECT") else None
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        rv = client.post("/api/checkinout/batch", json={"events": events})
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listener)
+    assert rv.status_code == 200
+    out = rv.get_json()
+    assert [r["status"] for r in out["results"]] == ["success", "success", "success", "error", "error", "error"]
+    assert [r.get("action") for r in out["results"][:3]] == ["checkout", "checkin", "checkout"]
+    assert out["results"][0]["client_event_id"] == "a"
+    assert "Badge ID" in out["results"][3]["message"] and "client_time" in out["results"][5]["message"]
+    assert (out["applied"], out["errors"], out["complete"]) == (3, 3, True)
+    # users IN, tools IN (locked), recorded-events lookup; no per-event queries
+    assert len(selects) <= 3
+
+    tool = Tools.query.filter_by(tool_id_number=seed_tool).first()
+    assert tool.checked_out_by == username
+    hist = CheckoutHistory.query.filter_by(tool_id_number=seed_tool).order_by(CheckoutHistory.id).all()
+    assert [h.event_time.strftime("%H:%M") for h in hist] == ["07:00", "07:05", "07:10"]
+    assert hist[2].return_by.strftime("%Y-%m-%d") == "2026-03-09"
+    assert [r["event_id"] for r in out["results"][:3]] == [h.id for h in hist]
+
+    again = client.post("/api/checkinout/batch", json={"events": events[:3]}).get_json()
+    assert [r["status"] for r in again["results"]] == ["duplicate"] * 3
+    assert [r["event_id"] for r in again["results"]] == [h.id for h in hist]
+    assert CheckoutHistory.query.filter_by(tool_id_number=seed_tool).count() == 3
+
+
+@pytest.mark.usefixtures("db_session", "seed_user", "seed_tool")
+def test_batch_future_client_time_rejected_on_every_replay(client, seed_user, seed_tool):
+    """A scanner clock far ahead is an error, not rewritten to server time: replays cannot toggle the tool."""
+    from datetime import datetime, timedelta
+    from models.tools import Tools
+
+    username, badge_id, _ = seed_user
+    future = (datetime.now() + timedelta(hours=2)).isoformat(timespec="seconds")
+    batch = {"events": [{"username": username, "badge_id": badge_id, "tool_id_number": seed_tool,
+                         "client_time": future}]}
+    for _ in range(2):
+        res = client.post("/api/checkinout/batch", json=batch).get_json()["results"][0]
+        assert res["status"] == "error" and "future" in res["message"]
+    assert Tools.query.filter_by(tool_id_number=seed_tool).first().checked_out_by is None
+
+
+@pytest.mark.usefixtures("db_session")
+def test_batch_rejects_bad_bodies(client, monkeypatch):
+    from utils import checkinout
+
+    assert client.post("/api/checkinout/batch", json={"events": []}).status_code == 400
+    assert client.post("/api/checkinout/batch", data="nope").status_code == 400
+    monkeypatch.setattr(checkinout, "SCAN_BATCH_MAX", 2)
+    rv = client.post("/api/checkinout/batch", json=[{}, {}, {}])
+    assert rv.status_code == 413
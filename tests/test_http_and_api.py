@@ -150,6 +150,27 @@ class TestApiPublic:
         data = r.get_json()
         assert data is not None
         assert data.get("username") is None
+        assert "no-cache" in r.headers.get("Cache-Control", "")
+
+    @pytest.mark.usefixtures("db_session", "seed_user")
+    def test_api_user_by_badge_etag_and_index(self, client, seed_user):
+        """Known badge: cacheable with an ETag (304 on revalidation), served from the index; badge changes show up."""
+        from extensions import db
+        from models.user import User
+
+        _, badge_id, _ = seed_user
+        r = client.get("/api/user-by-badge", query_string={"badge_id": badge_id})
+        etag = r.headers["ETag"]
+        assert "max-age" in r.headers["Cache-Control"] and "private" in r.headers["Cache-Control"]
+        r2 = client.get("/api/user-by-badge", query_string={"badge_id": badge_id}, headers={"If-None-Match": etag})
+        assert r2.status_code == 304
+
+        u = User.query.filter_by(username="testuser").first()
+        u.badge_id = "TST777"
+        db.session.commit()
+        assert client.get("/api/user-by-badge", query_string={"badge_id": badge_id}).get_json()["username"] is None
+        r3 = client.get("/api/user-by-badge", query_string={"badge_id": "TST777"})
+        assert r3.get_json()["username"] == "testuser" and r3.headers["ETag"] != etag
 
 
 class TestApiAuthRequired:
@@ -0,0 +1,329 @@
+"""Tests for tool import (utils/import_tools.py)."""
+from datetime import date
+
+import pytest
+
+
+def _row(tool_id, name="Wrench", **kw):
+    r = {"tool_id_number": tool_id, "tool_name": name, "tool_location": "A1-01", "tool_status": "In Stock",
+         "tool_calibration_due": "N/A", "tool_calibration_date": "N/A", "tool_calibration_cert": "N/A",
+         "tool_calibration_schedule": "N/A", "category": None}
+    r.update(kw)
+    return r
+
+
+@pytest.mark.usefixtures("db_session")
+def test_bulk_upsert_in_chunks(seed_tool):
+    """Chunks commit separately; existing IDs update, new IDs insert, and per-chunk stats are reported."""
+    from models.tools import Tools
+    from utils.import_tools import import_tools_rows
+    from utils.inventory_counters import get_inventory_summary, rebuild_inventory_counters
+
+    Tools.query.filter_by(tool_id_number=seed_tool).first().category = "Construction"
+    from extensions import db
+    db.session.commit()
+    get_inventory_summary()  # initialize counters
+
+    rows = [
+        _row(seed_tool, "Claw Hammer 16oz", tool_status="In Repair"),  # category left blank: kept
+        _row("MANF-CAL-001", "Caliper", tool_calibration_due="2027-03-01", category="Manufacturing"),
+        _row("MANF-CAL-002", "Caliper"),
+        _row("MANF-CAL-002", "Caliper 6in", category="Manufacturing"),  # same chunk: later row wins
+        _row("MANF-CAL-003", "Micrometer"),
+    ]
+    chunks = []
+    created, updated, errors = import_tools_rows(rows, chunk_size=2, on_chunk=chunks.append)
+    assert (created, updated, errors) == (3, 1, [])
+    assert [c["rows"] for c in chunks] == [2, 2, 1]
+    assert all(c["ms"] >= 0 for c in chunks)
+
+    hammer = Tools.query.filter_by(tool_id_number=seed_tool).one()
+    assert (hammer.tool_name, hammer.tool_status, hammer.category) == ("Claw Hammer 16oz", "In Repair", "Construction")
+    assert Tools.query.filter_by(tool_id_number="MANF-CAL-001").one().tool_calibration_due_date == date(2027, 3, 1)
+    assert Tools.query.filter_by(tool_id_number="MANF-CAL-002").one().tool_name == "Caliper 6in"
+
+    live = get_inventory_summary()
+    assert live["total"] == 4
+    rebuild_inventory_counters()
+    assert get_inventory_summary() == live
+
+
+@pytest.mark.usefixtures("db_session")
+def test_tool_id_number_is_unique(seed_tool):
+    from sqlalchemy.exc import IntegrityError
+    from extensions import db
+    from models.tools import Tools
+
+    db.session.add(Tools(**{k: v for k, v in _row(seed_tool).items()}))
+    with pytest.raises(IntegrityError):
+        db.session.commit()
+    db.session.rollback()
+
+
+@pytest.mark.usefixtures("db_session")
+def test_bulk_upsert_generic_dialect_path(seed_tool, monkeypatch):
+    """Backends without ON CONFLICT use executemany UPDATE + INSERT with the same result."""
+    from extensions import db
+    from models.tools import Tools
+    from utils.import_tools import import_tools_rows
+
+    monkeypatch.setattr(db.engine.dialect, "name", "generic")
+    created, updated, errors = import_tools_rows([_row(seed_tool, "Hammer", category="Construction"), _row("NEW-001")])
+    assert (created, updated, errors) == (1, 1, [])
+    assert Tools.query.filter_by(tool_id_number=seed_tool).one().category == "Construction"
+    assert Tools.query.count() == 2
+
+
+def test_streaming_csv_parser_strips_bom_and_skips_blank_rows():
+    """Rows are produced lazily with their file row numbers; a UTF-8 BOM does not leak into the header."""
+    from utils.import_tools import iter_file_rows, parse_and_validate_tools
+
+    content = "\ufefftool_id_number,tool_name\nA-1,Hammer\n,\nbad id!,Saw\nA-2,Drill\n".encode("utf-8")
+    headers, rows = iter_file_rows(content, "tools.csv")
+    assert headers == ["tool_id_number", "tool_name"]
+    assert next(rows) == (2, ["A-1", "Hammer"])
+    valid, errors = parse_and_validate_tools(content, "tools.csv")
+    assert [v["tool_id_number"] for v in valid] == ["A-1", "A-2"]
+    assert [e["row"] for e in errors] == [4]
+
+
+def test_preview_stops_after_limit():
+    from utils.import_tools import preview_tools
+
+    content = ("tool_id_number,tool_name\n" + "".join(f"T-{i},Tool\n" for i in range(1000))).encode()
+    p = preview_tools(content, "tools.csv", limit=10)
+    assert len(p["valid"]) == 10
+    assert p["rows_scanned"] == 10
+    assert p["complete"] is False
+    assert preview_tools(content, "tools.csv", limit=1000)["complete"] is True
+
+
+def test_tool_batches_from_xlsx():
+    import io
+    import openpyxl
+    from utils.import_tools import iter_tool_batches
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(["Tool ID", "Name"])
+    for i in range(5):
+        ws.append([f"X-{i}", f"Tool {i}"])
+    ws.append(["", "no id"])
+    buf = io.BytesIO()
+    wb.save(buf)
+    batches = list(iter_tool_batches(io.BytesIO(buf.getvalue()), "tools.xlsx", batch_size=2))
+    assert [len(v) for v, _, _, _ in batches] == [2, 2, 1]
+    assert batches[0][1] == [2, 3]
+    assert batches[-1][2] == [{"row": 7, "message": "Row 7: tool_id_number is required"}]
+
+
+@pytest.mark.usefixtures("db_session")
+def test_import_endpoint_streams_upload(client, seed_user):
+    import io
+    from models.tools import Tools
+
+    username, _, password = seed_user
+    client.post("/login", data={"username": username, "password": password})
+    content = b"tool_id_number,tool_name,category\nIMP-1,Hammer,Construction\nIMP-2,Saw,\nbad id!,x,\nIMP-1,Mallet,\n"
+    preview = client.post("/api/import/preview", data={"file": (io.BytesIO(content), "tools.csv")},
+                          content_type="multipart/form-data").get_json()
+    assert [w["row"] for w in preview["warnings"]] == [5]
+    resp = client.post("/api/import/tools", data={"file": (io.BytesIO(content), "tools.csv")},
+                       content_type="multipart/form-data")
+    body = resp.get_json()
+    assert resp.status_code == 200, body
+    assert (body["created"], body["updated"], body["total"]) == (2, 0, 3)  # same chunk: row 5 replaces row 2
+    assert [e["row"] for e in body["errors"]] == [4]
+    assert body["warnings"] == [{"row": 5, "message": "Row 5: tool_id_number IMP-1 repeats row 2; this row replaces it"}]
+    assert Tools.query.count() == 2
+    assert Tools.query.filter_by(tool_id_number="IMP-1").one().tool_name == "Mallet"
+
+
+def test_parallel_validation_matches_serial_and_warns_on_duplicates(monkeypatch):
+    """
+    The process pool is chosen from the row estimate (no rows buffered) and keeps file order. Duplicates in
+    different pool chunks are reported against the earlier row and still imported (later row wins).
+    """
+    import io
+    import utils.import_tools as it
+
+    lines = ["tool_id_number,tool_name"] + [f"P-{i},Tool {i}" for i in range(30)]
+    lines[5] = "bad id!,Broken"  # row 6
+    lines[28] = "P-2,Copy"  # row 29 (chunk 7) repeats row 4 (chunk 1)
+    lines[30] = "P-2,Again"  # row 31 repeats row 29
+    content = ("\n".join(lines) + "\n").encode()
+
+    serial = list(it.iter_validated_tools(content, "tools.csv", parallel=False))
+    monkeypatch.setattr(it, "IMPORT_WORKERS", 2)
+    monkeypatch.setattr(it, "IMPORT_PARALLEL_MIN_ROWS", 10)
+    monkeypatch.setattr(it, "IMPORT_VALIDATE_CHUNK_SIZE", 4)
+    pooled = []
+    real_parallel = it._validate_parallel
+    monkeypatch.setattr(it, "_validate_parallel", lambda *a: pooled.append(1) or real_parallel(*a))
+    stream = io.BytesIO(content)
+    assert it.estimate_row_count(stream, "tools.csv") == 30 and stream.tell() == 0
+    parallel = list(it.iter_validated_tools(stream, "tools.csv"))
+
+    assert pooled and parallel == serial
+    assert [n for n, _, _, _ in parallel] == list(range(2, 32))
+    assert {e["row"] for _, _, e, _ in parallel if e} == {6}
+    assert [w["message"] for _, _, _, w in parallel if w] == [
+        "Row 29: tool_id_number P-2 repeats row 4; this row replaces it",
+        "Row 31: tool_id_number P-2 repeats row 29; this row replaces it",
+    ]
+    assert [d["tool_name"] for _, d, _, _ in parallel if d and d["tool_id_number"] == "P-2"] == ["Tool 2", "Copy", "Again"]
+
+
+@pytest.mark.usefixtures("db_session")
+def test_file_import_later_duplicate_wins_across_chunks():
+    """Same rule for files as for import_tools_rows: a repeated tool ID in a later chunk overwrites the first."""
+    from models.tools import Tools
+    from utils.import_tools import import_tools_rows, iter_tool_batches
+
+    content = b"tool_id_number,tool_name\nD-1,First\nD-2,Other\nD-3,Third\nD-1,Second\n"
+    created = updated = 0
+    warnings = []
+    for valid, row_nums, errors, batch_warnings in iter_tool_batches(content, "tools.csv", batch_size=2):
+        assert errors == []
+        warnings += batch_warnings
+        c, u, _ = import_tools_rows(valid, row_numbers=row_nums)
+        created, updated = created + c, updated + u
+    assert (created, updated) == (3, 1)
+    assert [w["row"] for w in warnings] == [5]
+    assert Tools.query.filter_by(tool_id_number="D-1").one().tool_name == "Second"
+
+
+def _wait_for_job(client, status_url, timeout=10.0):
+    import time
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        body = client.get(status_url).get_json()
+        if body["status"] in ("done", "failed"):
+            return body
+        time.sleep(0.05)
+    raise AssertionError("import job did not finish")
+
+
+@pytest.mark.usefixtures("db_session")
+def test_async_import_job(client, seed_user, tmp_path, monkeypatch):
+    """async=1 returns 202 with a job; the job imports in the background and reports totals."""
+    import io
+    import utils.jobs
+    from models.tools import Tools
+
+    monkeypatch.setattr(utils.jobs, "SPOOL_DIR", str(tmp_path))
+    username, _, password = seed_user
+    client.post("/login", data={"username": username, "password": password})
+    content = b"tool_id_number,tool_name\nJOB-1,Hammer\nJOB-2,Saw\nbad id!,x\n"
+    resp = client.post("/api/import/tools?async=1", data={"file": (io.BytesIO(content), "tools.csv")},
+                       content_type="multipart/form-data")
+    assert resp.status_code == 202
+    job = _wait_for_job(client, resp.get_json()["status_url"])
+    assert job["status"] == "done", job
+    assert (job["created"], job["updated"], job["error_count"], job["last_row"]) == (2, 0, 1, 4)
+    assert job["percent"] == 100.0
+    assert Tools.query.count() == 2
+    assert list(tmp_path.iterdir()) == []  # upload removed
+
+
+@pytest.mark.usefixtures("db_session")
+def test_import_job_resumes_after_checkpoint(tmp_path):
+    """A resumed run skips every row up to the checkpoint and keeps the running totals."""
+    from models.tools import Tools
+    from utils.import_tools import run_import_job
+
+    path = tmp_path / "upload.csv"
+    path.write_text("tool_id_number,tool_name\nR-1,A\nR-2,B\nR-3,C\nR-4,D\n")
+    saved = []
+    checkpoint = {"row": 3, "processed": 2, "created": 2, "updated": 0, "errors": [], "error_count": 0,
+                  "chunk_count": 1, "chunks": []}
+    run_import_job("job", {"upload_path": str(path), "filename": "tools.csv"},
+                   lambda processed, total=None, checkpoint=None: saved.append(checkpoint), checkpoint)
+    assert sorted(t.tool_id_number for t in Tools.query.all()) == ["R-3", "R-4"]
+    final = [c for c in saved if c][-1]
+    assert (final["row"], final["created"], final["processed"]) == (5, 4, 4)
+
+
+@pytest.mark.usefixtures("db_session")
+def test_stale_job_is_claimed_once(app, monkeypatch):
+    """Orphaned running jobs are re-queued by exactly one caller."""
+    from datetime import datetime, timedelta
+    from extensions import db
+    from models.job import Job
+    import utils.jobs
+
+    submitted = []
+    monkeypatch.setattr(utils.jobs, "_get_executor", lambda app: type("E", (), {"submit": lambda self, *a: submitted.append(a)})())
+    old = datetime.now() - timedelta(hours=1)
+    db.session.add(Job(id="stale", kind="import", status="running", params="{}", processed=0, heartbeat_at=old))
+    db.session.add(Job(id="fresh", kind="import", status="running", params="{}", processed=0, heartbeat_at=datetime.now()))
+    db.session.commit()
+    assert utils.jobs.resume_stale_jobs(app) == 1
+    assert utils.jobs.resume_stale_jobs(app) == 0
+    assert [a[-1] for a in submitted] == ["stale"]
+    assert db.session.get(Job, "stale").status == "queued"
+
+
+@pytest.mark.usefixtures("db_session")
+def test_jobs_held_by_a_live_process_are_not_stale(app, monkeypatch):
+    """The heartbeat covers queued jobs waiting in this process's pool; create_app() never claims jobs."""
+    from datetime import datetime, timedelta
+    from atems import create_app
+    from extensions import db
+    from models.job import Job
+    import utils.jobs
+
+    old = datetime.now() - timedelta(hours=1)
+    db.session.add(Job(id="mine", kind="import", status="queued", params="{}", processed=0, heartbeat_at=old,
+                       worker=utils.jobs.worker_id()))
+    db.session.add(Job(id="orphan", kind="import", status="running", params="{}", processed=0, heartbeat_at=old,
+                       worker="gone:1"))
+    db.session.commit()
+    create_app()
+    db.session.expire_all()
+    assert db.session.get(Job, "orphan").status == "running"
+    assert utils.jobs.touch_jobs() == 1
+    submitted = []
+    monkeypatch.setattr(utils.jobs, "_get_executor", lambda app: type("E", (), {"submit": lambda self, *a: submitted.append(a)})())
+    assert utils.jobs.resume_stale_jobs(app) == 1
+    assert [a[-1] for a in submitted] == ["orphan"]
+
+
+@pytest.mark.usefixtures("db_session")
+def test_run_job_only_runs_jobs_this_process_holds(app, monkeypatch):
+    """queued->running is a conditional UPDATE; a run whose job was taken over stops at its next progress write."""
+    from extensions import db
+    from models.job import Job
+    import utils.jobs
+
+    calls = []
+
+    def runner(job_id, params, progress, checkpoint):
+        calls.append(job_id)
+        db.session.execute(db.update(Job).where(Job.id == job_id).values(worker="other:2", status="queued"))
+        db.session.commit()
+        progress(1)
+        return None, None
+
+    monkeypatch.setattr(utils.jobs, "_runner", lambda kind: runner)
+    db.session.add(Job(id="theirs", kind="import", status="queued", params="{}", processed=0, worker="other:1"))
+    db.session.add(Job(id="taken", kind="import", status="queued", params="{}", processed=0,
+                       worker=utils.jobs.worker_id()))
+    db.session.commit()
+    utils.jobs._run_job(app, "theirs")
+    utils.jobs._run_job(app, "taken")
+    utils.jobs._run_job(app, "taken")
+    assert calls == ["taken"]
+    db.session.expire_all()
+    assert db.session.get(Job, "theirs").status == "queued"
+    taken = db.session.get(Job, "taken")
+    assert (taken.status, taken.worker, taken.processed, taken.error) == ("queued", "other:2", 0, None)
+
+
+def test_job_executor_is_rebuilt_after_fork(app, monkeypatch):
+    import utils.jobs
+
+    executor = utils.jobs._get_executor(app)
+    assert utils.jobs._get_executor(app) is executor
+    monkeypatch.setattr(utils.jobs, "_job_executor_pid", -1)  # as seen by a forked child
+    assert utils.jobs._get_executor(app) is not executor
@@ -0,0 +1,120 @@
+"""Tests for the materialized inventory counters (utils/inventory_counters.py)."""
+import pytest
+
+
+def _summary():
+    from utils.inventory_counters import get_inventory_summary
+    return get_inventory_summary()
+
+
+@pytest.mark.usefixtures("db_session", "seed_user", "seed_tool")
+def test_checkout_and_checkin_move_counters(client, seed_user, seed_tool):
+    """Checkout bumps checked_out; checkin puts it back. Totals stay the same."""
+    from models.tools import Tools
+    from extensions import db
+
+    Tools.query.filter_by(tool_id_number=seed_tool).first().category = "Construction"
+    db.session.commit()
+    before = _summary()
+    assert before["total"] == 1
+    assert before["checked_out"] == 0
+
+    username, badge_id, _ = seed_user
+    client.post("/checkinout", data={"username": username, "badge_id": badge_id, "tool_id_number": seed_tool})
+    after_out = _summary()
+    assert after_out["total"] == 1
+    assert after_out["checked_out"] == 1
+    assert after_out["by_category"] == [{"category": "Construction", "total": 1, "checked_out": 1, "in_stock": 0}]
+
+    client.post("/checkinout", data={"username": username, "badge_id": badge_id, "tool_id_number": seed_tool})
+    after_in = _summary()
+    assert after_in["checked_out"] == 0
+    assert after_in["in_stock"] == 1
+
+
+@pytest.mark.usefixtures("db_session", "seed_tool")
+def test_import_updates_counters_and_matches_rebuild(seed_tool):
+    """Imported rows (new and updated) are counted; a full rebuild gives the same numbers."""
+    from utils.import_tools import import_tools_rows
+    from utils.inventory_counters import rebuild_inventory_counters
+
+    _summary()  # initialize
+    rows = [
+        {"tool_id_number": "MANF-CAL-001", "tool_name": "Caliper", "tool_location": "B1-01", "tool_status": "Calibrated",
+         "tool_calibration_due": "N/A", "tool_calibration_date": "N/A", "tool_calibration_cert": "N/A",
+         "tool_calibration_schedule": "N/A", "category": "Manufacturing"},
+        {"tool_id_number": seed_tool, "tool_name": "Claw Hammer", "tool_location": "A1-01", "tool_status": "In Repair",
+         "tool_calibration_due": "N/A", "tool_calibration_date": "N/A", "tool_calibration_cert": "N/A",
+         "tool_calibration_schedule": "N/A", "category": "Construction"},
+    ]
+    created, updated, errors = import_tools_rows(rows)
+    assert (created, updated, errors) == (1, 1, [])
+    live = _summary()
+    assert live["total"] == 2
+    assert {s["status"]: s["count"] for s in live["by_status"]} == {"Calibrated": 1, "In Repair": 1}
+    assert {c["category"] for c in live["by_category"]} == {"Manufacturing", "Construction"}
+
+    rebuild_inventory_counters()
+    assert _summary() == live
+
+
+@pytest.mark.usefixtures("db_session", "seed_user", "seed_tool")
+def test_api_reports_inventory_uses_counters(client, seed_user):
+    """GET /api/reports/inventory answers from the counters."""
+    username, _, password = seed_user
+    client.post("/login", data={"username": username, "password": password}, follow_redirects=True)
+    r = client.get("/api/reports/inventory")
+    assert r.status_code == 200
+    data = r.get_json()
+    assert data["total"] == 1
+    assert data["in_stock"] == 1
+    assert data["by_status"] == [{"status": "In Stock", "count": 1}]
+
+
+@pytest.mark.usefixtures("db_session")
+def test_edit_of_expired_tool_moves_counters(seed_tool):
+    """Editing a tool after commit (attributes expired, old values not loaded) still moves the counters."""
+    from extensions import db
+    from models.tools import Tools
+    from utils.inventory_counters import rebuild_inventory_counters
+
+    tool = Tools.query.filter_by(tool_id_number=seed_tool).first()
+    tool.category = "Construction"
+    db.session.commit()
+    _summary()  # counters initialized from the table before the edits below
+
+    tool.checked_out_by = "admin"  # tool expired by the commit: its old checked_out_by was never loaded
+    db.session.commit()
+    tool.category = "Aviation"
+    tool.tool_status = "Checked Out"
+    db.session.commit()
+    s = _summary()
+    assert s["checked_out"] == 1
+    assert s["by_category"] == [{"category": "Aviation", "total": 1, "checked_out": 1, "in_stock": 0}]
+    assert s["by_status"] == [{"status": "Checked Out", "count": 1}]
+
+    rebuild_inventory_counters()
+    assert _summary() == s
+
+
+@pytest.mark.usefixtures("db_session")
+def test_counter_rows_written_in_key_order():
+    """Counter locks are always taken in one global order, whatever order the caller collected deltas in."""
+    from sqlalchemy import event
+    from extensions import db
+    from utils.inventory_counters import apply_counter_deltas
+
+    written = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "inventory_counters" in statement:
+            written.append(tuple(parameters[:2]))
+
+    deltas = {("category_out", "Y"): 1, ("tools", "checked_out"): 1, ("category_out", "X"): -1, ("status", "Lost"): 0}
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        apply_counter_deltas(db.session.connection(), deltas)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+    db.session.rollback()
+    assert written == [("category_out", "X"), ("category_out", "Y"), ("tools", "checked_out")]
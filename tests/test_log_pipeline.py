@@ -0,0 +1,73 @@
+"""Tests for the structured JSON-lines log pipeline and its ring buffer (utils/log_pipeline.py)."""
+import json
+import logging
+import queue
+
+import pytest
+
+from utils import log_pipeline
+from utils.log_reader import LogQuery, query_logs
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    log_file = tmp_path / "atems.log"
+    log_pipeline.install_log_pipeline(lambda: logging.FileHandler(log_file, encoding="utf-8"), logging.INFO)
+    yield log_file
+    log_pipeline.shutdown_log_pipeline()
+
+
+def _json_lines(path):
+    log_pipeline.flush_log_pipeline()
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+@pytest.mark.usefixtures("db_session", "seed_user")
+def test_request_records_carry_request_id_and_duration(client, seed_user, pipeline):
+    """The [PERF] record of a request is a JSON line with the request's X-Request-ID and perf_duration_ms."""
+    rv = client.get("/api/health", headers={"X-Request-ID": "req-abc-123"})
+    assert rv.headers["X-Request-ID"] == "req-abc-123"
+    perf = [r for r in _json_lines(pipeline) if r.get("request_id") == "req-abc-123" and "perf_duration_ms" in r]
+    assert perf and perf[0]["message"].startswith("[PERF]")
+    assert list(perf[0])[:4] == ["ts", "level", "name", "message"]
+    assert isinstance(perf[0]["perf_duration_ms"], float)
+
+
+def test_exceptions_and_file_reader(pipeline):
+    """Tracebacks go to "exc"; the backwards file reader understands JSON lines."""
+    log = logging.getLogger("atems.test")
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        log.exception("import failed for %s", "row 7")
+    rec = [r for r in _json_lines(pipeline) if r["name"] == "atems.test"][-1]
+    assert rec["level"] == "ERROR" and rec["message"] == "import failed for row 7"
+    assert "ValueError: boom" in rec["exc"]
+    out = query_logs(str(pipeline), LogQuery(level="ERROR", search="row 7"))
+    assert out["count"] == 1 and out["logs"][0]["message"].startswith("import failed for row 7\nTraceback")
+
+
+@pytest.mark.usefixtures("db_session", "seed_user")
+def test_api_logs_answers_from_ring_buffer(client, seed_user, pipeline):
+    username, _, password = seed_user
+    client.post("/login", data={"username": username, "password": password})
+    for i in range(5):
+        logging.getLogger("atems.test").warning("ring record %d", i)
+    # Default is the file: the ring only holds this worker's records
+    assert client.get("/api/logs?level=WARNING&search=ring record&limit=3").get_json()["source"] == "file"
+    data = client.get("/api/logs?level=WARNING&search=ring record&limit=3&source=memory").get_json()
+    assert data["source"] == "memory"
+    assert [r["message"] for r in data["logs"]] == ["ring record 2", "ring record 3", "ring record 4"]
+    # More than the buffer can prove it holds: falls back to the log file
+    data = client.get("/api/logs?search=ring record&limit=50&source=memory").get_json()
+    assert data["source"] == "file"
+
+
+def test_full_queue_drops_instead_of_blocking(pipeline, monkeypatch):
+    p = log_pipeline._current_pipeline()
+    full = queue.Queue(1)
+    full.put_nowait(None)
+    monkeypatch.setattr(p, "queue", full)
+    logging.getLogger("atems.test").warning("dropped")
+    assert log_pipeline.log_pipeline_info()["dropped"] == 1
+    monkeypatch.undo()
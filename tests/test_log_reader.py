@@ -0,0 +1,114 @@
+"""Tests for the backwards, indexed log reader behind /api/logs (utils/log_reader.py)."""
+import json
+import os
+
+import pytest
+
+from utils import log_reader
+from utils.log_reader import LogQuery, query_logs
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(log_reader, "INDEX_CHUNK", 4096)
+    monkeypatch.setattr(log_reader, "BLOCK_SIZE", 1024)
+    log_reader.clear_log_index_cache()
+    yield
+    log_reader.clear_log_index_cache()
+
+
+def _line(i, level="INFO", day="2026-10-17"):
+    return f"{day} {i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d},000 - atems - {level} - event {i}\n"
+
+
+def _write(path, lines):
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(lines)
+
+
+def test_tail_reads_only_the_end(tmp_path):
+    """Newest `limit` records come back oldest first; only the tail of a large file is read."""
+    log = tmp_path / "atems.log"
+    lines = [_line(i) for i in range(5000)]
+    lines.insert(4990, "Traceback (most recent call last):\n  File \"x.py\", line 1\nValueError: boom\n")
+    _write(log, lines)
+    out = query_logs(str(log), LogQuery(limit=5))
+    assert [r["message"] for r in out["logs"]] == [f"event {i}" for i in range(4995, 5000)]
+    assert out["scanned_bytes"] <= 2048 < os.path.getsize(log)
+    # Traceback lines belong to the record above them
+    out = query_logs(str(log), LogQuery(limit=12))
+    assert out["logs"][1]["message"] == "event 4989\nTraceback (most recent call last):\n  File \"x.py\", line 1\nValueError: boom"
+
+
+def test_level_filter_skips_indexed_chunks(tmp_path):
+    """
+    The first rare-level query reads the file once (no separate indexing pass) and indexes the slabs it read;
+    the next one skips slabs with no such level.
+    """
+    log = tmp_path / "atems.log"
+    lines = [_line(i) for i in range(5000)]
+    lines[10] = _line(10, "ERROR")
+    _write(log, lines)
+    out = query_logs(str(log), LogQuery(level="ERROR"))
+    assert [r["message"] for r in out["logs"]] == ["event 10"]
+    assert out["scanned_bytes"] <= os.path.getsize(log)
+    sidecar = json.loads((tmp_path / "atems.log.index.json").read_text())
+    assert sum(len(e["chunks"]) for e in sidecar["files"].values()) > 10
+    out = query_logs(str(log), LogQuery(level="ERROR"))
+    assert [r["message"] for r in out["logs"]] == ["event 10"]
+    assert out["scanned_bytes"] < os.path.getsize(log) // 10
+
+    # Appended lines extend the index instead of rebuilding it
+    with open(log, "a", encoding="utf-8") as f:
+        f.writelines([_line(i, "WARNING" if i == 5100 else "INFO") for i in range(5000, 6000)])
+    out = query_logs(str(log), LogQuery(level="WARNING"))
+    assert [r["message"] for r in out["logs"]] == ["event 5100"]
+    assert query_logs(str(log), LogQuery(level="CRITICAL"))["count"] == 0
+
+
+def test_time_range_and_search(tmp_path):
+    log = tmp_path / "atems.log"
+    _write(log, [_line(i, day="2026-10-16") for i in range(2000)] + [_line(i) for i in range(2000)])
+    out = query_logs(str(log), LogQuery(limit=1000, since="2026-10-17", until="2026-10-17 00:00:09"))
+    assert [r["message"] for r in out["logs"]] == [f"event {i}" for i in range(10)]
+    out = query_logs(str(log), LogQuery(limit=3, search="event 199", until="2026-10-16"))
+    assert [(r["timestamp"][:10], r["message"]) for r in out["logs"]] == [
+        ("2026-10-16", "event 1997"), ("2026-10-16", "event 1998"), ("2026-10-16", "event 1999"),
+    ]
+
+
+def test_rotated_files_are_read_transparently(tmp_path):
+    """Records continue into atems.log.1, .2 (older); an index built before rotation is kept for the renamed file."""
+    log = tmp_path / "atems.log"
+    _write(log, [_line(i, "ERROR" if i == 5 else "INFO") for i in range(1000)])
+    assert query_logs(str(log), LogQuery(level="ERROR"))["count"] == 1
+    os.rename(log, tmp_path / "atems.log.1")
+    os.utime(tmp_path / "atems.log.1", (1, 1))
+    _write(log, [_line(i) for i in range(1000, 1003)])
+    out = query_logs(str(log), LogQuery(limit=5))
+    assert [r["message"] for r in out["logs"]] == [f"event {i}" for i in (998, 999, 1000, 1001, 1002)]
+    out = query_logs(str(log), LogQuery(level="ERROR"))
+    assert [r["message"] for r in out["logs"]] == ["event 5"]
+    sidecar = json.loads((tmp_path / "atems.log.index.json").read_text())
+    assert str(os.stat(tmp_path / "atems.log.1").st_ino) in "".join(sidecar["files"])
+
+
+def test_scan_budget_truncates(tmp_path, monkeypatch):
+    log = tmp_path / "atems.log"
+    _write(log, [_line(i) for i in range(5000)])
+    monkeypatch.setattr(log_reader, "SCAN_MAX_BYTES", 8192)
+    out = query_logs(str(log), LogQuery(search="no such text"))
+    assert out["truncated"] is True and out["count"] == 0
+    assert out["scanned_bytes"] < os.path.getsize(log)
+
+
+def test_cold_index_respects_scan_budget(tmp_path, monkeypatch):
+    """A filtered query on an unindexed log reads no more than the budget and indexes only what it read."""
+    log = tmp_path / "atems.log"
+    _write(log, [_line(i) for i in range(5000)])
+    monkeypatch.setattr(log_reader, "SCAN_MAX_BYTES", 16384)
+    out = query_logs(str(log), LogQuery(level="ERROR"))
+    assert out["truncated"] is True and out["scanned_bytes"] < 16384 + 4096
+    sidecar = json.loads((tmp_path / "atems.log.index.json").read_text())
+    chunks = [c for e in sidecar["files"].values() for c in e["chunks"]]
+    assert chunks and chunks[0][0] > os.path.getsize(log) - out["scanned_bytes"] - 1
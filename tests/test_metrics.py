@@ -0,0 +1,88 @@
+"""Tests for the per-route latency and SQL-per-request histograms at /metrics (metrics.py)."""
+import os
+import subprocess
+import sys
+
+import pytest
+from sqlalchemy import event
+
+pytest.importorskip("prometheus_client")
+from prometheus_client.parser import text_string_to_metric_families  # noqa: E402
+
+
+def _samples(client):
+    rv = client.get("/metrics")
+    assert rv.status_code == 200
+    return [s for family in text_string_to_metric_families(rv.get_data(as_text=True)) for s in family.samples]
+
+
+def _value(samples, name, **labels):
+    return sum(s.value for s in samples if s.name == name and all(s.labels.get(k) == v for k, v in labels.items()))
+
+
+@pytest.mark.usefixtures("db_session", "seed_user", "seed_tool")
+def test_route_latency_and_query_counts(client, seed_user):
+    from extensions import db
+
+    username, _, password = seed_user
+    client.post("/login", data={"username": username, "password": password})
+    before = _samples(client)
+
+    statements = []
+
+    def count(conn, cursor, statement, params, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", count)
+    try:
+        assert client.get("/api/tools?checked_out=true").status_code == 200
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count)
+    assert statements
+    assert client.get("/no/such/page/12345").status_code == 404
+
+    after = _samples(client)
+    route = {"route": "/api/tools", "method": "GET"}
+    assert (_value(after, "atems_http_request_duration_seconds_count", status="200", **route)
+            - _value(before, "atems_http_request_duration_seconds_count", status="200", **route)) == 1
+    # Labeled by route template: the query string and unknown paths never become series of their own
+    assert (_value(after, "atems_http_request_db_queries_sum", **route)
+            - _value(before, "atems_http_request_db_queries_sum", **route)) == len(statements)
+    assert _value(after, "atems_http_request_db_duration_seconds_sum", **route) > 0
+    assert _value(after, "atems_http_request_duration_seconds_count", route="<unmatched>", status="404") >= 1
+    assert not any("12345" in str(s.labels) for s in after)
+
+
+_MULTIPROCESS_SCRIPT = r"""
+import os, runpy, sys
+sys.path.insert(0, os.getcwd())
+conf = runpy.run_path("gunicorn.conf.py")          # sets PROMETHEUS_MULTIPROC_DIR before prometheus_client loads
+conf["on_starting"](None)
+import metrics
+from flask import Flask
+
+for n in (1, 2, 3):                                # three "workers", each serving n requests, then exiting
+    pid = os.fork()
+    if pid == 0:
+        for _ in range(n):
+            metrics.observe_request("/api/tools", "GET", "200 OK", 0.01, metrics.RequestDbStats())
+        os._exit(0)
+    os.waitpid(pid, 0)
+    conf["child_exit"](None, type("W", (), {"pid": pid}))
+
+app = Flask(__name__)
+app.register_blueprint(metrics.metrics_bp)
+print(app.test_client().get("/metrics").get_data(as_text=True))
+"""
+
+
+def test_multiprocess_scrape_sums_all_workers(tmp_path):
+    """With gunicorn.conf.py's hooks, /metrics reports every worker's samples, including exited workers'."""
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+    (tmp_path / "counter_99999.db").write_bytes(b"stale")  # previous run; on_starting must remove it
+    out = subprocess.run([sys.executable, "-c", _MULTIPROCESS_SCRIPT], env=env, capture_output=True, text=True,
+                         cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), timeout=60)
+    assert out.returncode == 0, out.stderr
+    samples = [s for family in text_string_to_metric_families(out.stdout) for s in family.samples]
+    assert _value(samples, "atems_http_request_duration_seconds_count", route="/api/tools", status="200") == 6
+    assert _value(samples, "atems_http_request_db_queries_count", route="/api/tools") == 6
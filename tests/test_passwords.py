@@ -0,0 +1,79 @@
+"""Tests for bcrypt cost, rehash-on-login and the bounded hashing pool (utils/passwords.py)."""
+import threading
+
+import pytest
+
+from utils import passwords
+
+
+def test_hash_rounds_and_needs_rehash(monkeypatch):
+    monkeypatch.setattr(passwords, "BCRYPT_ROUNDS", 4)
+    h = passwords.hash_password("secret")
+    assert passwords.hash_rounds(h) == 4
+    assert passwords.verify_password("secret", h)
+    assert not passwords.verify_password("wrong", h)
+    assert not passwords.needs_rehash(h)
+    monkeypatch.setattr(passwords, "BCRYPT_ROUNDS", 5)
+    assert passwords.needs_rehash(h)
+    assert not passwords.verify_password("secret", "not-a-bcrypt-hash")
+    assert passwords.hash_rounds("plain") is None
+
+
+@pytest.mark.usefixtures("db_session")
+def test_login_rehashes_when_cost_changes(client, monkeypatch):
+    """A successful DB login upgrades a hash made at the old cost; the password still works afterwards."""
+    from extensions import db
+    from models.user import User
+
+    monkeypatch.setattr(passwords, "BCRYPT_ROUNDS", 4)
+    u = User(first_name="Old", last_name="Hash", username="oldhash", email="oldhash@example.com", badge_id="OLD001",
+             phone="5551112222", department="ATEMS", supervisor_username="admin",
+             supervisor_email="admin@example.com", supervisor_phone="5550000000")
+    u.set_password("pw-123")
+    db.session.add(u)
+    db.session.commit()
+
+    monkeypatch.setattr(passwords, "BCRYPT_ROUNDS", 5)
+    rv = client.post("/login", data={"username": "oldhash", "password": "pw-123"})
+    assert rv.status_code == 302
+    db.session.expire_all()
+    user = User.query.filter_by(username="oldhash").first()
+    assert passwords.hash_rounds(user.password_hash) == 5
+    assert user.check_password("pw-123")
+
+
+@pytest.mark.usefixtures("db_session", "seed_user")
+def test_login_busy_when_hash_queue_full(client, seed_user, monkeypatch):
+    """With the hashing queue full the login page answers 503 + Retry-After instead of queueing more CPU work."""
+    username, _, password = seed_user
+    monkeypatch.setattr(passwords, "_pending", threading.BoundedSemaphore(1))
+    passwords._pending.acquire()
+    rv = client.post("/login", data={"username": username, "password": password})
+    assert rv.status_code == 503
+    assert rv.headers.get("Retry-After") == "2"
+    assert b"try again" in rv.data
+
+
+def test_hashing_busy_handled_outside_the_blueprint(app):
+    """Flask-Admin user forms hash too: HashingBusy is a 503 app-wide, not just on the main blueprint's views."""
+    for path, kind in (("/admin/user/new/", "text/plain"), ("/api/users", "application/json")):
+        with app.test_request_context(path, method="POST"):
+            rv = app.make_response(app.handle_user_exception(passwords.HashingBusy("full")))
+        assert rv.status_code == 503, path
+        assert rv.headers["Retry-After"] == "2"
+        assert rv.mimetype == kind
+
+
+def test_env_credentials_parsed_once_and_read_only(monkeypatch):
+    """Env users become a read-only map of digests; passwords are checked by constant-time digest compare."""
+    import routes
+
+    monkeypatch.setenv("ADMIN_USERNAME", "crib-admin")
+    monkeypatch.setenv("ADMIN_PASSWORD", "s3cret")
+    monkeypatch.setattr(routes, "_ENV_USERS", routes._load_env_users())
+    assert routes._check_env_password("crib-admin", "s3cret") == (True, "admin")
+    assert routes._check_env_password("crib-admin", "wrong") == (False, "")
+    assert routes._check_env_password("no-such-env-user", "s3cret") == (False, "")
+    with pytest.raises(TypeError):
+        routes._ENV_USERS["intruder"] = routes._ENV_USERS["crib-admin"]
+    assert all(isinstance(e.digest, bytes) and len(e.digest) == 32 for e in routes._ENV_USERS.values())
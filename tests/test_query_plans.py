@@ -0,0 +1,83 @@
+"""EXPLAIN every query the hot endpoints run against tools/checkout_history; none may fall back to a full table scan."""
+import re
+
+import pytest
+from sqlalchemy import event
+
+HOT_TABLES = ("tools", "checkout_history")
+
+HOT_GETS = (
+    "/dashboard",
+    "/api/stats",
+    "/api/reports/overdue-returns",
+    "/api/history",
+    "/api/reports/usage",
+    "/api/reports/usage?action=checkout&date_from=2026-01-01",
+    "/api/tools",
+    "/api/tools?checked_out=true",
+    "/api/tools?category=Construction",
+    "/api/tools?status=In%20Stock",
+)
+
+_TOUCHES_HOT = re.compile(r"\b(?:from|update|join)\s+\"?(?:%s)\b" % "|".join(HOT_TABLES), re.I)
+# SQLite: "SCAN tools" (or "SCAN TABLE tools" before 3.36) without USING ... INDEX is a full table scan
+_SQLITE_SCAN = re.compile(r"^SCAN (?:TABLE )?(%s)\b(?!.*\bINDEX\b)" % "|".join(HOT_TABLES))
+_PG_SCAN = re.compile(r"Seq Scan on (%s)\b" % "|".join(HOT_TABLES))
+
+
+def _capture(engine):
+    seen = []
+
+    def before(conn, cursor, statement, params, context, executemany):
+        if not executemany and re.match(r"\s*(select|update|delete)\b", statement, re.I) and _TOUCHES_HOT.search(statement):
+            seen.append((statement, params))
+
+    event.listen(engine, "before_cursor_execute", before)
+    return seen, lambda: event.remove(engine, "before_cursor_execute", before)
+
+
+def _full_scans(engine, statement, params):
+    """Tables the planner would read in full for this statement."""
+    dialect = engine.dialect.name
+    with engine.connect() as conn:
+        if dialect == "sqlite":
+            plan = [row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, params)]
+            return [m.group(1) for m in map(_SQLITE_SCAN.match, plan) if m]
+        if dialect == "postgresql":
+            # Tiny test tables are cheapest to seq-scan; disable that so only a missing index shows up as one
+            conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+            plan = [row[0] for row in conn.exec_driver_sql("EXPLAIN " + statement, params)]
+            return [m.group(1) for m in map(_PG_SCAN.search, plan) if m]
+    pytest.skip(f"no plan check for {dialect}")
+
+
+@pytest.mark.usefixtures("db_session", "seed_user", "seed_tool")
+def test_hot_endpoints_use_indexes(client, seed_user, seed_tool, monkeypatch):
+    from extensions import db
+
+    monkeypatch.setenv("ATEMS_DASHBOARD_PARALLEL", "0")
+    username, badge_id, password = seed_user
+    client.post("/login", data={"username": username, "password": password})
+    # One tool checked out so the overdue-returns history lookup runs too
+    assert client.post("/api/checkinout", json={
+        "username": username, "badge_id": badge_id, "tool_id_number": seed_tool,
+    }).status_code == 200
+
+    seen, stop = _capture(db.engine)
+    try:
+        for path in HOT_GETS:
+            assert client.get(path).status_code == 200, path
+        assert client.post("/api/checkinout/batch", json=[{
+            "username": username, "badge_id": badge_id, "tool_id_number": seed_tool,
+            "client_time": "2026-10-17T10:00:00",
+        }]).status_code == 200
+    finally:
+        stop()
+
+    assert len(seen) >= len(HOT_GETS)
+    scans = {}
+    for statement, params in seen:
+        tables = _full_scans(db.engine, statement, params)
+        if tables:
+            scans[" ".join(statement.split())[:160]] = tables
+    assert scans == {}
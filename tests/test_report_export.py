@@ -0,0 +1,163 @@
+"""Tests for /api/reports/export and the report export helpers."""
+import csv
+import io
+
+import pytest
+
+
+def _login(client, seed_user):
+    username, _, password = seed_user
+    client.post("/login", data={"username": username, "password": password})
+
+
+def test_csv_stream_chunks_rows():
+    """Header is its own chunk; rows are grouped by chunk_rows."""
+    from utils.report_export import csv_stream
+
+    chunks = list(csv_stream(["a", "b"], iter([[1, 2], [3, 4], [5, 6]]), chunk_rows=2))
+    assert chunks[0] == "a,b\r\n"
+    assert chunks[1:] == ["1,2\r\n3,4\r\n", "5,6\r\n"]
+
+
+@pytest.mark.usefixtures("db_session")
+def test_inventory_csv_export_streams_all_tools(client, seed_user, seed_tool):
+    """Inventory CSV is streamed and contains the header plus every tool."""
+    _login(client, seed_user)
+    resp = client.get("/api/reports/export?type=inventory&format=csv")
+    assert resp.status_code == 200
+    assert resp.is_streamed
+    assert "atems_inventory_report.csv" in resp.headers["Content-Disposition"]
+    rows = list(csv.reader(io.StringIO(resp.get_data(as_text=True))))
+    assert rows[0][0] == "Tool ID"
+    assert [r[0] for r in rows[1:]] == [seed_tool]
+
+
+@pytest.mark.usefixtures("db_session")
+def test_export_invalid_type(client, seed_user):
+    _login(client, seed_user)
+    resp = client.get("/api/reports/export?type=nope")
+    assert resp.status_code == 400
+
+
+def _wait_for_job(client, status_url, timeout=10.0):
+    import time
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        body = client.get(status_url).get_json()
+        if body["status"] in ("done", "failed"):
+            return body
+        time.sleep(0.05)
+    raise AssertionError("export job did not finish")
+
+
+@pytest.mark.usefixtures("db_session")
+def test_usage_export_job_writes_full_history_in_chunks(client, seed_user, tmp_path, monkeypatch):
+    """Background export has no row cap, keeps newest-first order across chunks, and serves the file."""
+    from datetime import datetime, timedelta
+    from extensions import db
+    from models.checkout_history import CheckoutHistory
+    import utils.jobs
+    import utils.reports
+
+    monkeypatch.setattr(utils.jobs, "SPOOL_DIR", str(tmp_path))
+    monkeypatch.setattr(utils.reports, "EXPORT_YIELD_PER", 2)  # force several keyset chunks
+    base = datetime(2026, 1, 1, 8, 0)
+    for i in range(5):
+        db.session.add(CheckoutHistory(tool_id_number=f"T-{i}", username="testuser", action="checkout",
+                                       event_time=base + timedelta(hours=i)))
+    db.session.commit()
+
+    _login(client, seed_user)
+    resp = client.post("/api/reports/export-jobs", json={"type": "usage", "format": "csv"})
+    assert resp.status_code == 202
+    job = _wait_for_job(client, resp.get_json()["status_url"])
+    assert job["status"] == "done", job
+    assert (job["processed"], job["total"], job["percent"]) == (5, 5, 100.0)
+
+    dl = client.get(job["download_url"])
+    assert dl.status_code == 200
+    assert "atems_usage_report.csv" in dl.headers["Content-Disposition"]
+    rows = list(csv.reader(io.StringIO(dl.get_data(as_text=True))))
+    assert [r[2] for r in rows[1:]] == ["T-4", "T-3", "T-2", "T-1", "T-0"]
+    dl.close()
+
+
+@pytest.mark.usefixtures("db_session")
+def test_export_job_rejects_bad_format_and_unknown_id(client, seed_user):
+    _login(client, seed_user)
+    assert client.post("/api/reports/export-jobs", json={"type": "usage", "format": "doc"}).status_code == 400
+    assert client.get("/api/reports/export-jobs/nope").status_code == 404
+
+
+def test_write_xlsx_consumes_iterator_with_bold_header():
+    """Write-only workbook: header row is bold, every generated row lands in the sheet."""
+    import openpyxl
+    from utils.report_export import xlsx_table
+
+    data = xlsx_table(["Tool ID", "Name"], ((f"T-{i}", f"Tool {i}") for i in range(250)), sheet_name="Inventory")
+    ws = openpyxl.load_workbook(io.BytesIO(data)).active
+    assert ws.title == "Inventory"
+    assert ws.max_row == 251
+    assert ws["A1"].value == "Tool ID" and ws["A1"].font.bold
+    assert ws["B251"].value == "Tool 249"
+
+
+@pytest.mark.usefixtures("db_session")
+def test_inventory_xlsx_export(client, seed_user, seed_tool):
+    import openpyxl
+
+    _login(client, seed_user)
+    resp = client.get("/api/reports/export?type=inventory&format=xlsx")
+    assert resp.status_code == 200
+    assert "atems_inventory_report.xlsx" in resp.headers["Content-Disposition"]
+    ws = openpyxl.load_workbook(io.BytesIO(resp.get_data())).active
+    assert [c.value for c in ws[2]][0] == seed_tool
+    resp.close()
+
+
+def test_write_pdf_pages_fixed_row_chunks():
+    """Rows are split into fixed-size pages (title on page 1) and stats report throughput."""
+    from utils.report_export import write_pdf
+
+    buf = io.BytesIO()
+    stats = write_pdf(buf, ["Tool ID", "Name"], ([f"T-{i}", "x" * 500] for i in range(200)), title="Test")
+    assert stats["rows"] == 200
+    assert stats["pages"] == 4  # 55 rows on page 1, 58 after that
+    assert stats["rows_per_sec"] is None or stats["rows_per_sec"] > 0
+    assert buf.getvalue().startswith(b"%PDF")
+
+
+def test_write_pdf_empty_report_has_header_page():
+    from utils.report_export import write_pdf
+
+    assert write_pdf(io.BytesIO(), ["Tool ID"], iter([]))["pages"] == 1
+
+
+def test_fit_text_never_overflows_with_wide_glyphs():
+    """Wide and uppercase text is measured, not waved through by the length shortcut."""
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+
+    from utils.report_export import PDF_CELL_PADDING, PDF_FONT_SIZE, _fit_text
+
+    width = 50
+    for text in ("W" * 10, "@" * 8, "MMMMMM", "iiii", "Claw Hammer"):
+        fitted = _fit_text(text, width)
+        assert stringWidth(fitted, "Helvetica", PDF_FONT_SIZE) <= width - 2 * PDF_CELL_PADDING, text
+    assert _fit_text("iiii", width) == "iiii"
+    assert _fit_text("W" * 10, width).endswith("...")
+
+
+def test_fit_text_keeps_the_longest_prefix_that_fits():
+    """Same result as trimming one character at a time, found in one pass (a 100k-character cell is no slower)."""
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+
+    from utils.report_export import PDF_CELL_PADDING, PDF_FONT_SIZE, _fit_text
+
+    width = 80
+    room = width - 2 * PDF_CELL_PADDING
+    for text in ("Torque wrench 3/8in drive, calibrated", "W@ilMm" * 20, "x" * 100_000):
+        fitted = _fit_text(text, width)
+        prefix = fitted[:-3]
+        assert fitted.endswith("...") and text.startswith(prefix)
+        assert stringWidth(fitted, "Helvetica", PDF_FONT_SIZE) <= room
+        assert stringWidth(text[:len(prefix) + 1] + "...", "Helvetica", PDF_FONT_SIZE) > room
@@ -0,0 +1,73 @@
+"""Tests for the opt-in per-request SQL profiler (utils/sql_profiler.py)."""
+import pytest
+
+from utils import sql_profiler
+
+PROFILE = {sql_profiler.PROFILE_HEADER: "1"}
+
+
+@pytest.fixture
+def login(client, seed_user):
+    def _login(admin):
+        from extensions import db
+        from models.user import User
+
+        username, _, password = seed_user
+        User.query.filter_by(username=username).first().role = "admin" if admin else "user"
+        db.session.commit()
+        client.post("/login", data={"username": username, "password": password})
+    return _login
+
+
+@pytest.fixture(autouse=True)
+def empty_slow_list(monkeypatch):
+    monkeypatch.delenv("ATEMS_SQL_PROFILE", raising=False)
+    monkeypatch.setattr(sql_profiler, "SLOW_QUERY_MIN_MS", 0.0)
+    sql_profiler.clear_slow_queries()
+    yield
+    sql_profiler.clear_slow_queries()
+
+
+@pytest.mark.usefixtures("db_session", "seed_tool")
+def test_admin_header_profiles_request(client, login):
+    """Server-Timing lists the db total and the statements; the slowest ones are kept with their plan."""
+    login(admin=True)
+    assert "Server-Timing" not in client.get("/api/tools?checked_out=true").headers
+
+    rv = client.get("/api/tools?checked_out=true", headers=PROFILE)
+    timing = rv.headers["Server-Timing"]
+    assert timing.startswith("app;dur=")
+    assert "db;dur=" in timing and "sql-1;dur=" in timing and "tools" in timing
+
+    rv = client.get("/api/logs/slow-queries")
+    assert rv.status_code == 200
+    queries = rv.get_json()["queries"]
+    assert queries and all(q["route"] == "/api/tools" for q in queries)
+    durations = [q["duration_ms"] for q in queries]
+    assert durations == sorted(durations, reverse=True)
+    select = next(q for q in queries if "FROM tools" in q["statement"])
+    assert select["plan"], select["plan_error"]
+    assert "params" not in select and "parameters" not in select
+    assert b"Slowest SQL" in client.get("/logs").data
+
+
+@pytest.mark.usefixtures("db_session")
+def test_header_ignored_for_non_admins(client, login):
+    login(admin=False)
+    rv = client.get("/api/tools", headers=PROFILE)
+    assert rv.status_code == 200 and "Server-Timing" not in rv.headers
+    assert client.get("/api/logs/slow-queries").status_code == 403
+    assert b"Slowest SQL" not in client.get("/logs").data
+
+
+@pytest.mark.usefixtures("db_session", "seed_tool")
+def test_env_profiles_every_request_and_keeps_slowest_n(client, seed_user, seed_tool, monkeypatch):
+    """ATEMS_SQL_PROFILE=1 profiles anonymous requests too, but only admins get the SQL text in Server-Timing."""
+    monkeypatch.setenv("ATEMS_SQL_PROFILE", "1")
+    monkeypatch.setattr(sql_profiler, "SLOW_QUERY_COUNT", 2)
+    username, badge_id, _ = seed_user
+    rv = client.post("/api/checkinout", json={"username": username, "badge_id": badge_id, "tool_id_number": seed_tool})
+    assert rv.status_code == 200
+    timing = rv.headers["Server-Timing"]
+    assert "db;dur=" in timing and "sql-" not in timing and "SELECT" not in timing.upper()
+    assert 0 < len(sql_profiler.slow_queries()) <= 2
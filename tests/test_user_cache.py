@@ -0,0 +1,93 @@
+"""Tests for the per-process user-loader cache (utils/user_cache.py)."""
+import re
+
+import pytest
+from flask import g
+from sqlalchemy import event
+
+
+def _count_user_selects(engine):
+    seen = []
+
+    def before(conn, cursor, statement, params, context, executemany):
+        if re.match(r"\s*select\b", statement, re.I) and re.search(r'\bfrom\s+"?user"?\s', statement, re.I):
+            seen.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before)
+    return seen, lambda: event.remove(engine, "before_cursor_execute", before)
+
+
+@pytest.mark.usefixtures("db_session", "seed_user")
+def test_authenticated_requests_skip_user_select(client, seed_user):
+    """After login, repeat requests load current_user from the cache instead of SELECTing the users table."""
+    from extensions import db
+    username, _, password = seed_user
+    client.post("/login", data={"username": username, "password": password}, follow_redirects=True)
+
+    def fresh_get(path):
+        # The fixture's app context outlives each request; drop what it would otherwise keep between them
+        g.pop("_login_user", None)
+        db.session.remove()
+        return client.get(path)
+
+    fresh_get("/settings")  # warm
+
+    seen, stop = _count_user_selects(db.engine)
+    try:
+        for _ in range(3):
+            assert fresh_get("/settings").status_code == 200
+    finally:
+        stop()
+    assert seen == []
+
+
+@pytest.mark.usefixtures("db_session", "seed_user")
+def test_user_write_invalidates_cache(app):
+    """An ORM update to the user (admin edit, role change) is visible on the next load."""
+    from extensions import db
+    from models.user import User
+    from utils.user_cache import load_cached_user, user_cache_info
+
+    uid = User.query.filter_by(username="testuser").first().id
+    db.session.remove()
+    with app.test_request_context():
+        assert load_cached_user(uid).role == "user"
+    with app.test_request_context():
+        hits = user_cache_info()["hits"]
+        u = load_cached_user(uid)
+        assert user_cache_info()["hits"] == hits + 1
+        u.role = "admin"
+        db.session.commit()
+    with app.test_request_context():
+        assert load_cached_user(uid).is_admin()
+    with app.test_request_context():
+        db.session.delete(db.session.get(User, uid))
+        db.session.commit()
+    with app.test_request_context():
+        assert load_cached_user(uid) is None
+
+
+@pytest.mark.usefixtures("db_session", "seed_user")
+def test_unknown_username_login_skips_db(client, seed_user):
+    """Failed logins for names no user has are rejected from the known-username set without a users query."""
+    from extensions import db
+    from models.user import User
+
+    client.post("/login", data={"username": "nobody-1", "password": "x"})  # loads the set
+    seen, stop = _count_user_selects(db.engine)
+    try:
+        for i in range(5):
+            rv = client.post("/login", data={"username": f"nobody-{i}", "password": "x"})
+            assert b"Invalid username or password" in rv.data
+    finally:
+        stop()
+    assert seen == []
+
+    # A user created in this process is known immediately
+    u = User(first_name="New", last_name="User", username="newbie", email="newbie@example.com", badge_id="NEW001",
+             phone="5553334444", department="ATEMS", supervisor_username="admin",
+             supervisor_email="admin@example.com", supervisor_phone="5550000000")
+    u.set_password("newpass")
+    db.session.add(u)
+    db.session.commit()
+    assert client.post("/login", data={"username": "newbie", "password": "newpass"}).status_code == 302
@@ -1,34 +1,158 @@
 # calibration.py - Parse calibration dates, detect overdue
 
-from datetime import datetime, timedelta
-from typing import Optional
+import os
+import time
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Optional, Tuple
 
+# Tried in order; order matters for ambiguous values like 03/04/2027 (month first wins).
+CALIBRATION_DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%m/%d/%Y", "%d/%m/%Y")
 
-def parse_calibration_due(value: Optional[str]) -> Optional[datetime]:
-    """Parse tool_calibration_due string to date. Returns None if N/A or unparseable."""
-    if not value or (value or "").strip().upper() in ("", "N/A", "NA", "NONE"):
-        return None
-    s = (value or "").strip()
+# Distinct due strings kept in the parse cache (per process). Dates repeat heavily across tools.
+PARSE_CACHE_SIZE = int(os.environ.get("ATEMS_CALIBRATION_CACHE_SIZE", "16384"))
+
+_NA_VALUES = ("", "N/A", "NA", "NONE")
+
+# (today, expires_at epoch seconds): recomputed after local midnight, not on every call
+_today_cache: Tuple[Optional[date], float] = (None, 0.0)
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_due_cached(s: str) -> Tuple[Optional[datetime], Optional[str]]:
+    """Parse one stripped due string. Returns (datetime, matched format) or (None, None); memoized per string."""
+    if s.upper() in _NA_VALUES:
+        return None, None
     s_date = s[:10] if len(s) >= 10 else s
-    for fmt in ("%Y-%m-%d", "%Y/%m/%d", "%m/%d/%Y", "%d/%m/%Y"):
+    for fmt in CALIBRATION_DATE_FORMATS:
         try:
-            return datetime.strptime(s_date, fmt)
+            return datetime.strptime(s_date, fmt), fmt
         except ValueError:
             continue
-    return None
+    return None, None
+
+
+def parse_calibration_due(value: Optional[str]) -> Optional[datetime]:
+    """Parse tool_calibration_due string to date. Returns None if N/A or unparseable."""
+    if not value:
+        return None
+    return _parse_due_cached(value.strip())[0]
+
+
+def calibration_due_format(value: Optional[str]) -> Optional[str]:
+    """strptime format that matched value (e.g. '%m/%d/%Y'), or None."""
+    if not value:
+        return None
+    return _parse_due_cached(value.strip())[1]
 
 
-def is_calibration_overdue(cal_due_str: Optional[str]) -> bool:
+def calibration_today() -> date:
+    """Local date, computed once per day and shared by reports, reminders, and the dashboard."""
+    global _today_cache
+    today, expires = _today_cache
+    now = time.time()
+    if today is None or now >= expires:
+        today = datetime.fromtimestamp(now).date()
+        next_midnight = datetime.combine(today + timedelta(days=1), datetime.min.time())
+        _today_cache = (today, next_midnight.timestamp())
+    return today
+
+
+def calibration_cache_info() -> dict:
+    """Parse-cache hit/miss counters (for /api/system/health)."""
+    info = _parse_due_cached.cache_info()
+    total = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "maxsize": info.maxsize,
+        "hit_rate": round(info.hits / total, 4) if total else None,
+        "today": calibration_today().isoformat(),
+    }
+
+
+def clear_calibration_cache() -> None:
+    """Drop memoized parses and the cached date (tests, or after a clock change)."""
+    global _today_cache
+    _parse_due_cached.cache_clear()
+    _today_cache = (None, 0.0)
+
+
+def is_calibration_overdue(cal_due_str: Optional[str], today: Optional[date] = None) -> bool:
     """True if calibration_due is a valid date and is in the past."""
     dt = parse_calibration_due(cal_due_str)
-    return dt is not None and dt.date() < datetime.now().date()
+    return dt is not None and dt.date() < (today or calibration_today())
 
 
-def calibration_due_soon(cal_due_str: Optional[str], days: int = 30) -> bool:
+def calibration_due_soon(cal_due_str: Optional[str], days: int = 30, today: Optional[date] = None) -> bool:
     """True if calibration is due within the next N days."""
     dt = parse_calibration_due(cal_due_str)
     if dt is None:
         return False
-    today = datetime.now().date()
+    today = today or calibration_today()
     due = dt.date()
     return today <= due <= (today + timedelta(days=days))
+
+
+def bucket_counts_from_strings(values, today=None) -> dict:
+    """
+    Single pass over raw tool_calibration_due strings (no ORM objects). Each string is parsed once.
+    Same buckets as calibration_bucket_counts.
+    """
+    today = today or calibration_today()
+    d30 = today + timedelta(days=30)
+    d60 = today + timedelta(days=60)
+    counts = {"calibrated": 0, "overdue": 0, "due_30": 0, "due_60": 0, "due_90": 0}
+    for value in values:
+        dt = parse_calibration_due(value)
+        if dt is None:
+            continue
+        due = dt.date()
+        counts["calibrated"] += 1
+        if due < today:
+            counts["overdue"] += 1
+        elif due <= d30:
+            counts["due_30"] += 1
+        elif due <= d60:
+            counts["due_60"] += 1
+        else:
+            counts["due_90"] += 1
+    return counts
+
+
+def calibration_bucket_counts(today=None) -> dict:
+    """
+    Calibration summary in one grouped query: SUM(CASE ...) over Tools.tool_calibration_due_date.
+    Returns dict: calibrated, overdue, due_30 (today..+30), due_60 (+31..+60), due_90 (after +60).
+    Falls back to one pass over the raw strings only if the typed column does not exist yet (migration not
+    applied); any other database error (outage, lock timeout) propagates.
+    """
+    from extensions import db
+    from models.tools import Tools
+    from sqlalchemy import case, func
+    from sqlalchemy.exc import OperationalError, ProgrammingError
+
+    today = today or calibration_today()
+    d30 = today + timedelta(days=30)
+    d60 = today + timedelta(days=60)
+    due = Tools.tool_calibration_due_date
+
+    def bucket(*criteria):
+        return func.coalesce(func.sum(case((db.and_(*criteria), 1), else_=0)), 0)
+
+    try:
+        row = db.session.query(
+            func.count(due),
+            bucket(due < today),
+            bucket(due >= today, due <= d30),
+            bucket(due > d30, due <= d60),
+            bucket(due > d60),
+        ).filter(due.isnot(None)).one()
+    except (OperationalError, ProgrammingError) as e:
+        if "tool_calibration_due_date" not in str(e.orig):
+            raise
+        db.session.rollback()  # PostgreSQL aborts the transaction on the error
+        values = (v for (v,) in db.session.query(Tools.tool_calibration_due).yield_per(5000))
+        return bucket_counts_from_strings(values, today)
+    return dict(zip(("calibrated", "overdue", "due_30", "due_60", "due_90"), (int(v or 0) for v in row)))
@@ -5,10 +5,10 @@ import smtplib
 import logging
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from datetime import datetime, timedelta
+from datetime import timedelta
 from typing import List, Tuple, Optional
 
-from utils.calibration import is_calibration_overdue, calibration_due_soon, parse_calibration_due
+from utils.calibration import is_calibration_overdue, calibration_due_soon, calibration_today
 
 logger = logging.getLogger(__name__)
 
@@ -48,6 +48,7 @@ def get_due_and_overdue_tools(tools_query):
     due_soon = []
     days = get_reminder_days()
     include_overdue = get_remind_overdue()
+    today = calibration_today()
 
     for t in tools_query:
         if not t.tool_calibration_due or (t.tool_calibration_due or "").strip().upper() in ("", "N/A", "NA"):
@@ -59,15 +60,32 @@ def get_due_and_overdue_tools(tools_query):
             "category": t.category or "",
             "tool_calibration_due": t.tool_calibration_due,
         }
-        if is_calibration_overdue(t.tool_calibration_due):
+        if is_calibration_overdue(t.tool_calibration_due, today):
             if include_overdue:
                 overdue.append(row)
-        elif calibration_due_soon(t.tool_calibration_due, days=days):
+        elif calibration_due_soon(t.tool_calibration_due, days=days, today=today):
             due_soon.append(row)
 
     return overdue, due_soon
 
 
+def get_due_and_overdue_counts() -> Tuple[int, int]:
+    """(overdue_count, due_soon_count) as indexed range counts on tool_calibration_due_date."""
+    from extensions import db
+    from models.tools import Tools
+    from sqlalchemy import func
+
+    today = calibration_today()
+    due = Tools.tool_calibration_due_date
+    overdue = 0
+    if get_remind_overdue():
+        overdue = db.session.query(func.count(Tools.id)).filter(due < today).scalar() or 0
+    due_soon = db.session.query(func.count(Tools.id)).filter(
+        due >= today, due <= today + timedelta(days=get_reminder_days())
+    ).scalar() or 0
+    return overdue, due_soon
+
+
 def build_email_body(overdue: list, due_soon: list, base_url: str = "") -> Tuple[str, str]:
     """Plain text and HTML body for calibration reminder email."""
     lines = ["ATEMS Calibration Reminder", ""]
@@ -116,11 +134,12 @@ def send_calibration_reminders(app=None) -> dict:
         app = create_app()
 
     with app.app_context():
+        # Only tools due within the reminder window (indexed range); the rest can't be due or overdue
+        horizon = calibration_today() + timedelta(days=get_reminder_days())
         tools = Tools.query.filter(
-            Tools.tool_calibration_due.isnot(None),
-            Tools.tool_calibration_due != "",
-            Tools.tool_calibration_due != "N/A",
-        ).order_by(Tools.tool_calibration_due).all()
+            Tools.tool_calibration_due_date.isnot(None),
+            Tools.tool_calibration_due_date <= horizon,
+        ).order_by(Tools.tool_calibration_due_date).all()
 
         overdue, due_soon = get_due_and_overdue_tools(tools)
         total = len(overdue) + len(due_soon)
@@ -0,0 +1,349 @@
+# checkinout.py - Check-in/check-out of one tool as a single locked transaction (scan guns, form, API)
+
+import logging
+import os
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import insert, select, update
+
+logger = logging.getLogger(__name__)
+
+# Re-reads when a concurrent scan changed the tool between our SELECT and UPDATE (only without row locks)
+SCAN_RETRIES = 3
+
+# /api/checkinout/batch: events per request, and events applied per transaction
+SCAN_BATCH_MAX = int(os.environ.get("ATEMS_SCAN_BATCH_MAX", "1000"))
+SCAN_BATCH_CHUNK = int(os.environ.get("ATEMS_SCAN_BATCH_CHUNK", "200"))
+
+# Events stamped further ahead of the server clock than this are rejected (not rewritten: the stored event_time must
+# be the client's, or a replayed batch would not be recognized as a duplicate)
+CLIENT_CLOCK_SKEW = timedelta(minutes=5)
+
+_CONDITIONS = ("Good", "Fair", "Damaged")
+
+
+def _tool_row(session, tool_id_number: str, username: str):
+    """
+    Tool columns plus the scanning user's badge_id in one SELECT, locking the tool row (FOR UPDATE OF tools on
+    PostgreSQL/MySQL; SQLite has no row locks and relies on the conditional UPDATE below). badge_id is NULL when
+    the user does not exist (users.badge_id is NOT NULL).
+    """
+    from models.tools import Tools as T
+    from models.user import User
+
+    badge = select(User.badge_id).where(User.username == username).scalar_subquery()
+    return session.execute(
+        select(
+            T.id, T.tool_id_number, T.tool_name, T.tool_status, T.category, T.checked_out_by,
+            T.tool_calibration_due, badge.label("badge_id"),
+        )
+        .where(T.tool_id_number == tool_id_number)
+        .with_for_update(of=T)
+    ).first()
+
+
+def _user_exists(session, username: str) -> bool:
+    from models.user import User
+    return session.execute(select(User.id).where(User.username == username)).first() is not None
+
+
+def apply_scan(
+    session,
+    username: str,
+    badge_id: str,
+    tool_id_number: str,
+    job_id: Optional[str] = None,
+    condition: Optional[str] = None,
+    return_by: Optional[datetime] = None,
+    event_time: Optional[datetime] = None,
+) -> Tuple[str, str, dict]:
+    """
+    Check the tool in (if this user has it) or out, inside the caller's transaction; the caller commits on
+    success and rolls back otherwise (releasing the row lock). Returns (status, message, extra) like
+    routes._checkinout_logic; extra has action and event_id (the new checkout_history id) on success.
+
+    Statements: locked tool+badge SELECT, conditional UPDATE of the tool, counter upserts, INSERT ... RETURNING.
+    """
+    from models.checkout_history import CheckoutHistory as H
+    from models.tools import Tools as T
+    from utils.calibration import is_calibration_overdue
+    from utils.inventory_counters import apply_counter_deltas, tool_counter_keys
+
+    for _attempt in range(SCAN_RETRIES + 1):
+        row = _tool_row(session, tool_id_number, username)
+        if row is None or row.badge_id is None:
+            if row is not None or not _user_exists(session, username):
+                return "error", f"User '{username}' not found. Check the username.", None
+            return "error", f"Tool '{tool_id_number}' not found. Check the tool ID.", None
+        if badge_id != row.badge_id:
+            return "error", f"Badge ID does not match user '{username}'. Please scan the correct badge.", None
+
+        now = event_time or datetime.now()
+        extra = {}
+        checkin = row.checked_out_by == username
+        if checkin:
+            values = {"checked_out_by": None, "checkin_time": now}
+        else:
+            if is_calibration_overdue(row.tool_calibration_due):
+                extra["calibration_warning"] = "This tool is overdue for calibration."
+            values = {"checked_out_by": username, "checkout_time": now}
+
+        # Only applies if nobody changed the tool since our SELECT (always true under a row lock). Without one
+        # (SQLite) a concurrent scan makes it miss; re-read and decide again, as if we had waited for the lock.
+        same_holder = T.checked_out_by.is_(None) if row.checked_out_by is None else T.checked_out_by == row.checked_out_by
+        res = session.execute(update(T).where(T.id == row.id, same_holder).values(**values))
+        if res.rowcount == 1:
+            break
+    else:
+        return "error", f"Tool {row.tool_name} was just scanned at another station. Please scan again.", None
+
+    deltas = Counter(tool_counter_keys(row.tool_status, row.category, values["checked_out_by"]))
+    deltas.subtract(tool_counter_keys(row.tool_status, row.category, row.checked_out_by))
+    apply_counter_deltas(session.connection(), {k: d for k, d in deltas.items() if d})
+
+    stmt = insert(H).values(
+        tool_id_number=row.tool_id_number,
+        tool_name=row.tool_name,
+        username=username,
+        action="checkin" if checkin else "checkout",
+        event_time=now,
+        job_id=job_id,
+        condition=condition,
+        return_by=None if checkin else return_by,
+    )
+    if session.get_bind().dialect.insert_returning:
+        event_id = session.execute(stmt.returning(H.id)).scalar_one()
+    else:
+        event_id = session.execute(stmt).inserted_primary_key[0]
+
+    extra["action"] = "checkin" if checkin else "checkout"
+    extra["event_id"] = event_id
+    if checkin:
+        logger.info(f"Tool {row.tool_id_number} checked in by {username}")
+        return "success", f"Tool {row.tool_name} checked in.", extra
+    logger.info(f"Tool {row.tool_id_number} checked out by {username}")
+    msg = f"Tool {row.tool_name} checked out."
+    if "calibration_warning" in extra:
+        msg += " ⚠ Calibration overdue."
+    return "success", msg, extra
+
+
+# --- Batch scans (offline scan-gun / mobile queues) ---
+
+class _ChunkConflict(Exception):
+    """A tool changed under a chunk between its read and write (no row locks); the chunk is retried."""
+
+
+def _parse_client_time(value) -> Optional[datetime]:
+    """ISO 8601 client timestamp -> naive local datetime (the checkout_history convention). None if invalid."""
+    if not isinstance(value, str) or not value.strip():
+        return None
+    try:
+        dt = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone().replace(tzinfo=None)
+    return dt
+
+
+def validate_scan_event(e) -> Tuple[Optional[dict], Optional[str]]:
+    """
+    Check one batch event (same rules as CheckInOutForm, plus a required client_time).
+    Returns (clean event, None) or (None, error message).
+    """
+    if not isinstance(e, dict):
+        return None, "Event must be an object."
+    username = str(e.get("username") or "").strip()
+    badge_id = str(e.get("badge_id") or "").strip()
+    tool_id = str(e.get("tool_id_number") or "").strip()
+    if not username:
+        return None, "Username is required."
+    if not badge_id:
+        return None, "Badge ID is required."
+    if not badge_id.replace(" ", "").isalnum():
+        return None, "Badge ID must be alphanumeric."
+    if not tool_id or len(tool_id) > 64:
+        return None, "Tool ID must be 1-64 characters."
+    if not all(c.isalnum() or c == "-" for c in tool_id):
+        return None, "Tool ID may only contain letters, numbers, and hyphens."
+    event_time = _parse_client_time(e.get("client_time"))
+    if event_time is None:
+        return None, "client_time must be an ISO 8601 timestamp."
+    if event_time > datetime.now() + CLIENT_CLOCK_SKEW:
+        return None, "client_time is more than 5 minutes in the future. Check the scanner's clock."
+    condition = str(e.get("condition") or "").strip() or None
+    if condition and condition not in _CONDITIONS:
+        return None, "Not a valid choice for condition."
+    return_by = None
+    if e.get("return_by"):
+        try:
+            return_by = datetime.combine(date.fromisoformat(str(e["return_by"])[:10]), time(23, 59, 59))
+        except ValueError:
+            return None, "return_by must be YYYY-MM-DD."
+    return {
+        "username": username,
+        "badge_id": badge_id,
+        "tool_id_number": tool_id,
+        "job_id": (str(e.get("job_id") or "").strip() or None),
+        "condition": condition,
+        "return_by": return_by,
+        "event_time": event_time,
+    }, None
+
+
+def _apply_chunk(session, chunk, users) -> List[dict]:
+    """
+    Apply one chunk of (index, event) in order inside the caller's transaction. Reads every tool of the chunk
+    with one locked IN query, replays the events in memory, then writes each touched tool once, the counter
+    deltas, and all history rows in one executemany INSERT. Returns per-event results.
+    """
+    from models.checkout_history import CheckoutHistory as H
+    from models.tools import Tools as T
+    from utils.calibration import is_calibration_overdue
+    from utils.inventory_counters import apply_counter_deltas, tool_counter_keys
+
+    tool_ids = sorted({ev["tool_id_number"] for _, ev in chunk})
+    rows = session.execute(
+        select(T.id, T.tool_id_number, T.tool_name, T.tool_status, T.category, T.checked_out_by, T.tool_calibration_due)
+        .where(T.tool_id_number.in_(tool_ids))
+        .order_by(T.id)  # same lock order in every transaction
+        .with_for_update(of=T)
+    ).all()
+    tools = {r.tool_id_number: r for r in rows}
+    holder = {tid: r.checked_out_by for tid, r in tools.items()}
+    times = {}  # tool_id_number -> {"checkout_time": ..., "checkin_time": ...}
+
+    # Events already recorded (same tool, user and client time): a replayed batch must not toggle tools again
+    seen = {}
+    for r in session.execute(
+        select(H.id, H.tool_id_number, H.username, H.event_time, H.action)
+        .where(H.tool_id_number.in_(tool_ids), H.event_time.in_({ev["event_time"] for _, ev in chunk}))
+    ):
+        seen[(r.tool_id_number, r.username, r.event_time)] = r
+
+    results, history, history_slots = [], [], []
+    for index, ev in chunk:
+        username, tid = ev["username"], ev["tool_id_number"]
+        res = {"index": index}
+        tool = tools.get(tid)
+        if username not in users:
+            res.update(status="error", message=f"User '{username}' not found. Check the username.")
+        elif tool is None:
+            res.update(status="error", message=f"Tool '{tid}' not found. Check the tool ID.")
+        elif ev["badge_id"] != users[username]:
+            res.update(status="error", message=f"Badge ID does not match user '{username}'. Please scan the correct badge.")
+        elif (tid, username, ev["event_time"]) in seen:
+            dup = seen[(tid, username, ev["event_time"])]
+            if isinstance(dup, dict):  # repeated within this batch
+                res.update(status="duplicate", message=f"Same scan as event {dup['index']}.", action=dup["action"])
+            else:
+                res.update(status="duplicate", message="Already recorded.", action=dup.action, event_id=dup.id)
+        else:
+            checkin = holder[tid] == username
+            action = "checkin" if checkin else "checkout"
+            if checkin:
+                holder[tid] = None
+                times.setdefault(tid, {})["checkin_time"] = ev["event_time"]
+                res.update(status="success", message=f"Tool {tool.tool_name} checked in.", action=action)
+            else:
+                holder[tid] = username
+                times.setdefault(tid, {})["checkout_time"] = ev["event_time"]
+                msg = f"Tool {tool.tool_name} checked out."
+                if is_calibration_overdue(tool.tool_calibration_due):
+                    res["calibration_warning"] = "This tool is overdue for calibration."
+                    msg += " ⚠ Calibration overdue."
+                res.update(status="success", message=msg, action=action)
+            seen[(tid, username, ev["event_time"])] = res  # the same scan twice in one batch counts once
+            history.append({
+                "tool_id_number": tid, "tool_name": tool.tool_name, "username": username, "action": action,
+                "event_time": ev["event_time"], "job_id": ev["job_id"], "condition": ev["condition"],
+                "return_by": None if checkin else ev["return_by"],
+            })
+            history_slots.append(res)
+        results.append(res)
+
+    deltas = Counter()
+    for tid, t in times.items():
+        row = tools[tid]
+        same_holder = T.checked_out_by.is_(None) if row.checked_out_by is None else T.checked_out_by == row.checked_out_by
+        upd = session.execute(update(T).where(T.id == row.id, same_holder).values(checked_out_by=holder[tid], **t))
+        if upd.rowcount != 1:
+            raise _ChunkConflict(tid)
+        deltas.update(tool_counter_keys(row.tool_status, row.category, holder[tid]))
+        deltas.subtract(tool_counter_keys(row.tool_status, row.category, row.checked_out_by))
+    apply_counter_deltas(session.connection(), {k: d for k, d in deltas.items() if d})
+
+    if history:
+        dialect = session.get_bind().dialect
+        if dialect.insert_executemany_returning_sort_by_parameter_order:
+            ids = session.execute(insert(H).returning(H.id, sort_by_parameter_order=True), history).scalars().all()
+        else:
+            ids = [session.execute(insert(H).values(**h)).inserted_primary_key[0] for h in history]
+        for res, event_id in zip(history_slots, ids):
+            res["event_id"] = event_id
+    return results
+
+
+def apply_scan_batch(session, events: list, chunk_size: Optional[int] = None) -> dict:
+    """
+    Validate and apply an ordered list of scan events (see validate_scan_event), committing every chunk_size
+    events. Users are resolved with one IN query for the whole batch. If a chunk fails on a database error
+    it is rolled back and the remaining events are reported as "skipped" so the client can resend them.
+    Returns {"results": [...one per event, in order...], "applied", "duplicates", "errors", "skipped", "complete"}.
+    """
+    from sqlalchemy.exc import SQLAlchemyError
+    from models.user import User
+
+    chunk_size = max(1, chunk_size or SCAN_BATCH_CHUNK)
+    results: List[Optional[dict]] = [None] * len(events)
+    valid = []
+    for i, raw in enumerate(events):
+        ev, err = validate_scan_event(raw)
+        if err:
+            results[i] = {"index": i, "status": "error", "message": err}
+        else:
+            valid.append((i, ev))
+
+    names = sorted({ev["username"] for _, ev in valid})
+    users = dict(session.execute(select(User.username, User.badge_id).where(User.username.in_(names))).all()) if names else {}
+
+    complete = True
+    for start in range(0, len(valid), chunk_size):
+        chunk = valid[start:start + chunk_size]
+        try:
+            for attempt in range(SCAN_RETRIES + 1):
+                try:
+                    chunk_results = _apply_chunk(session, chunk, users)
+                    session.commit()
+                    break
+                except _ChunkConflict:
+                    session.rollback()
+            else:
+                raise _ChunkConflict("retries exhausted")
+        except (SQLAlchemyError, _ChunkConflict) as e:
+            session.rollback()
+            logger.exception("Batch scan chunk starting at event %s failed: %s", chunk[0][0], e)
+            for i, _ in valid[start:]:
+                results[i] = {"index": i, "status": "skipped", "message": "Not applied (server error); send again."}
+            complete = False
+            break
+        for res in chunk_results:
+            results[res["index"]] = res
+
+    for res, raw in zip(results, events):
+        if isinstance(raw, dict) and raw.get("client_event_id") is not None:
+            res["client_event_id"] = raw["client_event_id"]
+    counts = Counter(r["status"] for r in results)
+    logger.info("Batch scan: %s events, %s applied, %s duplicate, %s error, %s skipped",
+                len(events), counts["success"], counts["duplicate"], counts["error"], counts["skipped"])
+    return {
+        "results": results,
+        "applied": counts["success"],
+        "duplicates": counts["duplicate"],
+        "errors": counts["error"],
+        "skipped": counts["skipped"],
+        "complete": complete,
+    }
@@ -2,8 +2,22 @@
 
 import csv
 import io
+import logging
+import os
 import re
-from typing import List, Tuple, Dict, Any, Optional
+import time
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Rows per INSERT ... ON CONFLICT batch and per commit in import_tools_rows
+IMPORT_CHUNK_SIZE = int(os.environ.get("ATEMS_IMPORT_CHUNK_SIZE", "1000"))
+
+# Parallel validation: process count, file size (rows) that switches it on, rows per task
+IMPORT_WORKERS = int(os.environ.get("ATEMS_IMPORT_WORKERS") or os.cpu_count() or 1)
+IMPORT_PARALLEL_MIN_ROWS = int(os.environ.get("ATEMS_IMPORT_PARALLEL_MIN_ROWS", "50000"))
+IMPORT_VALIDATE_CHUNK_SIZE = int(os.environ.get("ATEMS_IMPORT_VALIDATE_CHUNK_SIZE", "5000"))
 
 # Expected columns (case-insensitive). Required: tool_id_number, tool_name.
 # Optional: tool_location, tool_status, tool_calibration_due, tool_calibration_date,
@@ -53,56 +67,92 @@ def _normalize_header_map(headers: List[str]) -> Dict[str, int]:
     return {k: v for k, v in out.items() if v >= 0}
 
 
+def _binary_stream(source):
+    """File-like binary stream for bytes or an upload stream (werkzeug FileStorage.stream)."""
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    return source
+
+
+def _cell_text(c) -> str:
+    return str(c).strip() if c is not None else ""
+
+
+def iter_csv_rows(source) -> Iterator[List[str]]:
+    """Yield CSV rows one at a time from bytes or a binary stream (BOM stripped, bad bytes replaced)."""
+    text = io.TextIOWrapper(_binary_stream(source), encoding="utf-8-sig", errors="replace", newline="")
+    try:
+        yield from csv.reader(text)
+    finally:
+        text.detach()  # leave the caller's stream open
+
+
+def iter_xlsx_rows(source) -> Iterator[List[str]]:
+    """Yield rows of the first sheet as stripped strings (read-only workbook, rows read lazily)."""
+    import openpyxl
+    wb = openpyxl.load_workbook(_binary_stream(source), read_only=True, data_only=True)
+    try:
+        for row in wb.active.iter_rows(values_only=True):
+            yield [_cell_text(c) for c in row]
+    finally:
+        wb.close()
+
+
+def iter_file_rows(source, filename: str) -> Tuple[List[str], Iterator[Tuple[int, List[str]]]]:
+    """
+    Read the header row and return (headers, rows) where rows lazily yields (row_num, values) for each
+    non-blank data row. row_num is the 1-based record number in the file (header is row 1).
+    """
+    fn = (filename or "").lower()
+    raw = iter_xlsx_rows(source) if fn.endswith(".xlsx") or fn.endswith(".xls") else iter_csv_rows(source)
+    first = next(raw, None)
+    if first is None:
+        return [], iter(())
+    headers = [c.strip() for c in first]
+
+    def rows():
+        for row_num, row in enumerate(raw, start=2):
+            if any(c.strip() for c in row):
+                yield row_num, row
+
+    return headers, rows()
+
+
 def parse_csv(content: bytes) -> Tuple[List[str], List[List[str]]]:
     """Parse CSV bytes. Returns (headers, rows)."""
-    text = content.decode("utf-8-skip", errors="replace")
-    reader = csv.reader(io.StringIO(text))
-    rows = list(reader)
-    if not rows:
-        return [], []
-    headers = [c.strip() for c in rows[0]]
-    data_rows = [row for row in rows[1:] if any(c.strip() for c in row)]
-    return headers, data_rows
+    headers, rows = iter_file_rows(content, "upload.csv")
+    return headers, [row for _, row in rows]
 
 
 def parse_xlsx(content: bytes) -> Tuple[List[str], List[List[str]]]:
     """Parse first sheet of xlsx. Returns (headers, rows)."""
-    import openpyxl
-    wb = openpyxl.load_workbook(io.BytesIO(content), read_only=True, data_only=True)
-    ws = wb.active
-    rows = list(ws.iter_rows(values_only=True))
-    wb.close()
-    if not rows:
-        return [], []
-    headers = [str(c).strip() if c is not None else "" for c in rows[0]]
-    data_rows = []
-    for row in rows[1:]:
-        vals = [str(c).strip() if c is not None else "" for c in row]
-        if any(vals):
-            data_rows.append(vals)
-    return headers, data_rows
+    headers, rows = iter_file_rows(content, "upload.xlsx")
+    return headers, [row for _, row in rows]
 
 
 def parse_file(content: bytes, filename: str) -> Tuple[List[str], List[List[str]]]:
     """Parse CSV or xlsx by filename. Returns (headers, rows)."""
-    fn = (filename or "").lower()
-    if fn.endswith(".xlsx") or fn.endswith(".xls"):
-        return parse_xlsx(content)
-    return parse_csv(content)
+    headers, rows = iter_file_rows(content, filename)
+    return headers, [row for _, row in rows]
 
 
-def validate_tool_row(row: List[str], col_index: Dict[str, int], row_num: int) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
-    """
-    Validate one row and return (dict for Tools, None) or (None, error_message).
-    row_num is 1-based for display.
-    """
+_TOOL_ID_RE = re.compile(r"^[A-Za-z0-9\-]+$")
+_TOOL_FIELDS = ("tool_id_number", "tool_name") + tuple(sorted(TOOL_OPTIONAL))
+
+
+def _field_indexes(col_index: Dict[str, int]) -> Dict[str, Optional[int]]:
+    """Column position per tool field, resolved once per file instead of once per cell."""
+    return {f: col_index.get(f) for f in _TOOL_FIELDS}
+
+
+def _validate_values(row: List[str], idx: Dict[str, Optional[int]], row_num: int) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    n = len(row)
+
     def get(key: str) -> str:
-        idx = col_index.get(_normalize_header(key))
-        if idx is None:
-            return ""
-        if idx >= len(row):
+        i = idx[key]
+        if i is None or i >= n:
             return ""
-        return (row[idx] or "").strip()
+        return (row[i] or "").strip()
 
     tool_id = get("tool_id_number")
     tool_name = get("tool_name")
@@ -111,7 +161,7 @@ def validate_tool_row(row: List[str], col_index: Dict[str, int], row_num: int) -
         return None, f"Row {row_num}: tool_id_number is required"
     if len(tool_id) > 64:
         return None, f"Row {row_num}: tool_id_number too long"
-    if not re.match(r"^[A-Za-z0-9\-]+$", tool_id):
+    if not _TOOL_ID_RE.match(tool_id):
         return None, f"Row {row_num}: tool_id_number must be alphanumeric and hyphens only"
 
     if not tool_name:
@@ -132,74 +182,373 @@ def validate_tool_row(row: List[str], col_index: Dict[str, int], row_num: int) -
     }, None
 
 
-def parse_and_validate_tools(content: bytes, filename: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+def validate_tool_row(row: List[str], col_index: Dict[str, int], row_num: int) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
     """
-    Parse file and validate each row. Returns (valid_rows, errors).
-    errors: list of { "row": 1-based index, "message": "..." }
+    Validate one row and return (dict for Tools, None) or (None, error_message).
+    row_num is 1-based for display.
     """
-    headers, rows = parse_file(content, filename)
-    col_index = _normalize_header_map(headers)
+    return _validate_values(row, _field_indexes(col_index), row_num)
+
 
+def _validate_chunk(args) -> List[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """Process-pool task: validate a list of (row_num, row). Module-level so it pickles."""
+    idx, numbered_rows = args
+    return [(row_num,) + _validate_values(row, idx, row_num) for row_num, row in numbered_rows]
+
+
+def _chunked(it, size: int):
+    it = iter(it)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _validate_parallel(numbered_rows, idx, workers: int, chunk_size: int):
+    """
+    Validate chunks in a process pool and yield results in file order. At most 2 chunks per worker are
+    in flight, so the upload is still read incrementally.
+    """
+    import multiprocessing
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
+
+    # spawn: never fork a web worker that holds DB connections and threads
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        pending = deque()
+        for chunk in _chunked(numbered_rows, chunk_size):
+            pending.append(pool.submit(_validate_chunk, (idx, chunk)))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def _missing_columns_error(missing) -> Dict[str, Any]:
+    return {"row": 1, "message": f"Missing required column(s): {', '.join(sorted(missing))}. Use: tool_id_number (or Tool ID), tool_name (or Name)."}
+
+
+def iter_validated_tools(source, filename: str, parallel: bool = True) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]:
+    """
+    Stream (row_num, data, error, warning) per data row in file order: data is the validated dict or None,
+    error and warning are {"row", "message"} or None. A missing required column yields a single row-1 error.
+    Rows repeating a tool_id_number are all yielded (import_tools_rows applies them in order, so the later row
+    wins), each with a warning naming the previous row; the check runs on the ordered results, so it spans chunks.
+    Files estimated (estimate_row_count, before any row is parsed) at IMPORT_PARALLEL_MIN_ROWS rows or more are
+    validated in a process pool (parallel=True and IMPORT_WORKERS > 1).
+    """
+    use_pool = parallel and IMPORT_WORKERS > 1 and (estimate_row_count(source, filename) or 0) >= IMPORT_PARALLEL_MIN_ROWS
+    headers, rows = iter_file_rows(source, filename)
+    col_index = _normalize_header_map(headers)
     missing = TOOL_REQUIRED - set(col_index.keys())
     if missing:
-        return [], [{"row": 1, "message": f"Missing required column(s): {', '.join(sorted(missing))}. Use: tool_id_number (or Tool ID), tool_name (or Name)."}]
+        yield 1, None, _missing_columns_error(missing)
+        return
+    idx = _field_indexes(col_index)
+    if use_pool:
+        results = _validate_parallel(rows, idx, IMPORT_WORKERS, IMPORT_VALIDATE_CHUNK_SIZE)
+    else:
+        results = ((row_num,) + _validate_values(row, idx, row_num) for row_num, row in rows)
+    seen: Dict[str, int] = {}  # tool_id_number -> last row it was on
+    for row_num, data, err in results:
+        if err:
+            yield row_num, None, {"row": row_num, "message": err}, None
+            continue
+        tool_id = data["tool_id_number"]
+        prev = seen.get(tool_id)
+        seen[tool_id] = row_num
+        warning = None
+        if prev is not None:
+            warning = {"row": row_num, "message": f"Row {row_num}: tool_id_number {tool_id} repeats row {prev}; this row replaces it"}
+        yield row_num, data, None, warning
+
+
+def iter_tool_batches(source, filename: str, batch_size: int = 1000):
+    """
+    Stream validated rows in batches: yields (valid, row_nums, errors, warnings) with at most batch_size valid
+    rows. Memory depends on batch_size, not file size (plus one entry per distinct tool_id_number for the
+    duplicate warnings).
+    """
+    valid, row_nums, errors, warnings = [], [], [], []
+    for row_num, data, err, warning in iter_validated_tools(source, filename):
+        if err:
+            errors.append(err)
+            continue
+        if warning:
+            warnings.append(warning)
+        valid.append(data)
+        row_nums.append(row_num)
+        if len(valid) >= batch_size:
+            yield valid, row_nums, errors, warnings
+            valid, row_nums, errors, warnings = [], [], [], []
+    if valid or errors:
+        yield valid, row_nums, errors, warnings
+
+
+def preview_tools(source, filename: str, limit: int = 100) -> Dict[str, Any]:
+    """
+    Validate only until `limit` valid rows are found. Returns valid (<= limit), errors and duplicate warnings
+    seen so far, rows_scanned, and complete (False if the file has more rows that were not read).
+    """
+    valid, errors, warnings = [], [], []
+    scanned = 0
+    complete = True
+    it = iter_validated_tools(source, filename, parallel=False)
+    for _, data, err, warning in it:
+        scanned += 1
+        if err:
+            errors.append(err)
+        else:
+            if warning:
+                warnings.append(warning)
+            valid.append(data)
+            if len(valid) >= limit:
+                complete = next(it, None) is None
+                break
+    return {"valid": valid, "errors": errors, "warnings": warnings, "rows_scanned": scanned, "complete": complete}
 
+
+def parse_and_validate_tools(content: bytes, filename: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Parse file and validate each row. Returns (valid_rows, errors).
+    errors: list of { "row": 1-based index, "message": "..." }
+    """
     valid = []
     errors = []
-    for i, row in enumerate(rows):
-        row_num = i + 2  # 1-based + header row
-        data, err = validate_tool_row(row, col_index, row_num)
+    for _, data, err, _ in iter_validated_tools(content, filename):
         if err:
-            errors.append({"row": row_num, "message": err})
+            errors.append(err)
         else:
             valid.append(data)
     return valid, errors
 
 
-def import_tools_rows(rows: List[Dict[str, Any]]):  # noqa: no cover - uses db
+def _tool_values(r: Dict[str, Any]) -> Dict[str, Any]:
+    """Column values for one validated row (same truncation/defaults as the form)."""
+    from utils.calibration import parse_calibration_due
+
+    due = (r["tool_calibration_due"] or DEFAULT_NA)[:64]
+    due_dt = parse_calibration_due(due)
+    return {
+        "tool_id_number": r["tool_id_number"],
+        "tool_name": r["tool_name"][:64],
+        "tool_location": (r["tool_location"] or DEFAULT_NA)[:64],
+        "tool_status": (r["tool_status"] or "In Stock")[:64],
+        "tool_calibration_due": due,
+        # Core statements skip Tools._sync_calibration_due_date, so fill the typed column here
+        "tool_calibration_due_date": due_dt.date() if due_dt else None,
+        "tool_calibration_date": (r["tool_calibration_date"] or DEFAULT_NA)[:64],
+        "tool_calibration_cert": (r["tool_calibration_cert"] or DEFAULT_NA)[:64],
+        "tool_calibration_schedule": (r["tool_calibration_schedule"] or DEFAULT_NA)[:64],
+        "category": (r.get("category") or "")[:64] or None,
+    }
+
+
+def _upsert_chunk(session, values: List[Dict[str, Any]]) -> Tuple[int, int]:
     """
-    Insert or update tools. Uses Tools model and db from Flask app context.
-    Returns (created_count, updated_count, errors_list).
+    Insert-or-update one chunk (unique tool_id_number, at most once per chunk) and adjust inventory counters.
+    One SELECT for the existing rows, then INSERT ... ON CONFLICT DO UPDATE (PostgreSQL/SQLite) or
+    executemany UPDATE + INSERT elsewhere. Returns (created, updated).
     """
+    from collections import Counter
+    from sqlalchemy import bindparam, func
     from models.tools import Tools
+    from utils.inventory_counters import apply_counter_deltas, tool_counter_keys
+
+    t = Tools.__table__
+    ids = [v["tool_id_number"] for v in values]
+    existing = {
+        row.tool_id_number: row
+        for row in session.execute(
+            t.select().with_only_columns(t.c.tool_id_number, t.c.tool_status, t.c.category, t.c.checked_out_by)
+            .where(t.c.tool_id_number.in_(ids))
+        )
+    }
+
+    # Counter deltas (Core writes bypass the ORM flush listener); an empty category keeps the existing one
+    deltas = Counter()
+    for v in values:
+        old = existing.get(v["tool_id_number"])
+        if old is None:
+            deltas.update(tool_counter_keys(v["tool_status"], v["category"], None))
+        else:
+            deltas.subtract(tool_counter_keys(old.tool_status, old.category, old.checked_out_by))
+            deltas.update(tool_counter_keys(v["tool_status"], v["category"] or old.category, old.checked_out_by))
+
+    conn = session.connection()
+    dialect = conn.dialect.name
+    update_cols = [c for c in values[0] if c != "tool_id_number"]
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(t)
+        set_ = {c: stmt.excluded[c] for c in update_cols}
+        set_["category"] = func.coalesce(stmt.excluded.category, t.c.category)
+        stmt = stmt.on_conflict_do_update(index_elements=[t.c.tool_id_number], set_=set_)
+        conn.execute(stmt, values)
+    else:
+        new_rows = [v for v in values if v["tool_id_number"] not in existing]
+        # Bind names must differ from column names in an executemany UPDATE
+        old_rows = [{f"b_{k}": x for k, x in v.items()} for v in values if v["tool_id_number"] in existing]
+        if old_rows:
+            set_ = {c: bindparam(f"b_{c}") for c in update_cols}
+            set_["category"] = func.coalesce(bindparam("b_category"), t.c.category)
+            conn.execute(t.update().where(t.c.tool_id_number == bindparam("b_tool_id_number")).values(set_), old_rows)
+        if new_rows:
+            conn.execute(t.insert(), new_rows)
+
+    apply_counter_deltas(conn, {k: d for k, d in deltas.items() if d})
+    created = sum(1 for v in values if v["tool_id_number"] not in existing)
+    return created, len(values) - created
+
+
+def import_tools_rows(rows: List[Dict[str, Any]], chunk_size: Optional[int] = None, on_chunk=None,
+                      row_numbers: Optional[List[int]] = None):  # noqa: no cover - uses db
+    """
+    Insert or update tools in chunks of chunk_size (default IMPORT_CHUNK_SIZE), one commit per chunk.
+    A row repeating an earlier tool_id_number wins, as if applied in order: within a chunk it replaces the
+    earlier row before the upsert, across chunks its upsert runs later.
+    If a chunk fails it is retried row by row so the bad rows are reported and the rest still land.
+    on_chunk(stats) is called after each chunk with: chunk, rows, created, updated, ms.
+    row_numbers labels errors with file row numbers (default: 1-based position in rows).
+    Returns (created_count, updated_count, errors_list).
+    """
     from extensions import db
+    from sqlalchemy.exc import SQLAlchemyError
 
+    size = max(1, chunk_size or IMPORT_CHUNK_SIZE)
     created = 0
     updated = 0
     errors = []
-    for i, r in enumerate(rows):
+    for n, start in enumerate(range(0, len(rows), size), start=1):
+        began = time.perf_counter()
+        by_id = {}
+        for r in rows[start:start + size]:
+            v = _tool_values(r)
+            prev = by_id.pop(v["tool_id_number"], None)
+            if prev is not None and v["category"] is None:
+                v["category"] = prev["category"]
+            by_id[v["tool_id_number"]] = v
+        values = list(by_id.values())
         try:
-            existing = Tools.query.filter_by(tool_id_number=r["tool_id_number"]).first()
-            if existing:
-                existing.tool_name = r["tool_name"][:64]
-                existing.tool_location = (r["tool_location"] or DEFAULT_NA)[:64]
-                existing.tool_status = (r["tool_status"] or "In Stock")[:64]
-                existing.tool_calibration_due = (r["tool_calibration_due"] or DEFAULT_NA)[:64]
-                existing.tool_calibration_date = (r["tool_calibration_date"] or DEFAULT_NA)[:64]
-                existing.tool_calibration_cert = (r["tool_calibration_cert"] or DEFAULT_NA)[:64]
-                existing.tool_calibration_schedule = (r["tool_calibration_schedule"] or DEFAULT_NA)[:64]
-                if r.get("category") is not None:
-                    existing.category = (r["category"] or "")[:64]
-                updated += 1
-            else:
-                t = Tools(
-                    tool_id_number=r["tool_id_number"],
-                    tool_name=r["tool_name"][:64],
-                    tool_location=(r["tool_location"] or DEFAULT_NA)[:64],
-                    tool_status=(r["tool_status"] or "In Stock")[:64],
-                    tool_calibration_due=(r["tool_calibration_due"] or DEFAULT_NA)[:64],
-                    tool_calibration_date=(r["tool_calibration_date"] or DEFAULT_NA)[:64],
-                    tool_calibration_cert=(r["tool_calibration_cert"] or DEFAULT_NA)[:64],
-                    tool_calibration_schedule=(r["tool_calibration_schedule"] or DEFAULT_NA)[:64],
-                    category=(r.get("category") or "")[:64] or None,
+            c, u = _upsert_chunk(db.session, values)
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.warning("Import chunk %d failed (%s); retrying row by row", n, e)
+            c = u = 0
+            for i, r in enumerate(rows[start:start + size], start=start):
+                try:
+                    rc, ru = _upsert_chunk(db.session, [_tool_values(r)])
+                    db.session.commit()
+                    c, u = c + rc, u + ru
+                except SQLAlchemyError as row_err:
+                    db.session.rollback()
+                    errors.append({"row": row_numbers[i] if row_numbers else i + 1, "message": str(row_err.orig if getattr(row_err, "orig", None) else row_err)})
+        created += c
+        updated += u
+        stats = {"chunk": n, "rows": min(size, len(rows) - start), "created": c, "updated": u,
+                 "ms": round((time.perf_counter() - began) * 1000, 1)}
+        logger.info("Import chunk %(chunk)d: %(rows)d rows (%(created)d new, %(updated)d updated) in %(ms).1f ms", stats)
+        if on_chunk:
+            on_chunk(stats)
+    return created, updated, errors
+
+
+# Row errors (and, separately, duplicate warnings) kept in an import job's checkpoint (the counts keep going past this)
+IMPORT_JOB_MAX_ERRORS = 1000
+
+
+def estimate_row_count(source, filename: str) -> Optional[int]:
+    """
+    Cheap data-row estimate (progress, parallel-validation switch) without parsing: newline count for CSV, sheet
+    dimensions for xlsx. source is a path, bytes, or a seekable binary stream (left at its current position).
+    None when it cannot be estimated (e.g. a non-seekable stream).
+    """
+    fn = (filename or "").lower()
+    try:
+        if isinstance(source, str):
+            with open(source, "rb") as f:
+                return estimate_row_count(f, filename)
+        stream = _binary_stream(source)
+        if not stream.seekable():
+            return None
+        pos = stream.tell()
+        try:
+            if fn.endswith(".xlsx") or fn.endswith(".xls"):
+                import openpyxl
+                wb = openpyxl.load_workbook(stream, read_only=True)
+                try:
+                    rows = wb.active.max_row
+                finally:
+                    wb.close()
+                return max(0, (rows or 1) - 1)
+            lines = 0
+            for block in iter(lambda: stream.read(1 << 20), b""):
+                lines += block.count(b"\n")
+            return max(0, lines - 1)
+        finally:
+            stream.seek(pos)
+    except Exception:
+        return None
+
+
+def run_import_job(job_id: str, params: dict, progress, checkpoint=None):
+    """
+    Background import (utils/jobs.py runner) of a spooled upload. After each committed batch the checkpoint
+    records the last file row handled plus running totals; a resumed run re-reads the file (validation is
+    cheap) but skips every row up to that point. Rows already committed stay; a later duplicate still wins.
+    params: upload_path, filename. Returns (None, None); the upload is deleted when the job finishes.
+    """
+    path = params["upload_path"]
+    filename = params.get("filename") or path
+    cp = checkpoint or {"row": 0, "processed": 0, "created": 0, "updated": 0, "errors": [], "error_count": 0,
+                        "warnings": [], "warning_count": 0, "chunk_count": 0, "chunks": []}
+    cp.setdefault("warnings", [])
+    cp.setdefault("warning_count", 0)
+    progress(cp["processed"], estimate_row_count(path, filename))
+
+    def add_chunk(stats):
+        cp["chunk_count"] += 1
+        cp["chunks"] = (cp["chunks"] + [dict(stats, chunk=cp["chunk_count"])])[-20:]  # recent timings only
+
+    def add_errors(errs):
+        cp["error_count"] += len(errs)
+        room = IMPORT_JOB_MAX_ERRORS - len(cp["errors"])
+        if room > 0:
+            cp["errors"].extend(errs[:room])
+
+    def add_warnings(warns):
+        cp["warning_count"] += len(warns)
+        room = IMPORT_JOB_MAX_ERRORS - len(cp["warnings"])
+        if room > 0:
+            cp["warnings"].extend(warns[:room])
+
+    with open(path, "rb") as f:
+        for valid, row_nums, errors, warnings in iter_tool_batches(f, filename, IMPORT_CHUNK_SIZE):
+            last_row = max(row_nums[-1] if row_nums else 0, errors[-1]["row"] if errors else 0)
+            if last_row <= cp["row"]:
+                continue
+            keep = [(v, n) for v, n in zip(valid, row_nums) if n > cp["row"]]
+            add_errors([e for e in errors if e["row"] > cp["row"]])
+            add_warnings([w for w in warnings if w["row"] > cp["row"]])
+            if keep:
+                c, u, import_errors = import_tools_rows(
+                    [v for v, _ in keep], row_numbers=[n for _, n in keep],
+                    on_chunk=add_chunk,
                 )
-                db.session.add(t)
-                created += 1
-        except Exception as e:
-            errors.append({"row": i + 1, "message": str(e)})
+                cp["created"] += c
+                cp["updated"] += u
+                add_errors(import_errors)
+            cp["processed"] += len(keep) + sum(1 for e in errors if e["row"] > cp["row"])
+            cp["row"] = last_row
+            progress(cp["processed"], checkpoint=cp)
+    progress(cp["processed"], total=cp["processed"])
     try:
-        db.session.commit()
-    except Exception as e:
-        db.session.rollback()
-        errors.append({"row": 0, "message": f"Commit failed: {e}"})
-    return created, updated, errors
+        os.remove(path)
+    except OSError:
+        pass
+    return None, None
@@ -0,0 +1,187 @@
+# inventory_counters.py - Materialized inventory counters kept current on every tool write
+
+import logging
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Counter keys: (scope, key). See models/inventory_counter.py.
+TOTAL = ("tools", "total")
+CHECKED_OUT = ("tools", "checked_out")
+INITIALIZED = ("meta", "initialized")
+
+
+def tool_counter_keys(tool_status: Optional[str], category: Optional[str], checked_out_by: Optional[str]) -> Counter:
+    """Counter contributions of one tool row. Subtract old keys and add new keys to move a tool."""
+    keys = Counter({TOTAL: 1})
+    out = bool(checked_out_by)
+    if out:
+        keys[CHECKED_OUT] += 1
+    keys[("status", (tool_status or "")[:64])] += 1
+    cat = (category or "").strip()
+    if cat:
+        keys[("category", cat[:64])] += 1
+        if out:
+            keys[("category_out", cat[:64])] += 1
+    return keys
+
+
+def apply_counter_deltas(conn, deltas: Dict[Tuple[str, str], int]) -> None:
+    """
+    Add deltas to counter rows on conn (same transaction as the tool write). Zero deltas are skipped.
+    Rows are written in (scope, key) order: each upsert locks its row until commit, so writers that touch the
+    same counters in different orders (two imports, two batch scans) would otherwise deadlock.
+    """
+    from models.inventory_counter import InventoryCounter
+
+    t = InventoryCounter.__table__
+    dialect = conn.dialect.name
+    for scope, key in sorted(deltas):
+        delta = deltas[(scope, key)]
+        if not delta:
+            continue
+        if dialect in ("postgresql", "sqlite"):
+            if dialect == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            stmt = insert(t).values(scope=scope, key=key, value=delta)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[t.c.scope, t.c.key],
+                set_={"value": t.c.value + stmt.excluded.value, "updated_at": func.now()},
+            )
+            conn.execute(stmt)
+        else:
+            res = conn.execute(
+                t.update()
+                .where(t.c.scope == scope, t.c.key == key)
+                .values(value=t.c.value + delta, updated_at=func.now())
+            )
+            if res.rowcount == 0:
+                conn.execute(t.insert().values(scope=scope, key=key, value=delta))
+
+
+def _old_value(state, attr: str):
+    """
+    Value of attr as last loaded from the DB (before pending changes). The counted Tools columns use
+    active_history, so an overwrite always records the old value; an attribute with no history is unchanged.
+    """
+    hist = state.attrs[attr].history
+    if hist.deleted:
+        return hist.deleted[0]
+    if hist.unchanged:
+        return hist.unchanged[0]
+    if hist.added and state.identity:
+        # Overwritten without the old value loaded (a column without active_history): read the committed value
+        # rather than fall back to the new one, which would make the delta silently zero
+        table = state.mapper.local_table
+        return state.session.execute(select(table.c[attr]).where(table.c.id == state.identity[0])).scalar()
+    return getattr(state.obj(), attr)
+
+
+def _keys_for(tool) -> Counter:
+    return tool_counter_keys(tool.tool_status, tool.category, tool.checked_out_by)
+
+
+def _old_keys_for(tool) -> Counter:
+    state = inspect(tool)
+    return tool_counter_keys(
+        _old_value(state, "tool_status"),
+        _old_value(state, "category"),
+        _old_value(state, "checked_out_by"),
+    )
+
+
+def _before_flush(session, flush_context, instances):
+    """Collect Tools inserts/updates/deletes in this flush and apply them to the counters."""
+    from models.tools import Tools
+
+    deltas = Counter()
+    for obj in session.new:
+        if isinstance(obj, Tools):
+            deltas.update(_keys_for(obj))
+    for obj in session.dirty:
+        if isinstance(obj, Tools) and session.is_modified(obj, include_collections=False):
+            deltas.update(_keys_for(obj))
+            deltas.subtract(_old_keys_for(obj))
+    for obj in session.deleted:
+        if isinstance(obj, Tools):
+            deltas.subtract(_old_keys_for(obj))
+    deltas = {k: v for k, v in deltas.items() if v}
+    if deltas:
+        apply_counter_deltas(session.connection(), deltas)
+
+
+def register_inventory_counter_events() -> None:
+    """Hook counter maintenance into every ORM flush (check-in/out, import, admin edits). Idempotent."""
+    if not event.contains(Session, "before_flush", _before_flush):
+        event.listen(Session, "before_flush", _before_flush)
+
+
+def rebuild_inventory_counters(commit: bool = True) -> None:
+    """Recount everything from the tools table (one-time full scan). Use after bulk writes that bypass the ORM."""
+    from extensions import db
+    from models.inventory_counter import InventoryCounter
+    from models.tools import Tools
+
+    counts = Counter()
+    rows = db.session.query(
+        Tools.tool_status,
+        Tools.category,
+        Tools.checked_out_by.isnot(None),
+        func.count(Tools.id),
+    ).group_by(Tools.tool_status, Tools.category, Tools.checked_out_by.isnot(None)).all()
+    for status, category, is_out, n in rows:
+        for k, v in tool_counter_keys(status, category, "x" if is_out else None).items():
+            counts[k] += v * n
+    counts.setdefault(TOTAL, 0)
+    counts.setdefault(CHECKED_OUT, 0)
+    counts[INITIALIZED] = 1
+
+    t = InventoryCounter.__table__
+    db.session.execute(t.delete())
+    db.session.execute(t.insert(), [{"scope": s, "key": k, "value": v} for (s, k), v in counts.items()])
+    if commit:
+        db.session.commit()
+    logger.info("Inventory counters rebuilt: %s tools, %s checked out", counts[TOTAL], counts[CHECKED_OUT])
+
+
+def get_inventory_summary() -> dict:
+    """
+    Inventory totals from the counters table (a handful of rows, no scan of tools).
+    Returns dict: total, checked_out, in_stock, by_category (list, largest first), by_status (list).
+    Rebuilds the counters once if they were never initialized (new table, fresh migration).
+    """
+    from extensions import db
+    from models.inventory_counter import InventoryCounter
+
+    rows = db.session.query(InventoryCounter.scope, InventoryCounter.key, InventoryCounter.value).all()
+    values = {(s, k): v for s, k, v in rows}
+    if INITIALIZED not in values:
+        rebuild_inventory_counters(commit=True)
+        rows = db.session.query(InventoryCounter.scope, InventoryCounter.key, InventoryCounter.value).all()
+        values = {(s, k): v for s, k, v in rows}
+
+    total = values.get(TOTAL, 0)
+    checked_out = values.get(CHECKED_OUT, 0)
+    by_category = []
+    for (scope, key), n in values.items():
+        if scope == "category" and n > 0:
+            out = values.get(("category_out", key), 0)
+            by_category.append({"category": key, "total": n, "checked_out": out, "in_stock": n - out})
+    by_category.sort(key=lambda c: (-c["total"], c["category"]))
+    by_status = sorted(
+        ({"status": key, "count": n} for (scope, key), n in values.items() if scope == "status" and n > 0),
+        key=lambda s: s["status"],
+    )
+    return {
+        "total": total,
+        "checked_out": checked_out,
+        "in_stock": total - checked_out,
+        "by_category": by_category,
+        "by_status": by_status,
+    }
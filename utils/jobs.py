@@ -0,0 +1,279 @@
+# jobs.py - Background job runner (report exports, tool imports). Jobs run in a small thread pool outside the
+# request; status, progress and checkpoints live in the jobs table so any worker process can answer a poll.
+
+import importlib
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Concurrent jobs per process (each holds one DB connection while it runs)
+JOB_WORKERS = int(os.environ.get("ATEMS_JOB_WORKERS", "2"))
+
+# Export files and queued import uploads; shared by all workers when it is on a shared disk
+SPOOL_DIR = os.environ.get("ATEMS_EXPORT_DIR") or os.path.join(tempfile.gettempdir(), "atems_exports")
+
+# Finished/failed jobs (and their files) older than this are removed when a new job is created
+RETENTION_HOURS = float(os.environ.get("ATEMS_EXPORT_RETENTION_HOURS", "24"))
+
+# A queued/running job with no heartbeat for this long is treated as orphaned (its process died) and resumed
+STALE_SECONDS = float(os.environ.get("ATEMS_JOB_STALE_SECONDS", "300"))
+
+# How often a process refreshes heartbeat_at on every job it holds, queued ones included (well under STALE_SECONDS)
+HEARTBEAT_SECONDS = STALE_SECONDS / 3
+
+# kind -> "module:function"; function(job_id, params, progress, checkpoint) -> (result_path, result_name).
+# progress(processed, total=None, checkpoint=None); checkpoint is the last one saved (None on a fresh run).
+JOB_RUNNERS = {
+    "export": "utils.reports:run_export_job",
+    "import": "utils.import_tools:run_import_job",
+}
+
+_job_executor = None
+_job_executor_pid = None
+_job_executor_lock = threading.Lock()
+
+
+class JobLost(RuntimeError):
+    """The job was re-claimed by another process (this one was presumed dead); stop without touching the row."""
+
+
+def worker_id() -> str:
+    """Identity of this process in jobs.worker. Read per call: a forked Gunicorn worker has a new pid."""
+    return f"{socket.gethostname()}:{os.getpid()}"[:128]
+
+
+def _get_executor(app):
+    """
+    Lazy per-process ThreadPoolExecutor for background jobs, started together with the heartbeat thread.
+    Rebuilt when the pid changes: an executor inherited across fork() has no threads and would never run a job.
+    """
+    global _job_executor, _job_executor_pid
+    with _job_executor_lock:
+        if _job_executor is None or _job_executor_pid != os.getpid():
+            _job_executor = ThreadPoolExecutor(max_workers=max(1, JOB_WORKERS), thread_name_prefix="atems_job")
+            _job_executor_pid = os.getpid()
+            threading.Thread(target=_heartbeat_loop, args=(app,), name="atems_job_heartbeat", daemon=True).start()
+        return _job_executor
+
+
+def _heartbeat_loop(app) -> None:
+    """Keep heartbeat_at fresh on this process's queued and running jobs, so no other process counts them stale."""
+    from extensions import db
+
+    while True:
+        time.sleep(HEARTBEAT_SECONDS)
+        with app.app_context():
+            try:
+                touch_jobs()
+            except Exception as e:
+                db.session.rollback()
+                logger.warning("Job heartbeat failed: %s", e)
+            finally:
+                db.session.remove()
+
+
+def touch_jobs() -> int:
+    """Refresh heartbeat_at on the queued/running jobs held by this process. Returns the number of jobs."""
+    from extensions import db
+    from models.job import Job
+
+    res = db.session.execute(
+        db.update(Job).where(Job.worker == worker_id(), Job.status.in_(("queued", "running")))
+        .values(heartbeat_at=datetime.now())
+    )
+    db.session.commit()
+    return res.rowcount
+
+
+def spool_path(job_id: str, ext: str) -> str:
+    """Path of a job's output file (spool directory is created on first use)."""
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    return os.path.join(SPOOL_DIR, f"{job_id}.{ext}")
+
+
+def _runner(kind: str):
+    module, func = JOB_RUNNERS[kind].split(":")
+    return getattr(importlib.import_module(module), func)
+
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+
+def submit_job(app, kind: str, params: dict, owner=None, job_id=None):
+    """Create a queued job row and start it in the background. Returns the Job (already committed)."""
+    from extensions import db
+    from models.job import Job
+
+    if kind not in JOB_RUNNERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    purge_expired_jobs()
+    job = Job(id=job_id or new_job_id(), kind=kind, status="queued", owner=owner, params=json.dumps(params), processed=0,
+              worker=worker_id(), heartbeat_at=datetime.now())
+    db.session.add(job)
+    db.session.commit()
+    _get_executor(app).submit(_run_job, app, job.id)
+    return job
+
+
+def _run_job(app, job_id: str) -> None:
+    """
+    Executor entry point: run one job with its own app context and session. Every write is conditional on the
+    job still being held by this process, so a job re-claimed elsewhere is never run or finished twice.
+    """
+    from extensions import db
+    from models.job import Job
+
+    me = worker_id()
+    ours = db.and_(Job.id == job_id, Job.worker == me)
+    with app.app_context():
+        try:
+            now = datetime.now()
+            res = db.session.execute(
+                db.update(Job).where(ours, Job.status == "queued")
+                .values(status="running", started_at=db.func.coalesce(Job.started_at, now), heartbeat_at=now)
+            )
+            db.session.commit()
+            if res.rowcount != 1:
+                logger.info("Job %s is no longer queued for %s; not running it", job_id, me)
+                return
+            job = db.session.get(Job, job_id)
+            params = json.loads(job.params or "{}")
+            checkpoint = json.loads(job.checkpoint) if job.checkpoint else None
+
+            def progress(processed, total=None, checkpoint=None):
+                values = {"processed": processed, "heartbeat_at": datetime.now()}
+                if total is not None:
+                    values["total"] = total
+                if checkpoint is not None:
+                    values["checkpoint"] = json.dumps(checkpoint)
+                res = db.session.execute(db.update(Job).where(ours, Job.status == "running").values(**values))
+                db.session.commit()
+                if res.rowcount != 1:
+                    raise JobLost(job_id)
+
+            result_path, result_name = _runner(job.kind)(job_id, params, progress, checkpoint)
+            res = db.session.execute(
+                db.update(Job).where(ours, Job.status == "running")
+                .values(status="done", result_path=result_path, result_name=result_name, finished_at=datetime.now())
+            )
+            db.session.commit()
+            if res.rowcount != 1:
+                raise JobLost(job_id)
+            logger.info("Job %s (%s) done: %s rows", job_id, job.kind, job.processed)
+        except JobLost:
+            db.session.rollback()
+            logger.warning("Job %s was taken over by another process; %s stopped its run", job_id, me)
+        except Exception as e:
+            db.session.rollback()
+            logger.exception("Job %s failed: %s", job_id, e)
+            try:
+                db.session.execute(
+                    db.update(Job).where(ours)
+                    .values(status="failed", error=str(e)[:1000], finished_at=datetime.now())
+                )
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                logger.exception("Job %s: could not record failure", job_id)
+        finally:
+            db.session.remove()
+
+
+def job_to_dict(job) -> dict:
+    """Status payload for the polling endpoints."""
+    percent = None
+    if job.total:
+        percent = round(100.0 * min(job.processed or 0, job.total) / job.total, 1)
+    elif job.status == "done":
+        percent = 100.0
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "params": json.loads(job.params or "{}"),
+        "processed": job.processed or 0,
+        "total": job.total,
+        "percent": percent,
+        "error": job.error,
+        "checkpoint": json.loads(job.checkpoint) if job.checkpoint else None,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def purge_expired_jobs() -> int:
+    """Delete finished/failed jobs older than RETENTION_HOURS and their files. Returns number removed."""
+    from extensions import db
+    from models.job import Job
+
+    cutoff = datetime.now() - timedelta(hours=RETENTION_HOURS)
+    old = Job.query.filter(Job.status.in_(("done", "failed")), Job.created_at < cutoff).all()
+    for job in old:
+        upload = json.loads(job.params or "{}").get("upload_path")
+        for path in (job.result_path, upload):
+            if path:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        db.session.delete(job)
+    if old:
+        db.session.commit()
+    return len(old)
+
+
+def _claim(job_id: str, where) -> bool:
+    """Atomically move a job back to queued, held by this process, if `where` still holds; only one process wins."""
+    from extensions import db
+    from models.job import Job
+
+    res = db.session.execute(
+        db.update(Job).where(Job.id == job_id, where)
+        .values(status="queued", worker=worker_id(), error=None, finished_at=None, heartbeat_at=datetime.now())
+    )
+    db.session.commit()
+    return res.rowcount == 1
+
+
+def resume_job(app, job_id: str) -> bool:
+    """Re-run a failed job from its last checkpoint. Returns False if it is not in a resumable state."""
+    from models.job import Job
+
+    if not _claim(job_id, Job.status == "failed"):
+        return False
+    _get_executor(app).submit(_run_job, app, job_id)
+    return True
+
+
+def resume_stale_jobs(app) -> int:
+    """
+    Restart queued/running jobs whose process died (no heartbeat for STALE_SECONDS), from their checkpoint.
+    A live process refreshes the heartbeat of every job it holds, queued ones included, so only orphans match.
+    Call it from a serving worker after the fork (gunicorn.conf.py post_worker_init), never from create_app():
+    the preloading master and scripts would claim jobs into a pool that never runs them. Each job is claimed by
+    exactly one process.
+    """
+    from extensions import db
+    from models.job import Job
+
+    cutoff = datetime.now() - timedelta(seconds=STALE_SECONDS)
+    stale = db.or_(Job.heartbeat_at < cutoff, db.and_(Job.heartbeat_at.is_(None), Job.created_at < cutoff))
+    ids = [j for (j,) in db.session.query(Job.id).filter(Job.status.in_(("queued", "running")), stale)]
+    resumed = 0
+    for job_id in ids:
+        if _claim(job_id, db.and_(Job.status.in_(("queued", "running")), stale)):
+            logger.info("Resuming orphaned job %s", job_id)
+            _get_executor(app).submit(_run_job, app, job_id)
+            resumed += 1
+    return resumed
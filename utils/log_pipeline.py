@@ -0,0 +1,233 @@
+# log_pipeline.py - Optional structured logging (ATEMS_LOG_JSON=1): request threads put records on a bounded
+# queue; a QueueListener thread writes them to atems.log as JSON lines and keeps the newest ones in an
+# in-process ring buffer that /api/logs can answer from without reading the file.
+
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from logging.handlers import QueueHandler, QueueListener
+from typing import Callable, List, Optional
+
+from flask import g, has_request_context
+
+# Records kept in memory per process for /api/logs
+RING_SIZE = int(os.environ.get("ATEMS_LOG_RING_SIZE", "5000"))
+
+# Records waiting for the writer thread; beyond this new records are dropped (counted) rather than blocking
+QUEUE_SIZE = int(os.environ.get("ATEMS_LOG_QUEUE_SIZE", "10000"))
+
+_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def json_log_enabled() -> bool:
+    return os.environ.get("ATEMS_LOG_JSON", "0").strip().lower() in ("1", "true", "yes")
+
+
+class _RequestContextFilter(logging.Filter):
+    """
+    Stamp records with g.request_id (utils/api_error_handlers.py) in the emitting thread; the writer thread has
+    no request context.
+    """
+
+    def filter(self, record):
+        if getattr(record, "request_id", None) is None:
+            if has_request_context():
+                record.request_id = g.get("request_id")
+        return True
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per line. "ts" comes first so log_reader can find record heads and timestamps."""
+
+    def __init__(self):
+        super().__init__(datefmt=_TIME_FORMAT)
+
+    def to_dict(self, record) -> dict:
+        entry = {
+            "ts": f"{self.formatTime(record, _TIME_FORMAT)},{int(record.msecs):03d}",
+            "level": record.levelname,
+            "name": record.name,
+            "message": record.getMessage(),
+        }
+        for key in ("request_id", "perf_duration_ms"):
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = round(value, 2) if key == "perf_duration_ms" else value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return entry
+
+    def format(self, record):
+        return json.dumps(self.to_dict(record), separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+_FORMATTER = JsonLinesFormatter()
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the newest `capacity` records as dicts (timestamp, name, level, message, request_id, ...)."""
+
+    def __init__(self, capacity: int):
+        super().__init__()
+        self.records = deque(maxlen=capacity)
+        self.total = 0
+
+    def emit(self, record):
+        d = _FORMATTER.to_dict(record)
+        entry = {"timestamp": d.pop("ts"), "name": d.pop("name"), "level": d.pop("level"), "message": d.pop("message")}
+        if "exc" in d:
+            entry["message"] += "\n" + d.pop("exc")
+        entry.update(d)
+        with self.lock:
+            self.records.append(entry)
+            self.total += 1
+
+    def snapshot(self) -> List[dict]:
+        with self.lock:
+            return list(self.records)
+
+    @property
+    def wrapped(self) -> bool:
+        """True once older records have been dropped from the buffer."""
+        return self.total > len(self.records)
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)  # wait for room: the base class's put_nowait fails on a full queue
+
+
+class _Pipeline:
+    def __init__(self, file_handler: logging.Handler):
+        self.pid = os.getpid()
+        self.dropped = 0
+        self.queue = queue.Queue(QUEUE_SIZE)
+        self.file_handler = file_handler
+        self.file_handler.setFormatter(_FORMATTER)
+        self.ring = RingBufferHandler(RING_SIZE)
+        self.listener = _Listener(self.queue, self.file_handler, self.ring, respect_handler_level=False)
+        self.listener.start()
+
+    def stop(self):
+        try:
+            self.listener.stop()  # drains what is queued
+        finally:
+            self.file_handler.close()
+
+
+class _ForkSafeQueueHandler(QueueHandler):
+    """QueueHandler that never blocks and restarts the writer thread in a forked worker (Gunicorn preload)."""
+
+    def __init__(self):
+        super().__init__(None)  # enqueue() looks up this process's pipeline queue instead
+        self.addFilter(_RequestContextFilter())
+
+    def prepare(self, record):
+        # Like QueueHandler.prepare (merge args, drop unpicklable exc_info) but the traceback stays in exc_text,
+        # not in msg, so it becomes the JSON "exc" field
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        p = _current_pipeline()
+        if p is None:
+            return
+        try:
+            p.queue.put_nowait(record)
+        except queue.Full:
+            p.dropped += 1
+
+
+def _current_pipeline() -> Optional[_Pipeline]:
+    global _pipeline
+    p = _pipeline
+    if p is not None and p.pid != os.getpid():
+        # Forked after install: the writer thread did not survive the fork; start one for this process.
+        # The file handler's open stream (append mode) is inherited and shared, like a plain FileHandler.
+        with _pipeline_lock:
+            if _pipeline is p:
+                _pipeline = _Pipeline(p.file_handler)
+            p = _pipeline
+    return p
+
+
+def install_log_pipeline(make_file_handler: Callable[[], logging.Handler], level: int) -> logging.Handler:
+    """
+    Route root logging through the queue to JSON lines (via make_file_handler()) plus the ring buffer. Idempotent
+    per process (a second create_app() reuses the running pipeline). Returns the handler added to the root logger.
+    """
+    global _pipeline
+    root = logging.getLogger()
+    with _pipeline_lock:
+        if _pipeline is None or _pipeline.pid != os.getpid():
+            _pipeline = _Pipeline(make_file_handler())
+            atexit.register(_pipeline.stop)
+    for h in root.handlers:
+        if isinstance(h, _ForkSafeQueueHandler):
+            return h
+    handler = _ForkSafeQueueHandler()
+    handler.setLevel(level)
+    root.addHandler(handler)
+    return handler
+
+
+def shutdown_log_pipeline() -> None:
+    """Remove the queue handler from the root logger and stop the writer after it drains (tests, shutdown)."""
+    global _pipeline
+    root = logging.getLogger()
+    for h in [h for h in root.handlers if isinstance(h, _ForkSafeQueueHandler)]:
+        root.removeHandler(h)
+    with _pipeline_lock:
+        p, _pipeline = _pipeline, None
+    if p is not None and p.pid == os.getpid():
+        atexit.unregister(p.stop)
+        p.stop()
+
+
+def ring_buffer() -> Optional[RingBufferHandler]:
+    """This process's ring buffer, or None when the structured pipeline is not installed."""
+    p = _current_pipeline()
+    return p.ring if p is not None else None
+
+
+def flush_log_pipeline(timeout: float = 2.0) -> bool:
+    """Wait until every queued record has been written (tests, shutdown). False on timeout."""
+    p = _current_pipeline()
+    if p is None:
+        return True
+    deadline = time.monotonic() + timeout
+    while p.queue.unfinished_tasks:
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def log_pipeline_info() -> dict:
+    """Queue depth, drops and ring buffer fill (for /api/system/health)."""
+    p = _current_pipeline()
+    if p is None:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        "queued": p.queue.qsize(),
+        "dropped": p.dropped,
+        "ring_size": len(p.ring.records),
+        "ring_capacity": p.ring.records.maxlen,
+    }
@@ -0,0 +1,412 @@
+# log_reader.py - Query atems.log (and its rotated files) from the end without reading whole files.
+# The file is read backwards from EOF in slabs of whole records until `limit` matches are found. A sidecar
+# index (<log>.index.json) records, per slab of up to ~1 MiB that a filtered query has read, the time range and
+# the levels present, so later level and time filters skip slabs that cannot match. The index is never built by
+# a separate pass over the file: it grows by exactly what queries read anyway.
+
+import json
+import os
+import re
+import threading
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+# First backwards read; later reads double up to SLAB_MAX (an unfiltered tail query reads ~one block)
+BLOCK_SIZE = 64 * 1024
+SLAB_MAX = 1024 * 1024
+
+# Largest slab read by a filtered query, and so the most bytes of log per sidecar index entry
+INDEX_CHUNK = int(os.environ.get("ATEMS_LOG_INDEX_CHUNK", str(1024 * 1024)))
+
+# Stop a query after reading this many bytes (a search that matches nothing would otherwise read every file)
+SCAN_MAX_BYTES = int(os.environ.get("ATEMS_LOG_SCAN_MAX_BYTES", str(256 * 1024 * 1024)))
+
+LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+_LEVEL_BITS = {name: 1 << i for i, name in enumerate(LEVELS)}
+_OTHER_LEVEL = 1 << len(LEVELS)
+
+# Record heads: "2026-10-17 21:52:44,731 - atems - INFO - message" (text format set in create_app) or
+# {"ts":"2026-10-17 21:52:44,731",...} (JSON lines, utils/log_pipeline.py). Lines that do not start with a
+# timestamp (tracebacks in the text format) belong to the record above them.
+_HEAD = re.compile(rb'^(?:\{"ts":")?(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)(?:,\d+)?(?: - |")', re.M)
+_TS_LEN = 19  # "YYYY-MM-DD HH:MM:SS"; compared as strings
+
+# Guards _indexes only; never held during log or sidecar file I/O
+_lock = threading.Lock()
+_indexes: Dict[str, dict] = {}  # sidecar path -> {"chunk": INDEX_CHUNK, "files": {file key: entry}}
+
+
+class LogQuery(NamedTuple):
+    limit: int = 250
+    level: str = ""  # exact level name, "" for any
+    search: str = ""  # lower-case substring of the message, "" for any
+    since: str = ""  # "YYYY-MM-DD HH:MM:SS" or a prefix of it, inclusive
+    until: str = ""  # same format, inclusive of the prefix
+
+
+def normalize_time(value: Optional[str]) -> str:
+    """'2026-10-17T10:00' -> '2026-10-17 10:00' (comparable with log timestamps); '' if empty."""
+    return (value or "").strip().replace("T", " ")[:_TS_LEN]
+
+
+def level_bit(level: str) -> int:
+    return _LEVEL_BITS.get(level, _OTHER_LEVEL)
+
+
+def level_markers(level: str) -> Tuple[bytes, bytes]:
+    """Byte strings that appear in a record of this level (text format, JSON lines)."""
+    return f" - {level} - ".encode(), f'"level":"{level}"'.encode()
+
+
+def parse_record(raw: bytes) -> dict:
+    """
+    Record dict (timestamp, name, level, message[, request_id, perf_duration_ms]) from one record's bytes:
+    a JSON line, or a text head line plus continuation lines.
+    """
+    if raw[:1] == b"{":
+        try:
+            d = json.loads(raw)
+            rec = {"timestamp": d.pop("ts"), "name": d.pop("name", ""), "level": d.pop("level", ""),
+                   "message": d.pop("message", "")}
+            if "exc" in d:
+                rec["message"] += "\n" + d.pop("exc")
+            rec.update(d)
+            return rec
+        except (ValueError, KeyError, AttributeError):
+            pass
+    text = raw.rstrip(b"\r\n").decode("utf-8", errors="replace")
+    parts = text.split(" - ", 3)
+    if len(parts) == 4 and _HEAD.match(raw):
+        timestamp, name, level, message = parts
+        return {"timestamp": timestamp, "name": name, "level": level, "message": message}
+    return {"timestamp": "", "name": "", "level": "INFO", "message": text}
+
+
+def rotated_files(path: str) -> List[str]:
+    """path plus its rotated copies (atems.log.1, atems.log.2026-10-16, ...), newest first."""
+    directory, base = os.path.split(os.path.abspath(path))
+    found = []
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    for name in names:
+        if name == base or (name.startswith(base + ".") and not name.endswith((".json", ".gz", ".tmp"))):
+            full = os.path.join(directory, name)
+            try:
+                found.append((name != base, -os.path.getmtime(full), full))
+            except OSError:
+                continue
+    return [full for _, _, full in sorted(found)]
+
+
+def _slabs_backwards(f, start: int, end: int, counter: List[int], max_size: int = SLAB_MAX) -> Iterator[Tuple[int, bytes]]:
+    """
+    (offset, slab) for f[start:end] from the end, as slabs of whole records (each slab starts at a record head,
+    except possibly the first bytes of the range). counter[0] += bytes read.
+    """
+    pos = end
+    size = BLOCK_SIZE
+    carry = b""
+    while pos > start:
+        step = min(size, pos - start)
+        pos -= step
+        f.seek(pos)
+        data = f.read(step) + carry
+        counter[0] += step
+        size = min(size * 2, max_size)
+        offset = pos
+        if pos == start:
+            carry = b""
+        else:
+            # Bytes before the first record head may belong to a record that starts in the previous read
+            m = _HEAD.search(data, 1)
+            if m is None:
+                carry = data
+                continue
+            carry, data = data[:m.start()], data[m.start():]
+            offset = pos + m.start()
+        if data:
+            yield offset, data
+    if carry:
+        yield start, carry
+
+
+def _records_backwards(slab: bytes) -> Iterator[bytes]:
+    """Records of a slab, newest first."""
+    starts = [m.start() for m in _HEAD.finditer(slab)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)  # orphan continuation lines at the very start of a file
+    end = len(slab)
+    for s in reversed(starts):
+        if slab[s:end].strip():
+            yield slab[s:end]
+        end = s
+
+
+def _file_key(st) -> str:
+    # Survives rotation by rename, so atems.log.1 reuses the index built while it was atems.log
+    return f"{st.st_dev}:{st.st_ino}"
+
+
+def _sidecar_path(path: str) -> str:
+    return os.path.abspath(path) + ".index.json"
+
+
+def _load_index(sidecar: str) -> dict:
+    """Cached index for sidecar; a cache miss reads the sidecar file outside _lock."""
+    with _lock:
+        idx = _indexes.get(sidecar)
+    if idx is not None:
+        return idx
+    try:
+        with open(sidecar, "r", encoding="utf-8") as f:
+            idx = json.load(f)
+        if not isinstance(idx.get("files"), dict) or idx.get("chunk") != INDEX_CHUNK:
+            raise ValueError("index format")
+    except (OSError, ValueError, AttributeError):
+        idx = {"chunk": INDEX_CHUNK, "files": {}}
+    with _lock:
+        return _indexes.setdefault(sidecar, idx)
+
+
+def _save_index(sidecar: str, text: str) -> None:
+    tmp = f"{sidecar}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, sidecar)
+    except OSError:
+        pass  # read-only log directory: the index still lives in memory for this process
+
+
+def _chunk_summary(data: bytes) -> Tuple[Optional[str], Optional[str], int]:
+    """
+    (first timestamp, last timestamp, level mask). The mask may over-report (a message quoting ' - ERROR - ')
+    and always includes the bit for non-standard levels; it never under-reports.
+    """
+    stamps = _HEAD.findall(data)
+    mask = _OTHER_LEVEL
+    for name, bit in _LEVEL_BITS.items():
+        if any(marker in data for marker in level_markers(name)):
+            mask |= bit
+    first = stamps[0].decode("ascii") if stamps else None
+    last = stamps[-1].decode("ascii") if stamps else None
+    return first, last, mask
+
+
+def _file_head(f) -> str:
+    f.seek(0)
+    return f.read(64).hex()
+
+
+def _file_regions(idx: dict, key: str, head: str, size: int) -> List[list]:
+    """
+    [start, end, first_ts, last_ts, mask] regions covering the file, oldest first: indexed slabs, and the gaps
+    between them (mask -1, not indexed yet). Call with _lock held; copies, so the scan can run without it.
+    """
+    entry = idx["files"].get(key)
+    chunks = entry["chunks"] if entry and entry.get("head") == head else []
+    if chunks and chunks[-1][1] > size:
+        chunks = []  # truncated (copytruncate) and written again: the old entries describe other bytes
+    regions, pos = [], 0
+    for chunk in chunks:
+        if chunk[0] > pos:
+            regions.append([pos, chunk[0], None, None, -1])
+        regions.append(list(chunk))
+        pos = chunk[1]
+    if pos < size:
+        regions.append([pos, size, None, None, -1])
+    return regions
+
+
+def _merge_chunks(idx: dict, key: str, head: str, size: int, new: List[list]) -> bool:
+    """Add slabs summarized by a query to the file's entry (call with _lock held). True if the entry changed."""
+    entry = idx["files"].get(key)
+    if entry is None or entry.get("head") != head or (entry["chunks"] and entry["chunks"][-1][1] > size):
+        entry = {"head": head, "chunks": []}  # new file, truncated, or inode reused
+        idx["files"][key] = entry
+    chunks = entry["chunks"]
+    added = False
+    for chunk in new:
+        # Another query may have indexed the same gap meanwhile; keep whichever came first
+        if not any(c[0] < chunk[1] and chunk[0] < c[1] for c in chunks):
+            chunks.append(chunk)
+            added = True
+    if added:
+        chunks.sort(key=lambda c: c[0])
+    return added
+
+
+def _region_may_match(region: list, q: LogQuery, want: int) -> bool:
+    _, _, first, last, mask = region
+    if mask == -1:
+        return True  # not indexed yet
+    if want and not mask & want:
+        return False
+    if q.until and first and first[:len(q.until)] > q.until:
+        return False
+    return True
+
+
+def _live_keys(files: List[str]) -> set:
+    live = set()
+    for file_path in files:
+        try:
+            live.add(_file_key(os.stat(file_path)))
+        except OSError:
+            continue
+    return live
+
+
+def _prune_index(idx: dict, live: set) -> bool:
+    """Drop entries for files deleted by rotation (call with _lock held). True if any were dropped."""
+    stale = [key for key in idx["files"] if key not in live]
+    for key in stale:
+        del idx["files"][key]
+    return bool(stale)
+
+
+def match_record(rec: dict, q: LogQuery) -> bool:
+    """True if a parsed record passes q's filters (limit aside). Shared by file and ring buffer queries."""
+    if q.since or q.until:
+        ts = rec.get("timestamp") or ""
+        if not ts or (q.since and ts[:len(q.since)] < q.since) or (q.until and ts[:len(q.until)] > q.until):
+            return False
+    if q.level and rec.get("level") != q.level:
+        return False
+    if q.search and q.search not in (rec.get("message") or "").lower():
+        return False
+    return True
+
+
+class _Scan:
+    """Matching state for one query: filters, byte-level prefilters and the records found so far."""
+
+    def __init__(self, q: LogQuery):
+        self.q = q
+        self.level_markers = level_markers(q.level) if q.level else ()
+        # bytes.lower() only folds ASCII, and JSON escapes quotes/backslashes, so only such terms are pre-checked
+        plain = q.search and q.search.isascii() and not any(c in q.search for c in '"\\')
+        self.search_bytes = q.search.encode() if plain else b""
+        self.found: List[dict] = []
+        self.older_than_since = False
+
+    def slab_may_match(self, slab: bytes) -> bool:
+        if self.level_markers and not any(m in slab for m in self.level_markers):
+            return False
+        if self.search_bytes and self.search_bytes not in slab.lower():
+            return False
+        return True
+
+    def take(self, raw: bytes) -> bool:
+        """Consider one record; True once `limit` matches have been found."""
+        q = self.q
+        if q.since:
+            m = _HEAD.match(raw)
+            if m and m.group(1).decode("ascii")[:len(q.since)] < q.since:
+                self.older_than_since = True
+                return False
+        if self.level_markers and not any(m in raw[:512] for m in self.level_markers):
+            return False
+        rec = parse_record(raw)
+        if not match_record(rec, q):
+            return False
+        self.found.append(rec)
+        return len(self.found) >= q.limit
+
+
+def query_records(records: List[dict], q: LogQuery, complete_since: Optional[str] = None) -> Optional[dict]:
+    """
+    Answer q from in-memory records (oldest first, e.g. the log ring buffer), or None if they may not hold the
+    full answer: fewer than `limit` matches and `since` is not after complete_since (the time from which the
+    records are known to be complete). Complete only with respect to `records`: a ring buffer holds one process's
+    records, not other workers'.
+    """
+    found = []
+    for rec in reversed(records):
+        if match_record(rec, q):
+            found.append(rec)
+            if len(found) >= q.limit:
+                break
+    if len(found) < q.limit and not (q.since and complete_since and q.since > complete_since[:len(q.since)]):
+        return None
+    found.reverse()
+    return {"logs": found, "count": len(found), "scanned_bytes": 0, "truncated": False}
+
+
+def query_logs(path: str, q: LogQuery) -> dict:
+    """
+    Newest `q.limit` records matching q across path and its rotated files, returned oldest first.
+    Result: {"logs": [...], "count": n, "scanned_bytes": b, "truncated": bool}; truncated means SCAN_MAX_BYTES
+    was reached before `limit` matches were found.
+    """
+    want = level_bit(q.level) if q.level else 0
+    use_index = bool(want or q.since or q.until)
+    scan = _Scan(q)
+    counter = [0]
+    truncated = done = False
+    sidecar = _sidecar_path(path)
+    files = rotated_files(path)
+
+    idx = _load_index(sidecar) if use_index else None
+    max_slab = INDEX_CHUNK if use_index else SLAB_MAX
+    dirty = False
+    for file_path in files:
+        if done:
+            break
+        try:
+            f = open(file_path, "rb")
+        except OSError:
+            continue
+        with f:
+            st = os.fstat(f.fileno())
+            key = _file_key(st)
+            head = _file_head(f) if idx is not None else ""
+            if idx is not None:
+                with _lock:
+                    regions = _file_regions(idx, key, head, st.st_size)
+            else:
+                regions = [[0, st.st_size, None, None, -1]]
+            new_chunks = []
+            for region in reversed(regions):
+                if q.since and region[3] and region[3][:len(q.since)] < q.since:
+                    done = True  # files are chronological: nothing older can match either
+                    break
+                if not _region_may_match(region, q, want):
+                    continue
+                for offset, slab in _slabs_backwards(f, region[0], region[1], counter, max_slab):
+                    # Index what this query reads anyway, except a slab ending at EOF: its last record may
+                    # still be growing (traceback lines)
+                    if idx is not None and region[4] == -1 and offset + len(slab) < st.st_size:
+                        new_chunks.append([offset, offset + len(slab)] + list(_chunk_summary(slab)))
+                    if scan.slab_may_match(slab):
+                        for raw in _records_backwards(slab):
+                            if scan.take(raw) or scan.older_than_since:
+                                done = True
+                                break
+                    if not done and counter[0] >= SCAN_MAX_BYTES:
+                        done = truncated = True
+                    if done:
+                        break
+                if done:
+                    break
+            if new_chunks:
+                with _lock:
+                    dirty = _merge_chunks(idx, key, head, st.st_size, new_chunks) or dirty
+    if idx is not None:
+        live = _live_keys(files)
+        with _lock:
+            dirty = _prune_index(idx, live) or dirty
+            text = json.dumps(idx, separators=(",", ":")) if dirty else None
+        if text is not None:
+            _save_index(sidecar, text)
+
+    found = scan.found
+    found.reverse()
+    return {"logs": found, "count": len(found), "scanned_bytes": counter[0], "truncated": truncated}
+
+
+def clear_log_index_cache() -> None:
+    """Forget in-memory indexes (tests); sidecar files are reread on next use."""
+    with _lock:
+        _indexes.clear()
@@ -0,0 +1,104 @@
+# pagination.py - Opaque cursor tokens for keyset (seek) pagination
+
+import base64
+import json
+from typing import List, Optional, Sequence, Tuple
+
+NEXT = "n"
+PREV = "p"
+
+
+def encode_cursor(key: List, direction: str = NEXT) -> str:
+    """Opaque token for the row key to continue after (NEXT) or before (PREV)."""
+    raw = json.dumps({"k": key, "d": direction}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _key_types(columns) -> Optional[Tuple[type, ...]]:
+    """Python types of the key columns (str for tool_name, int for id); None if a column type has none."""
+    try:
+        return tuple(c.type.python_type for c in columns)
+    except NotImplementedError:
+        return None
+
+
+def _is_instance(value, t: type) -> bool:
+    if t is int and isinstance(value, bool):
+        return False  # JSON true/false would otherwise pass as an int
+    if t is float:
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    return isinstance(value, t)
+
+
+def decode_cursor(token: Optional[str], key_len: int, types: Optional[Sequence[type]] = None) -> Tuple[Optional[List], str]:
+    """
+    Returns (key, direction); (None, NEXT) for no token. Raises ValueError if the token is malformed, or if a key
+    value does not have the given column type (a forged key would reach the database as a type error).
+    """
+    if not token:
+        return None, NEXT
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        key = data["k"]
+        direction = data.get("d", NEXT)
+    except (ValueError, KeyError, TypeError, UnicodeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(key, list) or len(key) != key_len or direction not in (NEXT, PREV):
+        raise ValueError("Invalid cursor")
+    if types is not None and not all(_is_instance(v, t) for v, t in zip(key, types)):
+        raise ValueError("Invalid cursor")
+    return key, direction
+
+
+def keyset_page(query, columns, cursor: Optional[str], limit: int, key_of):
+    """
+    Fetch one page ordered by columns (a unique key, e.g. (Tools.tool_name, Tools.id)).
+    Cost is an index seek plus `limit` rows no matter how deep the page is.
+    key_of(row) -> list of key values for a row.
+    Returns (rows, next_cursor, prev_cursor). Raises ValueError on a bad cursor.
+    """
+    from sqlalchemy import tuple_
+
+    key, direction = decode_cursor(cursor, len(columns), _key_types(columns))
+    row_key = tuple_(*columns)
+    if direction == PREV:
+        q = query.filter(row_key < tuple_(*key)).order_by(*[c.desc() for c in columns])
+    else:
+        if key is not None:
+            query = query.filter(row_key > tuple_(*key))
+        q = query.order_by(*columns)
+    rows = q.limit(limit + 1).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if direction == PREV:
+        rows.reverse()
+        has_prev, has_next = more, True
+    else:
+        has_prev, has_next = key is not None, more
+    next_cursor = encode_cursor(key_of(rows[-1]), NEXT) if rows and has_next else None
+    prev_cursor = encode_cursor(key_of(rows[0]), PREV) if rows and has_prev else None
+    return rows, next_cursor, prev_cursor
+
+
+def iter_keyset_chunks(query, columns, chunk_size: int, key_of, descending: bool = False):
+    """
+    Yield lists of up to chunk_size rows ordered by columns (a unique key), seeking past the last key each time.
+    Every chunk is a separate short query, so the caller may commit or release the connection in between.
+    """
+    from sqlalchemy import tuple_
+
+    row_key = tuple_(*columns)
+    order = [c.desc() for c in columns] if descending else list(columns)
+    key = None
+    while True:
+        q = query
+        if key is not None:
+            q = q.filter(row_key < tuple_(*key) if descending else row_key > tuple_(*key))
+        rows = q.order_by(*order).limit(chunk_size).all()
+        if not rows:
+            return
+        yield rows
+        if len(rows) < chunk_size:
+            return
+        key = key_of(rows[-1])
@@ -0,0 +1,74 @@
+# passwords.py - bcrypt hashing with a configurable cost, run in a small bounded pool so login bursts queue
+# for CPU instead of every request thread hashing at once.
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+# bcrypt cost factor (log2 rounds) for new hashes. Each +1 doubles hashing time; existing hashes with a
+# different cost are rehashed transparently on the user's next successful login.
+BCRYPT_ROUNDS = int(os.environ.get("ATEMS_BCRYPT_ROUNDS", "12"))
+
+# Hashes computed at once per process (bcrypt releases the GIL, so this is real CPU parallelism)
+HASH_WORKERS = int(os.environ.get("ATEMS_HASH_WORKERS") or (os.cpu_count() or 2))
+
+# Hash requests allowed to wait for a worker; beyond this a login fails fast with HashingBusy
+HASH_MAX_PENDING = int(os.environ.get("ATEMS_HASH_MAX_PENDING", "64"))
+
+_hash_executor = None
+_hash_executor_lock = threading.Lock()
+_pending = threading.BoundedSemaphore(max(1, HASH_MAX_PENDING))
+
+
+class HashingBusy(RuntimeError):
+    """Too many password hashes queued in this process (login burst); the caller should ask the user to retry."""
+
+
+def _get_executor():
+    """Lazy singleton ThreadPoolExecutor for bcrypt."""
+    global _hash_executor
+    with _hash_executor_lock:
+        if _hash_executor is None:
+            _hash_executor = ThreadPoolExecutor(max_workers=max(1, HASH_WORKERS), thread_name_prefix="atems_hash")
+        return _hash_executor
+
+
+def _run(fn, *args):
+    """Run fn in the hashing pool and wait for it. Raises HashingBusy when HASH_MAX_PENDING calls are already queued."""
+    if not _pending.acquire(blocking=False):
+        raise HashingBusy("Too many logins in progress")
+    try:
+        return _get_executor().submit(fn, *args).result()
+    finally:
+        _pending.release()
+
+
+def hash_password(password: str, rounds: int = None) -> str:
+    """bcrypt hash of password at `rounds` (default BCRYPT_ROUNDS)."""
+    salt = bcrypt.gensalt(rounds or BCRYPT_ROUNDS)
+    return _run(bcrypt.hashpw, password.encode("utf-8"), salt).decode("utf-8")
+
+
+def verify_password(password: str, password_hash: str) -> bool:
+    """True if password matches password_hash. Malformed hashes never match."""
+    if not password_hash:
+        return False
+    try:
+        return _run(bcrypt.checkpw, password.encode("utf-8"), password_hash.encode("utf-8"))
+    except ValueError:
+        return False
+
+
+def hash_rounds(password_hash: str):
+    """Cost factor stored in a bcrypt hash ('$2b$12$...' -> 12), or None if it is not a bcrypt hash."""
+    parts = (password_hash or "").split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+def needs_rehash(password_hash: str) -> bool:
+    """True if the hash was made with a different cost than BCRYPT_ROUNDS."""
+    return hash_rounds(password_hash) != BCRYPT_ROUNDS
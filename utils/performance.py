@@ -1,5 +1,6 @@
 # performance.py - Timestamps, timing, parallel execution, and bulk query helpers for ATEMS
 
+import contextvars
 import os
 import time
 import logging
@@ -19,17 +20,25 @@ PERF_LOG_THRESHOLD_MS = float(__import__("os").environ.get("ATEMS_PERF_LOG_THRES
 
 
 def get_request_timing_middleware(wsgi_app, log_threshold_ms=None):
-    """WSGI middleware that logs [PERF] timestamp path method duration_ms for each request."""
+    """
+    WSGI middleware that logs [PERF] timestamp path method duration_ms for each request and feeds the per-route
+    latency and SQL-per-request histograms served at /metrics (metrics.py).
+    """
+    from metrics import begin_request_metrics, current_route, end_request_metrics, observe_request
+
     threshold = log_threshold_ms if log_threshold_ms is not None else PERF_LOG_THRESHOLD_MS
 
     def middleware(environ, start_response):
         start = time.perf_counter()
         start_ts = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+        db_stats, token = begin_request_metrics()
 
         def custom_start_response(status, headers, exc_info=None):
             duration_ms = (time.perf_counter() - start) * 1000
             path = environ.get("PATH_INFO", "")
             method = environ.get("REQUEST_METHOD", "")
+            # Flask calls start_response before popping the request context, so the matched rule is still known
+            observe_request(current_route(), method, status, duration_ms / 1000, db_stats)
             if threshold == 0 or duration_ms >= threshold:
                 logger.info(
                     "[PERF] %s %s %s %.2fms",
@@ -41,7 +50,10 @@ def get_request_timing_middleware(wsgi_app, log_threshold_ms=None):
                 )
             return start_response(status, headers, exc_info)
 
-        return wsgi_app(environ, custom_start_response)
+        try:
+            return wsgi_app(environ, custom_start_response)
+        finally:
+            end_request_metrics(token)
 
     return middleware
 
@@ -69,7 +81,8 @@ def run_in_parallel(app, callables_list):
             return fn()
 
     executor = _get_executor()
-    futures = [executor.submit(run_one, c) for c in callables_list]
+    # Each thread runs in a copy of the caller's context so its queries count towards the request (metrics.py)
+    futures = [executor.submit(contextvars.copy_context().run, run_one, c) for c in callables_list]
     return [f.result() for f in futures]
 
 
@@ -83,24 +96,24 @@ def get_overdue_returns_bulk(tools_out, now_dt, Tools, CheckoutHistory):
     if not tools_out:
         return []
     tool_ids = [t.tool_id_number for t in tools_out]
-    # Single query: all checkouts for these tools, newest first
-    rows = (
-        CheckoutHistory.query.filter(
-            CheckoutHistory.tool_id_number.in_(tool_ids),
-            CheckoutHistory.action == "checkout",
-        )
-        .order_by(CheckoutHistory.event_time.desc())
-        .all()
-    )
+    # Single query: all checkouts for these tools. No ORDER BY: sorting on event_time would let the planner pick
+    # (action, event_time) and read every checkout ever made instead of seeking (tool_id_number, action) per tool.
+    rows = CheckoutHistory.query.filter(
+        CheckoutHistory.tool_id_number.in_(tool_ids),
+        CheckoutHistory.action == "checkout",
+    ).all()
     # Keep only latest checkout per tool
     latest_per_tool = {}
     for r in rows:
-        if r.tool_id_number not in latest_per_tool:
+        seen = latest_per_tool.get(r.tool_id_number)
+        if seen is None or (r.event_time, r.id) > (seen.event_time, seen.id):
             latest_per_tool[r.tool_id_number] = r
     # Build tool_id -> Tool for name/username
     tools_by_id = {t.tool_id_number: t for t in tools_out}
     overdue = []
-    for tool_id, last_checkout in latest_per_tool.items():
+    # Newest checkout first
+    for last_checkout in sorted(latest_per_tool.values(), key=lambda r: (r.event_time, r.id), reverse=True):
+        tool_id = last_checkout.tool_id_number
         if not last_checkout.return_by or last_checkout.return_by >= now_dt:
             continue
         t = tools_by_id.get(tool_id)
@@ -1,58 +1,239 @@
-# report_export.py - PDF and Excel export helpers for reports
+# report_export.py - CSV, PDF and Excel export helpers for reports
 
+import csv
 import io
+import logging
+from functools import lru_cache
 
+logger = logging.getLogger(__name__)
 
-def pdf_table(headers, rows, title="ATEMS Report"):
-    """Build a simple PDF with one table. Returns bytes."""
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def csv_stream(headers, rows, chunk_rows=500):
+    """Yield CSV text: the header line first, then rows in chunks of chunk_rows. rows may be any iterator."""
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    w.writerow(headers)
+    yield buf.getvalue()
+    buf.seek(0)
+    buf.truncate()
+    n = 0
+    for row in rows:
+        w.writerow(row)
+        n += 1
+        if n >= chunk_rows:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+            n = 0
+    if n:
+        yield buf.getvalue()
+
+
+# PDF layout (points). Fixed row heights let every page hold the same number of rows without measuring them.
+PDF_FONT_SIZE = 8
+PDF_ROW_HEIGHT = 12
+PDF_HEADER_HEIGHT = 18
+PDF_TITLE_HEIGHT = 36
+PDF_MARGIN = 36
+PDF_CELL_PADDING = 3
+# Rows sampled up front to size the columns; the rest stream through with those widths
+PDF_WIDTH_SAMPLE_ROWS = 200
+
+
+def _pdf_table_style():
     from reportlab.lib import colors
-    from reportlab.lib.pagesizes import letter
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-    from reportlab.lib.styles import getSampleStyleSheet
-    from reportlab.lib.units import inch
+    from reportlab.platypus import TableStyle
 
-    buf = io.BytesIO()
-    doc = SimpleDocTemplate(
-        buf, pagesize=letter,
-        rightMargin=0.5 * inch, leftMargin=0.5 * inch,
-        topMargin=0.5 * inch, bottomMargin=0.5 * inch,
-    )
-    styles = getSampleStyleSheet()
-    story = [Paragraph(title, styles["Title"]), Spacer(1, 12)]
-
-    # Table with header row
-    data = [headers] + rows
-    t = Table(data, repeatRows=1)
-    t.setStyle(TableStyle([
+    return TableStyle([
         ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#374151")),
         ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
-        ("FONTSIZE", (0, 0), (-1, -1), 8),
-        ("BOTTOMPADDING", (0, 0), (-1, 0), 8),
-        ("TOPPADDING", (0, 0), (-1, 0), 8),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("FONTNAME", (0, 1), (-1, -1), "Helvetica"),
+        ("FONTSIZE", (0, 0), (-1, -1), PDF_FONT_SIZE),
+        ("LEFTPADDING", (0, 0), (-1, -1), PDF_CELL_PADDING),
+        ("RIGHTPADDING", (0, 0), (-1, -1), PDF_CELL_PADDING),
+        ("TOPPADDING", (0, 0), (-1, -1), 1),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
         ("BACKGROUND", (0, 1), (-1, -1), colors.HexColor("#1f2937")),
         ("TEXTCOLOR", (0, 1), (-1, -1), colors.white),
         ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
         ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-    ]))
-    story.append(t)
-    doc.build(story)
+    ])
+
+
+def _pdf_column_widths(headers, sample, total_width):
+    """Widths proportional to the widest header/sample text per column, scaled to fill total_width."""
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+
+    natural = []
+    for i, h in enumerate(headers):
+        w = stringWidth(str(h), "Helvetica-Bold", PDF_FONT_SIZE)
+        for row in sample:
+            if i < len(row):
+                w = max(w, stringWidth(str(row[i]), "Helvetica", PDF_FONT_SIZE))
+        natural.append(min(w, total_width / 2) + 2 * PDF_CELL_PADDING)
+    scale = total_width / (sum(natural) or 1)
+    return [w * scale for w in natural]
+
+
+@lru_cache(maxsize=1)
+def _helvetica_max_em():
+    """Width of the widest Helvetica glyph in em (font metrics are in 1/1000 em)."""
+    from reportlab.pdfbase.pdfmetrics import getFont
+
+    return max(getFont("Helvetica").widths) / 1000
+
+
+@lru_cache(maxsize=1024)
+def _glyph_width(ch):
+    """Width of one character in the cell font (standard fonts have no kerning, so widths add up)."""
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+
+    return stringWidth(ch, "Helvetica", PDF_FONT_SIZE)
+
+
+def _fit_text(value, width):
+    """Cell text trimmed with an ellipsis so it fits width (rows have a fixed height, so no wrapping)."""
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+
+    text = "" if value is None else str(value)
+    room = width - 2 * PDF_CELL_PADDING
+    # Cheap bound first: no Helvetica glyph is wider than its widest one ('@', 1.015 em); otherwise measure
+    if len(text) * PDF_FONT_SIZE * _helvetica_max_em() <= room or stringWidth(text, "Helvetica", PDF_FONT_SIZE) <= room:
+        return text
+    # Longest prefix that fits next to the ellipsis: one pass over glyph widths, stopping at the first overflow
+    room -= stringWidth("...", "Helvetica", PDF_FONT_SIZE)
+    used = 0.0
+    for cut, ch in enumerate(text):
+        used += _glyph_width(ch)
+        if used > room:
+            return text[:cut] + "..."
+    return text + "..."
+
+
+def write_pdf(target, headers, rows, title="ATEMS Report"):
+    """
+    Render rows (any iterator) as a table PDF one page at a time: each page is its own fixed-size Table
+    drawn straight onto the canvas, with column widths and style computed once. Work and memory per page
+    are constant, so render time is linear in row count. target is a path or binary file.
+    Returns stats: rows, pages, seconds, rows_per_sec.
+    """
+    import time
+    from itertools import chain, islice
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+    from reportlab.platypus import Table
+
+    start = time.perf_counter()
+    page_w, page_h = letter
+    body_w = page_w - 2 * PDF_MARGIN
+    body_h = page_h - 2 * PDF_MARGIN
+    rows = iter(rows)
+    sample = list(islice(rows, PDF_WIDTH_SAMPLE_ROWS))
+    rows = chain(sample, rows)
+    col_widths = _pdf_column_widths(headers, sample, body_w)
+    style = _pdf_table_style()
+    first_page_rows = int((body_h - PDF_TITLE_HEIGHT - PDF_HEADER_HEIGHT) // PDF_ROW_HEIGHT)
+    page_rows = int((body_h - PDF_HEADER_HEIGHT) // PDF_ROW_HEIGHT)
+
+    c = canvas.Canvas(target, pagesize=letter)
+    c.setTitle(title)
+    n = pages = 0
+    while True:
+        size = first_page_rows if pages == 0 else page_rows
+        chunk = [[_fit_text(v, col_widths[i]) for i, v in enumerate(row)] for row in islice(rows, size)]
+        if not chunk and pages > 0:
+            break
+        top = page_h - PDF_MARGIN
+        if pages == 0:
+            c.setFont("Helvetica-Bold", 16)
+            c.drawString(PDF_MARGIN, top - 18, title)
+            top -= PDF_TITLE_HEIGHT
+        t = Table([headers] + chunk, colWidths=col_widths,
+                  rowHeights=[PDF_HEADER_HEIGHT] + [PDF_ROW_HEIGHT] * len(chunk))
+        t.setStyle(style)
+        _, h = t.wrapOn(c, body_w, body_h)
+        t.drawOn(c, PDF_MARGIN, top - h)
+        pages += 1
+        n += len(chunk)
+        c.setFont("Helvetica", 7)
+        c.drawRightString(page_w - PDF_MARGIN, PDF_MARGIN / 2, f"Page {pages}")
+        c.showPage()
+        if len(chunk) < size:
+            break
+    c.save()
+    seconds = time.perf_counter() - start
+    stats = {"rows": n, "pages": pages, "seconds": round(seconds, 3),
+             "rows_per_sec": round(n / seconds) if seconds > 0 else None}
+    logger.info("PDF %r: %d rows, %d pages in %.2fs (%s rows/s)", title, n, pages, seconds, stats["rows_per_sec"])
+    return stats
+
+
+def pdf_tempfile(headers, rows, title="ATEMS Report"):
+    """PDF in an anonymous temp file (deleted on close), rewound for reading. For streaming responses."""
+    import tempfile
+
+    f = tempfile.TemporaryFile(suffix=".pdf")
+    try:
+        write_pdf(f, headers, rows, title=title)
+    except Exception:
+        f.close()
+        raise
+    f.seek(0)
+    return f
+
+
+def pdf_table(headers, rows, title="ATEMS Report"):
+    """Build a table PDF. Returns bytes (small reports; see pdf_tempfile)."""
+    buf = io.BytesIO()
+    write_pdf(buf, headers, rows, title=title)
     return buf.getvalue()
 
 
-def xlsx_table(headers, rows, sheet_name="Report"):
-    """Build a simple Excel workbook with one sheet. Returns bytes."""
+def write_xlsx(target, headers, rows, sheet_name="Report"):
+    """
+    Write one sheet to target (path or binary file) with openpyxl write-only mode. rows may be any iterator;
+    each row is serialized as it arrives, so memory does not grow with row count. Returns rows written.
+    """
     import openpyxl
+    from openpyxl.cell import WriteOnlyCell
     from openpyxl.styles import Font
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = (sheet_name or "Report")[:31]
-    ws.append(headers)
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(title=(sheet_name or "Report")[:31])
+    bold = Font(bold=True)
+    header_cells = []
+    for h in headers:
+        cell = WriteOnlyCell(ws, value=h)
+        cell.font = bold
+        header_cells.append(cell)
+    ws.append(header_cells)
+    n = 0
     for row in rows:
         ws.append(row)
-    # Bold header
-    for cell in ws[1]:
-        cell.font = Font(bold=True)
+        n += 1
+    wb.save(target)
+    return n
+
+
+def xlsx_tempfile(headers, rows, sheet_name="Report"):
+    """Workbook in an anonymous temp file (deleted on close), rewound for reading. For streaming responses."""
+    import tempfile
+
+    f = tempfile.TemporaryFile(suffix=".xlsx")
+    try:
+        write_xlsx(f, headers, rows, sheet_name=sheet_name)
+    except Exception:
+        f.close()
+        raise
+    f.seek(0)
+    return f
+
+
+def xlsx_table(headers, rows, sheet_name="Report"):
+    """Build a simple Excel workbook with one sheet. Returns bytes (small reports; see xlsx_tempfile)."""
     buf = io.BytesIO()
-    wb.save(buf)
+    write_xlsx(buf, headers, rows, sheet_name=sheet_name)
     return buf.getvalue()
@@ -0,0 +1,249 @@
+# reports.py - Report row sources for exports (CSV/PDF/Excel). Rows are generated lazily from the DB.
+
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Optional, Tuple
+
+# Rows fetched per DB round trip; also the server-side cursor batch on PostgreSQL.
+EXPORT_YIELD_PER = 1000
+
+# type -> title, sheet name, download filename (without extension)
+REPORT_SPECS = {
+    "usage": {"title": "ATEMS Tool Usage Report", "sheet": "Usage", "filename": "atems_usage_report"},
+    "overdue-returns": {"title": "ATEMS Overdue Returns", "sheet": "Overdue Returns", "filename": "atems_overdue_returns"},
+    "calibration": {"title": "ATEMS Calibration Report", "sheet": "Calibration", "filename": "atems_calibration_report"},
+    "inventory": {"title": "ATEMS Inventory Report", "sheet": "Inventory", "filename": "atems_inventory_report"},
+}
+
+# Usage report filters accepted by apply_usage_filters (query-string / job params)
+USAGE_FILTERS = ("date_from", "date_to", "username", "tool_id", "action")
+
+
+def apply_usage_filters(q, filters: Optional[dict]):
+    """Apply date_from/date_to (YYYY-MM-DD), username, tool_id (substring) and action to a CheckoutHistory query."""
+    from models.checkout_history import CheckoutHistory as H
+
+    filters = filters or {}
+    date_from = filters.get("date_from")
+    date_to = filters.get("date_to")
+    username = (filters.get("username") or "").strip()
+    tool_id = (filters.get("tool_id") or "").strip()
+    action = (filters.get("action") or "").strip()
+    if date_from:
+        try:
+            q = q.filter(H.event_time >= datetime.strptime(date_from, "%Y-%m-%d"))
+        except ValueError:
+            pass
+    if date_to:
+        try:
+            end = datetime.strptime(date_to, "%Y-%m-%d") + timedelta(days=1) - timedelta(microseconds=1)
+            q = q.filter(H.event_time <= end)
+        except ValueError:
+            pass
+    if username:
+        q = q.filter(H.username.ilike(f"%{username}%"))
+    if tool_id:
+        q = q.filter(H.tool_id_number.ilike(f"%{tool_id}%"))
+    if action:
+        q = q.filter(H.action == action)
+    return q
+
+
+def _usage_source(filters):
+    from extensions import db
+    from models.checkout_history import CheckoutHistory as H
+
+    headers = ['Event Time', 'Action', 'Tool ID', 'Tool Name', 'User', 'Job ID', 'Condition', 'Return By']
+    q = apply_usage_filters(db.session.query(
+        H.event_time, H.action, H.tool_id_number, H.tool_name, H.username, H.job_id, H.condition, H.return_by, H.id,
+    ), filters)
+
+    def fmt(e):
+        return [
+            e.event_time.strftime('%Y-%m-%d %H:%M') if e.event_time else '',
+            e.action,
+            e.tool_id_number or '',
+            e.tool_name or '',
+            e.username or '',
+            e.job_id or '',
+            e.condition or '',
+            e.return_by.strftime('%Y-%m-%d') if e.return_by else '',
+        ]
+
+    # Newest first
+    return {"headers": headers, "query": q, "key": (H.event_time, H.id), "descending": True,
+            "format": fmt, "key_of": lambda e: (e.event_time, e.id)}
+
+
+def _calibration_source(filters):
+    from extensions import db
+    from models.tools import Tools
+    from utils.calibration import is_calibration_overdue, calibration_today
+
+    headers = ['Tool ID', 'Tool Name', 'Location', 'Category', 'Calibration Due', 'Status', 'Overdue']
+    q = db.session.query(
+        Tools.tool_id_number, Tools.tool_name, Tools.tool_location, Tools.category,
+        Tools.tool_calibration_due, Tools.tool_status, Tools.id,
+    ).filter(
+        Tools.tool_calibration_due != 'N/A',
+        Tools.tool_calibration_due.isnot(None),
+    )
+    today = calibration_today()
+
+    def fmt(t):
+        return [
+            t.tool_id_number,
+            t.tool_name or '',
+            t.tool_location or '',
+            t.category or '',
+            t.tool_calibration_due or '',
+            t.tool_status or '',
+            'Yes' if is_calibration_overdue(t.tool_calibration_due, today) else 'No',
+        ]
+
+    return {"headers": headers, "query": q, "key": (Tools.tool_calibration_due, Tools.id), "descending": False,
+            "format": fmt, "key_of": lambda t: (t.tool_calibration_due, t.id)}
+
+
+def _inventory_source(filters):
+    from extensions import db
+    from models.tools import Tools
+    from sqlalchemy import func
+
+    headers = ['Tool ID', 'Tool Name', 'Location', 'Category', 'Status', 'Checked Out By', 'Calibration Due']
+    # Uncategorized tools sort first on every backend (and the key never holds NULL)
+    category = func.coalesce(Tools.category, '')
+    q = db.session.query(
+        Tools.tool_id_number, Tools.tool_name, Tools.tool_location, category.label('category'),
+        Tools.tool_status, Tools.checked_out_by, Tools.tool_calibration_due, Tools.id,
+    )
+
+    def fmt(t):
+        return [
+            t.tool_id_number,
+            t.tool_name or '',
+            t.tool_location or '',
+            t.category,
+            t.tool_status or '',
+            t.checked_out_by or '',
+            t.tool_calibration_due or '',
+        ]
+
+    return {"headers": headers, "query": q, "key": (category, Tools.tool_id_number, Tools.id), "descending": False,
+            "format": fmt, "key_of": lambda t: (t.category, t.tool_id_number, t.id)}
+
+
+_SOURCES = {
+    "usage": _usage_source,
+    "calibration": _calibration_source,
+    "inventory": _inventory_source,
+}
+
+
+def _overdue_returns() -> Tuple[List[str], List[list]]:
+    """Tools checked out past their return-by date (bounded by tools out, built in one pass)."""
+    from models.tools import Tools
+    from models.checkout_history import CheckoutHistory
+    from utils.performance import get_overdue_returns_bulk
+
+    headers = ['Tool ID', 'Tool Name', 'Checked out by', 'Return by']
+    _now = datetime.now(timezone.utc).replace(tzinfo=None)
+    tools_out = Tools.query.filter(Tools.checked_out_by.isnot(None)).all()
+    rows = [
+        [
+            r["tool_id_number"] or '',
+            r["tool_name"] or '',
+            r["username"] or '',
+            r["return_by"].strftime('%Y-%m-%d') if r["return_by"] else '',
+        ]
+        for r in get_overdue_returns_bulk(tools_out, _now, Tools, CheckoutHistory)
+    ]
+    return headers, rows
+
+
+def report_rows(report_type: str, limit: Optional[int] = None, filters: Optional[dict] = None) -> Tuple[List[str], Iterator[list]]:
+    """
+    (headers, rows) for one report type; rows is a generator over a single yield_per query.
+    limit=None exports everything. filters only apply to usage (see USAGE_FILTERS).
+    """
+    if report_type == "overdue-returns":
+        headers, rows = _overdue_returns()
+        return headers, iter(rows)
+    src = _SOURCES[report_type](filters)
+    q = src["query"].order_by(*[c.desc() if src["descending"] else c for c in src["key"]])
+    if limit:
+        q = q.limit(limit)
+    fmt = src["format"]
+
+    def rows():
+        for r in q.yield_per(EXPORT_YIELD_PER):
+            yield fmt(r)
+
+    return src["headers"], rows()
+
+
+def report_row_chunks(report_type: str, chunk_size: int = EXPORT_YIELD_PER, filters: Optional[dict] = None):
+    """
+    (headers, chunks) where chunks yields lists of formatted rows. Each chunk is its own keyset query
+    (seek past the last key, no OFFSET), so callers may commit between chunks without losing a cursor.
+    """
+    from utils.pagination import iter_keyset_chunks
+
+    if report_type == "overdue-returns":
+        headers, rows = _overdue_returns()
+        return headers, iter([rows] if rows else [])
+    src = _SOURCES[report_type](filters)
+    fmt = src["format"]
+
+    def chunks():
+        for rows in iter_keyset_chunks(src["query"], src["key"], chunk_size, src["key_of"], descending=src["descending"]):
+            yield [fmt(r) for r in rows]
+
+    return src["headers"], chunks()
+
+
+def report_row_count(report_type: str, filters: Optional[dict] = None) -> int:
+    """Number of rows report_rows would produce (for job progress)."""
+    if report_type == "overdue-returns":
+        return len(_overdue_returns()[1])
+    return _SOURCES[report_type](filters)["query"].count()
+
+
+def run_export_job(job_id: str, params: dict, progress, checkpoint=None):
+    """
+    Background export (utils/jobs.py runner): write the whole report to the spool directory chunk by chunk.
+    params: type, format (csv|pdf|xlsx), filters (usage only). Returns (path, download filename).
+    A resumed export starts over (checkpoint is ignored); the file is only renamed into place when complete.
+    """
+    import csv
+    import os
+    from utils.jobs import spool_path
+    from utils.report_export import write_pdf, write_xlsx
+
+    report_type = params.get("type", "usage")
+    fmt = params.get("format", "csv")
+    spec = REPORT_SPECS[report_type]
+    filters = params.get("filters") or {}
+
+    progress(0, report_row_count(report_type, filters))
+    headers, chunks = report_row_chunks(report_type, EXPORT_YIELD_PER, filters)
+    path = spool_path(job_id, fmt)
+    part = path + ".part"
+
+    def rows():
+        done = 0
+        for chunk in chunks:
+            yield from chunk
+            done += len(chunk)
+            progress(done)
+
+    if fmt == "csv":
+        with open(part, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(headers)
+            w.writerows(rows())
+    elif fmt == "xlsx":
+        write_xlsx(part, headers, rows(), sheet_name=spec["sheet"])
+    else:
+        write_pdf(part, headers, rows(), title=spec["title"])
+    os.replace(part, path)
+    return path, f"{spec['filename']}.{fmt}"
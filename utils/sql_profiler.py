@@ -0,0 +1,204 @@
+# sql_profiler.py - Opt-in per-request SQL profiler: every statement of a profiled request is timed (SQLAlchemy
+# before/after_cursor_execute), summarized in a Server-Timing header, and the slowest N statements seen by this
+# process are kept with their EXPLAIN plan for the admin panel on /logs.
+#
+# Enable for every request with ATEMS_SQL_PROFILE=1, or per request with "X-ATEMS-Profile: 1" (admins only).
+
+import contextvars
+import heapq
+import itertools
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-ATEMS-Profile"
+
+# Slowest statements kept per process (shown on /logs)
+SLOW_QUERY_COUNT = int(os.environ.get("ATEMS_SQL_PROFILE_SLOW_N", "20"))
+
+# Statements faster than this never enter the slow list (and are never EXPLAINed)
+SLOW_QUERY_MIN_MS = float(os.environ.get("ATEMS_SQL_PROFILE_MIN_MS", "1"))
+
+# Statements listed individually in Server-Timing (slowest first); the "db" total always covers all of them
+SERVER_TIMING_MAX = 20
+
+_EXPLAINABLE = re.compile(r"\s*(select|with|update|delete)\b", re.I)
+
+_profile = contextvars.ContextVar("atems_sql_profile", default=None)
+
+_slow = []  # min-heap of (duration_ms, seq, entry): the root is the fastest of the N slowest
+_slow_seq = itertools.count()
+_slow_lock = threading.Lock()
+
+
+def profile_all_enabled() -> bool:
+    return os.environ.get("ATEMS_SQL_PROFILE", "0").strip().lower() in ("1", "true", "yes")
+
+
+class _Profile:
+    """Statements of one request; appended from the dashboard's worker threads too (run_in_parallel)."""
+
+    __slots__ = ("route", "start", "statements", "lock")
+
+    def __init__(self, route: str):
+        self.route = route
+        self.start = time.perf_counter()
+        self.statements = []  # (duration_ms, statement, parameters, executemany)
+        self.lock = threading.Lock()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _profile.get() is not None:
+        context._atems_profile_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_atems_profile_start", None)
+    prof = _profile.get()
+    if start is not None and prof is not None:
+        ms = (time.perf_counter() - start) * 1000
+        with prof.lock:
+            prof.statements.append((ms, statement, parameters, executemany))
+
+
+def _is_admin() -> bool:
+    from flask_login import current_user
+    return current_user.is_authenticated and current_user.is_admin()
+
+
+def _should_profile() -> bool:
+    if profile_all_enabled():
+        return True
+    if request.headers.get(PROFILE_HEADER, "").strip().lower() not in ("1", "true", "yes"):
+        return False
+    # Profiling costs an EXPLAIN per new slow statement; do not let anonymous clients switch it on
+    return _is_admin()
+
+
+def _header_text(text: str, limit: int) -> str:
+    """Single line, ASCII, no quotes: safe inside a Server-Timing quoted desc."""
+    text = " ".join(text.split()).encode("ascii", "replace").decode("ascii").replace("\\", "/").replace('"', "'")
+    return text if len(text) <= limit else text[: limit - 3] + "..."
+
+
+def server_timing(statements, total_ms: float, with_statements: bool) -> str:
+    """
+    Server-Timing value: app total, db total with the statement count, then (with_statements, admins only: SQL
+    text reveals the schema, same rule as /api/logs/slow-queries) the slowest statements.
+    """
+    db_ms = sum(s[0] for s in statements)
+    n = len(statements)
+    parts = [f"app;dur={total_ms:.2f}", f'db;dur={db_ms:.2f};desc="{n} {"query" if n == 1 else "queries"}"']
+    shown = sorted(statements, key=lambda s: -s[0])[:SERVER_TIMING_MAX] if with_statements else []
+    for i, (ms, statement, _, _) in enumerate(shown, 1):
+        parts.append(f'sql-{i};dur={ms:.2f};desc="{_header_text(statement, 80)}"')
+    return ", ".join(parts)
+
+
+def _explain(statement: str, parameters) -> List[str]:
+    """Plan lines for statement on a separate connection (SQLite, PostgreSQL, MySQL/MariaDB)."""
+    from extensions import db
+
+    engine = db.engine
+    dialect = engine.dialect.name
+    with engine.connect() as conn:
+        if dialect == "sqlite":
+            return [row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)]
+        if dialect == "postgresql":
+            return [row[0] for row in conn.exec_driver_sql("EXPLAIN " + statement, parameters)]
+        if dialect in ("mysql", "mariadb"):
+            return [" | ".join(str(v) for v in row) for row in conn.exec_driver_sql("EXPLAIN " + statement, parameters)]
+    return [f"(no EXPLAIN for {dialect})"]
+
+
+def _offer_slow(prof: _Profile, method: str, ms: float, statement: str, parameters, executemany: bool) -> None:
+    if ms < SLOW_QUERY_MIN_MS or SLOW_QUERY_COUNT <= 0:
+        return
+    with _slow_lock:
+        if len(_slow) >= SLOW_QUERY_COUNT and ms <= _slow[0][0]:
+            return
+    plan, plan_error = None, None
+    if executemany or not _EXPLAINABLE.match(statement):
+        plan_error = "not explained (only single SELECT/UPDATE/DELETE statements are)"
+    else:
+        try:
+            plan = _explain(statement, parameters)
+        except Exception as e:
+            plan_error = f"EXPLAIN failed: {e}"
+    entry = {
+        "duration_ms": round(ms, 2),
+        "route": prof.route,
+        "method": method,
+        "statement": statement,  # parameters were only used for EXPLAIN; never kept (password hashes, badges)
+        "plan": plan,
+        "plan_error": plan_error,
+        "time": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "request_id": g.get("request_id"),
+    }
+    with _slow_lock:
+        item = (ms, next(_slow_seq), entry)
+        if len(_slow) < SLOW_QUERY_COUNT:
+            heapq.heappush(_slow, item)
+        elif ms > _slow[0][0]:
+            heapq.heapreplace(_slow, item)
+
+
+def slow_queries() -> List[dict]:
+    """This process's slowest statements, slowest first."""
+    with _slow_lock:
+        return [entry for _, _, entry in sorted(_slow, key=lambda item: (-item[0], item[1]))]
+
+
+def clear_slow_queries() -> None:
+    with _slow_lock:
+        _slow.clear()
+
+
+def register_sql_profiler(app) -> None:
+    """Hook the profiler into app's requests and every engine. Statements are only recorded for profiled requests."""
+    for name, fn in (("before_cursor_execute", _before_cursor_execute), ("after_cursor_execute", _after_cursor_execute)):
+        if not event.contains(Engine, name, fn):
+            event.listen(Engine, name, fn)
+
+    @app.before_request
+    def _start_sql_profile():
+        if _should_profile():
+            from metrics import current_route
+            g._sql_profile_token = _profile.set(_Profile(current_route()))
+
+    @app.after_request
+    def _finish_sql_profile(response):
+        token = g.pop("_sql_profile_token", None)
+        if token is None:
+            return response
+        prof: Optional[_Profile] = _profile.get()
+        _profile.reset(token)  # the EXPLAINs below are not part of the request
+        if prof is None:
+            return response
+        total_ms = (time.perf_counter() - prof.start) * 1000
+        with prof.lock:
+            statements = list(prof.statements)
+        response.headers["Server-Timing"] = server_timing(statements, total_ms, with_statements=_is_admin())
+        logger.info("[SQL] %s %s %d queries %.2fms db / %.2fms total", request.method, prof.route, len(statements),
+                    sum(s[0] for s in statements), total_ms)
+        for ms, statement, parameters, executemany in statements:
+            _offer_slow(prof, request.method, ms, statement, parameters, executemany)
+        return response
+
+    @app.teardown_request
+    def _drop_sql_profile(exc=None):
+        # after_request is skipped when the request fails before a response exists; do not leak the profile into
+        # the next request served by this thread
+        token = g.pop("_sql_profile_token", None)
+        if token is not None:
+            _profile.reset(token)
@@ -0,0 +1,208 @@
+# user_cache.py - Per-process TTL/LRU cache in front of the Flask-Login user loader (saves one SELECT per request),
+# plus a small user directory (known usernames, badge -> username) so logins with unknown names and badge
+# swipes are answered without a query.
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Mapping, NamedTuple, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+# Seconds a cached user is trusted. Bounds how long another worker process can serve a stale role. 0 disables.
+USER_CACHE_TTL = float(os.environ.get("ATEMS_USER_CACHE_TTL", "60"))
+
+# Users kept per process (least recently used are dropped first)
+USER_CACHE_SIZE = int(os.environ.get("ATEMS_USER_CACHE_SIZE", "1024"))
+
+# The user directory is reloaded on a miss at most this often, so a user or badge created by another worker
+# process is found here within this many seconds while lookups of unknown names/badges stay off the DB.
+USERNAME_REFRESH_SECONDS = float(os.environ.get("ATEMS_USERNAME_REFRESH_SECONDS", "10"))
+
+# The directory is also reloaded when older than this, bounding how long a badge reassigned by another worker
+# process still maps to the old user here. Writes in this process reload it immediately.
+USER_DIRECTORY_TTL = float(os.environ.get("ATEMS_USER_DIRECTORY_TTL", "60"))
+
+# user id -> (detached User snapshot, expires_at monotonic seconds)
+_cache: "OrderedDict[int, tuple]" = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+
+class _Directory(NamedTuple):
+    usernames: frozenset
+    badges: Mapping[str, str]  # badge_id -> username
+    loaded_at: float  # monotonic seconds
+
+
+# Replaced whole on reload, never mutated; None until first use or after a local user write
+_directory: Optional[_Directory] = None
+
+_SESSION_KEY = "atems_user_cache_dirty"
+_SESSION_DIRECTORY_KEY = "atems_user_directory_dirty"
+
+
+def _snapshot(user):
+    """Detached copy of a loaded User (column values only) that can be merged into any session without a SELECT."""
+    from models.user import User
+
+    copy = User(**{c.key: getattr(user, c.key) for c in User.__mapper__.column_attrs})
+    make_transient_to_detached(copy)
+    return copy
+
+
+def load_cached_user(user_id: int):
+    """User for the session cookie's id: from the cache when fresh, else one SELECT. Returns None if missing."""
+    from extensions import db
+    from models.user import User
+
+    now = time.monotonic()
+    if USER_CACHE_TTL > 0:
+        with _lock:
+            entry = _cache.get(user_id)
+            if entry is not None and entry[1] > now:
+                _cache.move_to_end(user_id)
+                _stats["hits"] += 1
+                snapshot = entry[0]
+            else:
+                snapshot = None
+                _stats["misses"] += 1
+        if snapshot is not None:
+            # Each request gets its own session-bound instance; the shared snapshot is never handed out
+            return db.session.merge(snapshot, load=False)
+
+    user = db.session.get(User, user_id)
+    if user is not None and USER_CACHE_TTL > 0:
+        snapshot = _snapshot(user)
+        with _lock:
+            _cache[user_id] = (snapshot, now + USER_CACHE_TTL)
+            _cache.move_to_end(user_id)
+            while len(_cache) > USER_CACHE_SIZE:
+                _cache.popitem(last=False)
+    return user
+
+
+def warm_user_directory() -> _Directory:
+    """(Re)load usernames and badge ids with one query. Called at startup and whenever the directory is stale."""
+    global _directory
+    from extensions import db
+    from models.user import User
+
+    rows = db.session.query(User.username, User.badge_id).all()
+    _directory = _Directory(
+        frozenset(u for u, _ in rows),
+        MappingProxyType({b: u for u, b in rows if b}),
+        time.monotonic(),
+    )
+    return _directory
+
+
+def _fresh_directory() -> _Directory:
+    d = _directory
+    if d is None or time.monotonic() - d.loaded_at >= USER_DIRECTORY_TTL:
+        d = warm_user_directory()
+    return d
+
+
+def _reload_on_miss(d: _Directory) -> Optional[_Directory]:
+    """The reloaded directory if the last load is old enough to retry a miss, else None."""
+    if time.monotonic() - d.loaded_at < USERNAME_REFRESH_SECONDS:
+        return None
+    return warm_user_directory()
+
+
+def is_known_username(username: str) -> bool:
+    """
+    False only if no user by that name existed at the last load (at most USERNAME_REFRESH_SECONDS ago).
+    Lets the login path reject unknown names without a query; a True still needs the real lookup.
+    """
+    d = _fresh_directory()
+    if username in d.usernames:
+        return True
+    d = _reload_on_miss(d)
+    return d is not None and username in d.usernames
+
+
+def username_for_badge(badge_id: str) -> Optional[str]:
+    """Username holding badge_id per the directory (a dict hit), or None if no user has it."""
+    d = _fresh_directory()
+    username = d.badges.get(badge_id)
+    if username is None:
+        d = _reload_on_miss(d)
+        username = d.badges.get(badge_id) if d is not None else None
+    return username
+
+
+def invalidate_user(user_id) -> None:
+    """Drop one user from this process's cache (after an edit, role change, or login)."""
+    if user_id is None:
+        return
+    with _lock:
+        if _cache.pop(user_id, None) is not None:
+            _stats["invalidations"] += 1
+
+
+def clear_user_cache() -> None:
+    """Drop every cached user and the user directory (app start, tests)."""
+    global _directory
+    with _lock:
+        _cache.clear()
+        _directory = None
+
+
+def user_cache_info() -> dict:
+    """Hit/miss counters (for /api/system/health)."""
+    with _lock:
+        total = _stats["hits"] + _stats["misses"]
+        return {
+            "hits": _stats["hits"],
+            "misses": _stats["misses"],
+            "invalidations": _stats["invalidations"],
+            "size": len(_cache),
+            "maxsize": USER_CACHE_SIZE,
+            "ttl_seconds": USER_CACHE_TTL,
+            "hit_rate": round(_stats["hits"] / total, 4) if total else None,
+            "directory_users": len(_directory.usernames) if _directory is not None else None,
+            "directory_badges": len(_directory.badges) if _directory is not None else None,
+        }
+
+
+def _after_flush(session, flush_context):
+    """Invalidate users updated/deleted in this flush, and again at commit (a reader may re-cache the old row meanwhile)."""
+    global _directory
+    from models.user import User
+
+    if any(isinstance(obj, User) for obj in list(session.new) + list(session.dirty) + list(session.deleted)):
+        _directory = None  # new users, renames and badge changes are seen on the next lookup
+        session.info[_SESSION_DIRECTORY_KEY] = True
+    ids = {obj.id for obj in list(session.dirty) + list(session.deleted) if isinstance(obj, User)}
+    if ids:
+        for user_id in ids:
+            invalidate_user(user_id)
+        session.info.setdefault(_SESSION_KEY, set()).update(ids)
+
+
+def _after_commit(session):
+    global _directory
+    for user_id in session.info.pop(_SESSION_KEY, ()):
+        invalidate_user(user_id)
+    if session.info.pop(_SESSION_DIRECTORY_KEY, False):
+        _directory = None
+
+
+def _after_rollback(session):
+    global _directory
+    session.info.pop(_SESSION_KEY, None)
+    if session.info.pop(_SESSION_DIRECTORY_KEY, False):
+        _directory = None  # it may have been reloaded with the rolled-back rows
+
+
+def register_user_cache_events() -> None:
+    """Invalidate on every ORM write to users (Flask-Admin user views, env login, scripts). Idempotent."""
+    for name, fn in (("after_flush", _after_flush), ("after_commit", _after_commit), ("after_rollback", _after_rollback)):
+        if not event.contains(Session, name, fn):
+            event.listen(Session, name, fn)